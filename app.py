@@ -1,3 +1,209 @@
-from functions.visualizer import run_visualizer
+#importation des bibliothèques nécessaires
+#les modules du projet (pandas, matplotlib) sont importés dans chaque commande, seulement quand elle en a besoin :
+#'report' ne charge jamais matplotlib
+import argparse
+import os
+import sys
+
+# pas de fenêtre graphique : les images sont seulement enregistrées
+os.environ.setdefault('MPLBACKEND', 'Agg')
+
+
+#commande 'report' : rapport texte seul (aucun graphique)
+def run_report(args):
+    from functions.metrics import save_metrics
+
+    if args.stream:
+        # rapport calculé par paquets de lignes (BOOKS_CHUNK_SIZE)
+        from functions.analyzer import analyze_data_streaming
+        analyze_data_streaming()
+    elif args.incremental:
+        from functions.incremental import analyze_data_incremental
+        analyze_data_incremental()
+    else:
+        from functions.pipeline import load_analysis_results
+        load_analysis_results(refresh_cache=args.refresh_cache)
+    save_metrics()
+
+
+#commande 'charts' : graphiques seuls (statistiques calculées mais rapport non réécrit)
+def run_charts(args):
+    from functions.visualizer import run_visualizer, run_visualizer_incremental, run_visualizer_columnar
+
+    if args.from_columnar:
+        # graphiques redessinés depuis le dernier export colonne, sans relire le CSV
+        run_visualizer_columnar()
+    elif args.incremental:
+        run_visualizer_incremental()
+    else:
+        run_visualizer(refresh_cache=args.refresh_cache, report=False)
+
+
+#commande 'all' : rapport texte et graphiques (comportement par défaut)
+def run_all(args):
+    from functions.visualizer import run_visualizer, run_visualizer_incremental
+
+    if args.incremental:
+        run_visualizer_incremental()
+    else:
+        run_visualizer(refresh_cache=args.refresh_cache)
+
+
+#commande 'serve' : service résident (catalogue en mémoire, rechargé quand le CSV change)
+def run_serve(args):
+    from functions.service import run_service
+    run_service(host=args.host, port=args.port, interval=args.interval, charts=not args.no_charts)
+
+
+#commande 'diff' : différences entre deux catalogues (livres ajoutés, retirés, changements de prix et de stock)
+def run_diff(args):
+    from functions.diff import run_diff
+    from functions.metrics import save_metrics
+    run_diff(args.old, args.new)
+    save_metrics()
+
+
+#commande 'history' : historique d'un livre ou mesures par rating jour par jour, lus dans l'historique
+def run_history(args):
+    from functions.history import run_history
+    run_history(title=args.title, days=args.days, metric=args.metric)
+
+
+#commande 'search' : recherche dans les titres (index inversé construit au premier appel, puis relu)
+def run_search(args):
+    from functions.search import run_search
+    run_search(args.query, rating=args.rating, min_price=args.min_price, max_price=args.max_price,
+               in_stock=args.in_stock, limit=args.limit, rebuild=args.rebuild)
+
+
+COMMANDS = {
+    'report': run_report,
+    'charts': run_charts,
+    'all': run_all,
+    'serve': run_serve,
+    'diff': run_diff,
+    'history': run_history,
+    'search': run_search,
+}
+
+
+# commandes remplacées par le rapport texte calculé par paquets avec --stream
+STREAM_COMMANDS = ('report', 'charts', 'all')
+
+
+#fonction qui crée les options communes, acceptées avant ou après la commande
+#(SUPPRESS : une option absente après la commande n'écrase pas celle donnée avant)
+def common_options():
+    common = argparse.ArgumentParser(add_help=False, argument_default=argparse.SUPPRESS)
+    common.add_argument('--refresh-cache', action='store_true', help="relire et renettoyer le CSV même s'il n'a pas changé")
+    common.add_argument('--clear-cache', action='store_true', help="vider le cache des données nettoyées avant de commencer")
+    common.add_argument('--incremental', action='store_true', help="ne traiter que les lignes ajoutées au CSV depuis la dernière exécution")
+    common.add_argument('--stream', action='store_true', help="rapport calculé par paquets de lignes, sans graphiques (commandes report, charts, all)")
+    common.add_argument('--group-by', action='append',
+                        help="ajouter au rapport les statistiques regroupées par price_band, stock_band, une colonne "
+                             "ou une combinaison (ex. rating+price_band) ; répétable")
+    common.add_argument('--near-duplicates', nargs='?', type=float, const=0.8, metavar='SEUIL',
+                        help="retirer aussi les quasi-doublons (titres presque identiques au même prix) ; "
+                             "SEUIL : similarité minimale entre 0 et 1 (0.8 par défaut)")
+    common.add_argument('--top', type=int, metavar='K',
+                        help="nombre de livres des classements du rapport (valeur, prix, stock ; BOOKS_TOP_K, 10 par défaut)")
+    common.add_argument('--history', action='store_true',
+                        help="ajouter l'instantané du jour (prix, stock, rating) à l'historique output/history")
+    common.add_argument('--export', choices=['json', 'csv', 'columnar'], action='append',
+                        help="exporter aussi les statistiques (répétable : --export json --export csv) ; 'columnar' : "
+                             "catalogue nettoyé et agrégats en colonnes, par rating, dans output/columnar")
+    return common
+
+
+#fonction qui construit l'analyseur de la ligne de commande
+def build_parser():
+    parser = argparse.ArgumentParser(description="Analyse du catalogue de livres : rapport texte et graphiques",
+                                     parents=[common_options()])
+    subparsers = parser.add_subparsers(dest='command')
+    parser.set_defaults(command='all', refresh_cache=False, clear_cache=False, incremental=False, stream=False,
+                        export=None, group_by=None, near_duplicates=None, history=False,
+                        top=None)
+    subparsers.add_parser('report', parents=[common_options()], help="rapport texte seul (rapide, sans matplotlib)")
+    charts = subparsers.add_parser('charts', parents=[common_options()], help="graphiques seuls")
+    charts.add_argument('--from-columnar', action='store_true', help="dessiner depuis l'export colonne (output/columnar)")
+    subparsers.add_parser('all', parents=[common_options()], help="rapport texte et graphiques (par défaut)")
+
+    diff = subparsers.add_parser('diff', parents=[common_options()],
+                                 help="différences entre deux fichiers CSV du catalogue (ex. scrapings de deux jours)")
+    diff.add_argument('old', help="ancien fichier CSV")
+    diff.add_argument('new', help="nouveau fichier CSV")
+
+    history = subparsers.add_parser('history', parents=[common_options()],
+                                    help="historique des prix et des stocks (instantanés ajoutés avec --history)")
+    history.add_argument('--title', help="historique de ce livre (sinon : mesures par rating, jour par jour)")
+    history.add_argument('--days', type=int, help="seulement les N derniers jours")
+    history.add_argument('--metric', choices=['Average_Price', 'Total_Stock', 'Value', 'Book_Count'], default='Value',
+                         help="mesure par rating affichée (Value par défaut)")
+
+    search = subparsers.add_parser('search', parents=[common_options()],
+                                   help="recherche de livres par mots du titre (tous les mots ; 'mot*' pour un préfixe)")
+    search.add_argument('query', nargs='?', default='', help="mots recherchés (ex. \"light attic\", \"sapi*\")")
+    search.add_argument('--rating', type=int, choices=range(0, 6), help="seulement les livres de ce rating")
+    search.add_argument('--min-price', type=float, help="prix minimal (inclus)")
+    search.add_argument('--max-price', type=float, help="prix maximal (inclus)")
+    search.add_argument('--in-stock', action='store_true', help="seulement les livres en stock")
+    search.add_argument('--limit', type=int, help="nombre de livres affichés (20 par défaut)")
+    search.add_argument('--rebuild', action='store_true', help="reconstruire l'index de recherche (output/search)")
+
+    serve = subparsers.add_parser('serve', parents=[common_options()], help="service résident : /report, /stats et /health en HTTP")
+    serve.add_argument('--host', help="adresse d'écoute (BOOKS_SERVICE_HOST, par défaut 127.0.0.1)")
+    serve.add_argument('--port', type=int, help="port d'écoute (BOOKS_SERVICE_PORT, par défaut 8765)")
+    serve.add_argument('--interval', type=float, help="secondes entre deux vérifications du CSV (BOOKS_WATCH_INTERVAL)")
+    serve.add_argument('--no-charts', action='store_true', help="ne pas redessiner les graphiques")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    # --stream remplace le rapport complet et les graphiques ; il n'a pas de sens pour les autres commandes
+    if args.stream and args.command not in STREAM_COMMANDS:
+        parser.error(f"--stream ne s'applique qu'aux commandes {', '.join(STREAM_COMMANDS)}, pas à '{args.command}'")
+
+    if args.clear_cache:
+        from functions.cache import invalidate_cache
+        invalidate_cache()
+
+    # exports JSON / CSV écrits à côté du rapport texte
+    if args.export:
+        from functions import output
+        output.EXPORT_FORMATS = args.export
+
+    # regroupements supplémentaires (analyse du catalogue complet : sans effet avec --stream / --incremental)
+    if args.group_by:
+        from functions import groupby
+        groupby.GROUP_BY = args.group_by
+
+    # taille des classements du rapport
+    if args.top is not None:
+        from functions import ranking
+        ranking.TOP_K = args.top
+
+    # historique des prix et des stocks (analyse complète : sans effet avec --stream / --incremental)
+    if args.history:
+        from functions import history
+        history.HISTORY_ENABLED = True
+
+    # quasi-doublons retirés au nettoyage (dans chaque paquet avec --stream / --incremental)
+    if args.near_duplicates is not None:
+        from functions import near_duplicates
+        near_duplicates.NEAR_DUPLICATE_THRESHOLD = args.near_duplicates
+
+    # --stream ne produit que le rapport texte
+    command = 'report' if args.stream else args.command
+    COMMANDS[command](args)
+
+    # fin des écritures en arrière-plan (rapport, exports, images) avant de rendre la main
+    from functions.output import flush_writes
+    flush_writes()
+    return 0
+
+
 if __name__ == "__main__":
-    run_visualizer()
\ No newline at end of file
+    sys.exit(main())
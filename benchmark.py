@@ -0,0 +1,210 @@
+#importation des bibliothèques nécessaires
+import argparse
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from functions.generator import generate_catalog
+from functions.manage import load_books
+from functions.data_cleaner import clean_data
+from functions.analyzer import analyze_data
+from functions.schema import bytes_per_row
+from functions.columnar import export_columnar, read_columnar
+from functions.visualizer import chart_columns, render_charts, create_distribution_plot, \
+    create_comparison_plot, create_relationship_plot
+
+# tailles de catalogue testées par défaut (nombre de lignes du CSV)
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+
+# marge tolérée avant de signaler une régression (0.25 = 25 % plus lent ou plus gourmand)
+DEFAULT_TOLERANCE = 0.25
+
+
+# commandes de app.py dont on mesure le démarrage à froid (nouveau processus Python)
+STARTUP_COMMANDS = ['report', 'all']
+APP_PATH = Path(__file__).resolve().parent / 'app.py'
+
+
+# tracemalloc ralentit fortement le code Python : le temps et la mémoire sont mesurés sur deux exécutions séparées
+PROFILE_MEMORY = True
+
+
+#fonction qui exécute une étape en mesurant temps et pic mémoire (sorties console masquées)
+def measure(stage, results, function, *args):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        value = function(*args)
+    seconds = time.perf_counter() - start
+
+    peak = 0
+    if PROFILE_MEMORY:
+        tracemalloc.start()
+        with contextlib.redirect_stdout(io.StringIO()):
+            function(*args)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    results[stage] = {'seconds': round(seconds, 4), 'peak_mb': round(peak / 1e6, 2)}
+    return value
+
+
+#fonction qui mesure toutes les étapes du pipeline pour un catalogue de 'rows' lignes
+def benchmark_size(rows, workdir, seed=0, charts=True, invalid_rate=0.0):
+    suffix = f"_invalid{invalid_rate}" if invalid_rate > 0 else ""
+    csv_path = Path(workdir) / f"books_{rows}{suffix}.csv"
+    if not csv_path.exists():
+        generate_catalog(csv_path, rows, seed=seed, invalid_rate=invalid_rate)
+
+    results = {}
+    books = measure('load_books', results, load_books, csv_path)
+    books_cleaned = measure('clean_data', results, clean_data, books)
+
+    # occupation mémoire par ligne : CSV brut, catalogue typé, et même catalogue en types par défaut (float64/int64/objets)
+    results['bytes_per_row_loaded'] = round(bytes_per_row(books), 1)
+    results['bytes_per_row_cleaned'] = round(bytes_per_row(books_cleaned), 1)
+    results['bytes_per_row_untyped'] = round(bytes_per_row(books_cleaned.astype(
+        {'title': object, 'image': object, 'price': 'float64', 'rating': 'int64', 'available': 'int64'})), 1)
+    del books
+    analysis_results = measure('analyze_data', results, analyze_data, books_cleaned)
+
+    books = analysis_results['books']
+
+    # export colonne (écriture), puis relecture complète du catalogue nettoyé à la place de load_books + clean_data
+    columnar_dir = Path(workdir) / f"columnar_{rows}{suffix}"
+    measure('export_columnar', results, export_columnar, books, analysis_results['by_rating'],
+            analysis_results['global_stats'], analysis_results['distribution'], columnar_dir)
+    measure('read_columnar', results, read_columnar, columnar_dir)
+
+    chart_data = measure('chart_data', results, lambda: (
+        analysis_results['distribution'],
+        chart_columns(books, ['price', 'available', 'rating'])
+    ))
+
+    if charts:
+        directory = Path(workdir) / 'visuals'
+        directory.mkdir(exist_ok=True)
+        measure('charts', results, render_charts, [
+            (create_distribution_plot, chart_data[0]),
+            (create_comparison_plot, analysis_results['by_rating']),
+            (create_relationship_plot, chart_data[1]),
+        ], None, directory)
+
+    results['rows_in'] = rows
+    results['rows_out'] = len(books_cleaned)
+    return results
+
+
+#fonction qui mesure le temps de démarrage à froid de chaque commande de app.py sur un petit catalogue
+#(meilleur temps sur 'repeats' exécutions ; cache désactivé pour toujours refaire le même travail)
+def measure_startup(workdir, seed=0, rows=1_000, repeats=3):
+    csv_path = Path(workdir) / f"books_{rows}.csv"
+    if not csv_path.exists():
+        generate_catalog(csv_path, rows, seed=seed)
+    env = dict(os.environ, BOOKS_CSV_FILE=str(csv_path), BOOKS_CACHE='0', BOOKS_METRICS='0')
+
+    results = {}
+    for command in STARTUP_COMMANDS:
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, str(APP_PATH), command], cwd=workdir, env=env,
+                           stdout=subprocess.DEVNULL, check=True)
+            timings.append(time.perf_counter() - start)
+        results[command] = {'seconds': round(min(timings), 4), 'peak_mb': 0.0}
+    return results
+
+
+#fonction qui compare les mesures à une référence et renvoie la liste des régressions
+def find_regressions(current, baseline, tolerance=DEFAULT_TOLERANCE):
+    regressions = []
+    for size, stages in current.items():
+        for stage, metrics in stages.items():
+            reference = baseline.get(size, {}).get(stage)
+            if not isinstance(metrics, dict) or not isinstance(reference, dict):
+                continue
+            for metric in ('seconds', 'peak_mb'):
+                # les très petites valeurs sont trop bruitées pour être comparées
+                if reference[metric] < 0.01:
+                    continue
+                if metrics[metric] > reference[metric] * (1 + tolerance):
+                    regressions.append(f"{size} lignes / {stage} / {metric} : "
+                                       f"{reference[metric]} -> {metrics[metric]}")
+    return regressions
+
+
+#fonction d'affichage des mesures sous forme de tableau
+def print_results(all_results):
+    print(f"{'Lignes':<12} {'Etape':<15} {'Temps (s)':<12} {'Pic mémoire (Mo)':<18}")
+    print("-" * 60)
+    for size, stages in all_results.items():
+        for stage, metrics in stages.items():
+            if isinstance(metrics, dict):
+                print(f"{size:<12} {stage:<15} {metrics['seconds']:<12.4f} {metrics['peak_mb']:<18.2f}")
+        if 'bytes_per_row_cleaned' in stages:
+            print(f"{size:<12} octets/ligne : brut {stages['bytes_per_row_loaded']}, "
+                  f"nettoyé {stages['bytes_per_row_untyped']} -> typé {stages['bytes_per_row_cleaned']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark du pipeline load_books -> clean_data -> analyze_data -> graphiques")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="nombres de lignes à tester (1000 à 10000000)")
+    parser.add_argument('--seed', type=int, default=0, help="graine du générateur de catalogue")
+    parser.add_argument('--workdir', help="dossier des CSV générés (réutilisés d'une exécution à l'autre)")
+    parser.add_argument('--invalid-rate', type=float, default=0.0, help="part de valeurs illisibles par colonne (flux sale, ex. 0.2)")
+    parser.add_argument('--no-charts', action='store_true', help="ne pas mesurer le rendu des graphiques")
+    parser.add_argument('--no-memory', action='store_true', help="ne mesurer que les temps (pas de seconde exécution sous tracemalloc)")
+    parser.add_argument('--startup', action='store_true', help="mesurer aussi le démarrage à froid de 'app.py report' et 'app.py all'")
+    parser.add_argument('--save-baseline', help="fichier JSON où enregistrer les mesures comme référence")
+    parser.add_argument('--compare', help="fichier JSON de référence pour détecter les régressions")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE, help="marge tolérée (0.25 = 25 %%)")
+    args = parser.parse_args(argv)
+
+    global PROFILE_MEMORY
+    PROFILE_MEMORY = not args.no_memory
+
+    workdir = Path(args.workdir or tempfile.mkdtemp(prefix='speakta_bench_')).resolve()
+    workdir.mkdir(parents=True, exist_ok=True)
+    # chemins relatifs au dossier courant de l'appel, avant le changement de dossier
+    save_baseline = Path(args.save_baseline).resolve() if args.save_baseline else None
+    compare = Path(args.compare).resolve() if args.compare else None
+
+    # le rapport texte d'analyze_data est écrit dans le dossier de travail, pas dans le projet
+    previous_dir = os.getcwd()
+    os.chdir(workdir)
+    try:
+        all_results = {}
+        for rows in args.sizes:
+            all_results[str(rows)] = benchmark_size(rows, workdir, seed=args.seed, charts=not args.no_charts,
+                                                    invalid_rate=args.invalid_rate)
+        if args.startup:
+            all_results['startup'] = measure_startup(workdir, seed=args.seed)
+    finally:
+        os.chdir(previous_dir)
+
+    print_results(all_results)
+
+    if save_baseline:
+        save_baseline.write_text(json.dumps(all_results, indent=2), encoding='utf-8')
+        print(f"\nRéférence enregistrée : {save_baseline}")
+
+    if compare:
+        baseline = json.loads(compare.read_text(encoding='utf-8'))
+        regressions = find_regressions(all_results, baseline, args.tolerance)
+        if regressions:
+            print("\nRÉGRESSIONS DÉTECTÉES :")
+            for regression in regressions:
+                print(f"  - {regression}")
+            return 1
+        print("\nAucune régression par rapport à la référence.")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,21 @@
 #importat des bibliothèques nécessaires
 from .data_cleaner import clean_data
-from .manage import load_books
+from .manage import load_books, load_books_chunks
+from .metrics import stage
+from .groupby import DIMENSIONS, dimension_codes, group_by, compute_groups, format_group_table
+from .schema import column_values
+from .output import submit_write, export_statistics
+from .columnar import columnar_export_enabled, export_columnar, new_columnar_export, write_columnar_part, \
+    finish_columnar_export, discard_columnar_export
+from .history import record_history
+from .sketches import new_distribution_sketch, compute_distribution_sketch, merge_distribution_sketches, \
+    finalize_distribution_sketch
+from .dedup_index import new_dedup_index, load_dedup_index, save_dedup_index
+from .ranking import new_ranking_accumulator, compute_rankings, merge_ranking_accumulators, finalize_rankings, \
+    format_rankings_report
+import numpy as np
 import pandas as pd
-import io 
 import sys
-from contextlib import redirect_stdout
 from pathlib import Path
 import traceback
 
@@ -12,11 +23,14 @@ import traceback
 #fonction pour analyser les livres par rating
 def analyze_by_rating(books):
     
+    # DataFrame : regroupement vectorisé par rating (un des regroupements de functions/groupby.py)
+    if isinstance(books, pd.DataFrame):
+        return group_by(books, 'rating')
+
     stats_by_rating = {}
     
     for rating in range(0, 6):  
         stats_by_rating[rating] = {
-            'books': [],           
             'total_price': 0.0,    
             'total_stock': 0,      
             'total_value': 0.0,    
@@ -36,7 +50,6 @@ def analyze_by_rating(books):
                 rating = 0
             
             # Ajout du livre à la catégorie correspondante
-            stats_by_rating[rating]['books'].append(book)
             stats_by_rating[rating]['total_price'] += price
             stats_by_rating[rating]['total_stock'] += stock
             stats_by_rating[rating]['total_value'] += (price * stock)
@@ -66,16 +79,14 @@ def analyze_by_rating(books):
     
     return results
 
-#fonction pour afficher les résultats de l'analyse sous forme de tableau
-def print_analysis_table(results):
+#fonction qui renvoie le tableau des résultats de l'analyse par rating (texte)
+def format_analysis_table(results):
     
-    print("\n" + "="*80)
-    print("ANALYSE DES LIVRES PAR RATING")
-    print("="*80)
+    lines = ["", "="*80, "ANALYSE DES LIVRES PAR RATING", "="*80]
     
     # En-tête du tableau
-    print(f"{'Rating':<10} {'Average_Price':<15} {'Total_Stock':<15} {'Value':<15} {'Book_Count':<15}")
-    print("-" * 80)
+    lines.append(f"{'Rating':<10} {'Average_Price':<15} {'Total_Stock':<15} {'Value':<15} {'Book_Count':<15}")
+    lines.append("-" * 80)
     
     # Lignes du tableau
     for rating in sorted(results.keys()):
@@ -87,17 +98,26 @@ def print_analysis_table(results):
         else:
             rating_display = str(rating)
         
-        print(f"{rating_display:<10} "
-              f"{data['Average_Price']:<15.2f} "
-              f"{data['Total_Stock']:<15} "
-              f"{data['Value']:<15.2f} "
-              f"{data['Book_Count']:<15}")
+        lines.append(f"{rating_display:<10} "
+                     f"{data['Average_Price']:<15.2f} "
+                     f"{data['Total_Stock']:<15} "
+                     f"{data['Value']:<15.2f} "
+                     f"{data['Book_Count']:<15}")
     
-    print("="*80 + "\n")
+    lines.append("="*80 + "\n")
+    return "\n".join(lines) + "\n"
+
+#fonction pour afficher les résultats de l'analyse sous forme de tableau
+def print_analysis_table(results):
+    print(format_analysis_table(results), end="")
 
 #fonction pour obtenir les statistiques globales
 def get_global_statistics(books):
     
+    # DataFrame : un seul passage vectorisé
+    if isinstance(books, pd.DataFrame):
+        return finalize_statistics_accumulator(compute_statistics(books, sketches=False))[1]
+
     try:
         total_books = len(books)
         
@@ -135,35 +155,180 @@ def get_global_statistics(books):
         print(f"Error during the treatment : {e}")
         return {}
 
+#fonction qui renvoie les statistiques globales (texte)
+def format_global_statistics(stats):
+
+    lines = [
+        "",
+        "="*60,
+        "📈 STATISTIQUES GLOBALES",
+        "="*60,
+        f"Nombre total de livres     : {stats.get('total_books', 0)}",
+        f"Prix moyen                   : {stats.get('average_price', 0):.2f} £",
+        f"Prix minimum                 : {stats.get('min_price', 0):.2f} £",
+        f"Prix maximum                 : {stats.get('max_price', 0):.2f} £",
+        f"Stock total                  : {stats.get('total_stock', 0)} livres",
+        f"Valeur totale du stock       : {stats.get('total_value', 0):.2f} £",
+        "="*60 + "\n"
+    ]
+    return "\n".join(lines) + "\n"
+
 #fonction pour afficher les statistiques globales
 def print_global_statistics(stats):
+    print(format_global_statistics(stats), end="")
+
+
+#fonction qui crée un accumulateur vide pour les statistiques par rating et globales
+def new_statistics_accumulator():
+    return {
+        'by_rating': {
+            rating: {'total_price': 0.0, 'total_stock': 0, 'total_value': 0.0, 'book_count': 0}
+            for rating in range(0, 6)
+        },
+        'total_books': 0,
+        'total_price': 0.0,
+        'total_stock': 0,
+        'total_value': 0.0,
+        'min_price': None,
+        'max_price': None,
+        # résumés fusionnables des distributions (quantiles, écart-type, histogrammes) des prix et des stocks
+        'sketches': new_distribution_sketch(),
+        # meilleurs livres de chaque classement (au plus k par classement : mémoire bornée)
+        'rankings': new_ranking_accumulator()
+    }
+
+
+#fonction qui calcule, en un seul passage NumPy, les sommes par rating et globales d'une DataFrame nettoyée
+#'sketches' : calculer aussi les résumés de distribution et les classements (inutiles pour les seuls totaux)
+def compute_statistics(books, sketches=True):
+    accumulator = new_statistics_accumulator()
+    if books is None or len(books) == 0:
+        return accumulator
+
+    prices = column_values(books, 'price').astype('float64', copy=False)
+    stocks = books['available'].to_numpy(dtype='float64')
+    values = prices * stocks
+
+    # ratings hors-limites -> catégorie 0 ; ratings invalides : comptés dans la catégorie 0 sans prix ni stock
+    # (comme la version liste)
+    codes, _, readable = dimension_codes(books, DIMENSIONS['rating'])
+    invalid = None if readable is None else ~readable
+
+    if invalid is not None and invalid.any():
+        valid = ~invalid
+        price_weights, stock_weights, value_weights = prices * valid, stocks * valid, values * valid
+    else:
+        price_weights, stock_weights, value_weights = prices, stocks, values
+
+    counts = np.bincount(codes, minlength=6)
+    price_sums = np.bincount(codes, weights=price_weights, minlength=6)
+    stock_sums = np.bincount(codes, weights=stock_weights, minlength=6)
+    value_sums = np.bincount(codes, weights=value_weights, minlength=6)
+
+    for rating in range(0, 6):
+        stats = accumulator['by_rating'][rating]
+        stats['total_price'] = float(price_sums[rating])
+        stats['total_stock'] = int(round(stock_sums[rating]))
+        stats['total_value'] = float(value_sums[rating])
+        stats['book_count'] = int(counts[rating])
+
+    # statistiques globales (les livres au rating invalide comptent aussi)
+    accumulator['total_books'] = len(books)
+    if price_weights is prices:
+        accumulator['total_price'] = float(price_sums.sum())
+        accumulator['total_stock'] = int(round(stock_sums.sum()))
+        accumulator['total_value'] = float(value_sums.sum())
+    else:
+        accumulator['total_price'] = float(prices.sum())
+        accumulator['total_stock'] = int(round(stocks.sum()))
+        accumulator['total_value'] = float(values.sum())
+
+    positive_prices = prices[prices > 0]
+    if len(positive_prices) > 0:
+        accumulator['min_price'] = float(positive_prices.min())
+    accumulator['max_price'] = float(prices.max())
+
+    if sketches:
+        accumulator['sketches'] = compute_distribution_sketch(prices, stocks, codes)
+        accumulator['rankings'] = compute_rankings(books, prices, stocks, codes)
+
+    return accumulator
+
+
+#fonction qui fusionne deux accumulateurs (paquets de lignes, fichiers, exécutions successives)
+def merge_statistics_accumulators(accumulator, other):
+
+    for rating, stats in other['by_rating'].items():
+        for key, value in stats.items():
+            accumulator['by_rating'][rating][key] += value
+
+    for key in ('total_books', 'total_price', 'total_stock', 'total_value'):
+        accumulator[key] += other[key]
+
+    if other['min_price'] is not None:
+        if accumulator['min_price'] is None or other['min_price'] < accumulator['min_price']:
+            accumulator['min_price'] = other['min_price']
+
+    if other['max_price'] is not None:
+        if accumulator['max_price'] is None or other['max_price'] > accumulator['max_price']:
+            accumulator['max_price'] = other['max_price']
+
+    merge_distribution_sketches(accumulator['sketches'], other['sketches'])
+    merge_ranking_accumulators(accumulator['rankings'], other['rankings'])
+
+    return accumulator
+
+
+#fonction qui ajoute un paquet de livres nettoyés (DataFrame) à l'accumulateur
+def update_statistics_accumulator(accumulator, books):
+    return merge_statistics_accumulators(accumulator, compute_statistics(books))
+
+
+#fonction qui transforme l'accumulateur en résultats (même format que analyze_by_rating / get_global_statistics)
+def finalize_statistics_accumulator(accumulator):
+
+    results_by_rating = {}
+    for rating, stats in accumulator['by_rating'].items():
+        book_count = stats['book_count']
+        avg_price = stats['total_price'] / book_count if book_count > 0 else 0.0
+
+        results_by_rating[rating] = {
+            'Rating': rating,
+            'Average_Price': round(avg_price, 2),
+            'Total_Stock': stats['total_stock'],
+            'Value': round(stats['total_value'], 2),
+            'Book_Count': book_count
+        }
 
-    print("\n" + "="*60)
-    print("📈 STATISTIQUES GLOBALES")
-    print("="*60)
-    print(f"Nombre total de livres     : {stats.get('total_books', 0)}")
-    print(f"Prix moyen                   : {stats.get('average_price', 0):.2f} £")
-    print(f"Prix minimum                 : {stats.get('min_price', 0):.2f} £")
-    print(f"Prix maximum                 : {stats.get('max_price', 0):.2f} £")
-    print(f"Stock total                  : {stats.get('total_stock', 0)} livres")
-    print(f"Valeur totale du stock       : {stats.get('total_value', 0):.2f} £")
-    print("="*60 + "\n")
+    total_books = accumulator['total_books']
+    if total_books == 0:
+        global_stats = get_global_statistics([])
+    else:
+        min_price = accumulator['min_price'] if accumulator['min_price'] is not None else 0.0
+        global_stats = {
+            'total_books': total_books,
+            'average_price': round(accumulator['total_price'] / total_books, 2),
+            'total_stock': accumulator['total_stock'],
+            'total_value': round(accumulator['total_value'], 2),
+            'min_price': round(min_price, 2),
+            'max_price': round(accumulator['max_price'], 2)
+        }
+
+    return results_by_rating, global_stats
 
 
-#fonction pour sauvegarder le rapport d'analyse dans un fichier texte
+#fonction pour sauvegarder le rapport d'analyse dans un fichier texte (écriture atomique par le fil d'écriture)
 def save_analysis_to_file(analysis_output, directory="output", filename="analysis_report.txt"):
     try:
 
-        output_dir = Path(directory)
-        output_dir.mkdir(parents=True, exist_ok=True)
-        filepath = output_dir / filename
+        filepath = Path(directory) / filename
         content_to_write = (
             "Rapport d'Analyse des Livres\n"
             + "=" * 35 
             + "\n\n"
             + analysis_output
         )
-        filepath.write_text(content_to_write, encoding='utf-8')
+        submit_write(filepath, content_to_write)
         
         print(f"\nFiles save in : **{filepath}**")
         
@@ -171,8 +336,67 @@ def save_analysis_to_file(analysis_output, directory="output", filename="analysi
         print(f"Error during the saving : {e}")
 
 
-#fonction principale pour analyser les données des livres
-def analyze_data(books):
+#fonction qui renvoie les statistiques de distribution (quantiles, écart-type, histogrammes) de l'accumulateur
+def finalize_distribution(accumulator):
+    return finalize_distribution_sketch(accumulator['sketches'])
+
+
+#fonction qui renvoie les classements de l'accumulateur (meilleurs livres par valeur, prix, stock)
+def finalize_ranking(accumulator):
+    return finalize_rankings(accumulator['rankings'])
+
+
+#fonction qui renvoie le tableau des distributions des prix et des stocks, global et par rating (texte)
+def format_distribution_report(distribution):
+
+    lines = ["", "="*80, "DISTRIBUTION DES PRIX ET DES STOCKS", "="*80]
+    lines.append(f"{'Mesure':<8} {'Rating':<12} {'Mediane':<10} {'P90':<10} {'P99':<10} "
+                 f"{'Ecart-type':<11} {'Min':<8} {'Max':<8}")
+    lines.append("-" * 80)
+
+    for name, label in (('price', 'Prix'), ('stock', 'Stock')):
+        rows = [('Global', distribution[name]['overall'])]
+        rows += [("0 (Erreur)" if rating == 0 else str(rating), summary)
+                 for rating, summary in sorted(distribution[name]['by_rating'].items()) if summary['count'] > 0]
+        for rating_display, summary in rows:
+            lines.append(f"{label:<8} {rating_display:<12} "
+                         f"{summary['median']:<10.2f} {summary['p90']:<10.2f} {summary['p99']:<10.2f} "
+                         f"{summary['std']:<11.2f} {summary['min']:<8.2f} {summary['max']:<8.2f}")
+
+    lines.append("="*80 + "\n")
+    return "\n".join(lines) + "\n"
+
+
+#fonction qui renvoie le texte du rapport (tableau par rating, statistiques globales, distributions, classements
+#et regroupements demandés)
+def format_analysis_report(results_by_rating, global_stats, distribution=None, groups=None, rankings=None):
+    analysis_output = format_analysis_table(results_by_rating) + format_global_statistics(global_stats)
+    if distribution:
+        analysis_output += format_distribution_report(distribution)
+    if rankings:
+        analysis_output += format_rankings_report(rankings)
+    for name, results in (groups or {}).items():
+        analysis_output += format_group_table(results, name)
+    return analysis_output
+
+
+#fonction pour afficher le rapport sur la console et le sauvegarder dans le dossier 'output'
+#(écritures faites en arrière-plan : le calcul suivant n'attend pas le disque)
+def write_analysis_report(results_by_rating, global_stats, directory="output", distribution=None, groups=None,
+                          rankings=None):
+
+    analysis_output = format_analysis_report(results_by_rating, global_stats, distribution, groups, rankings)
+
+    # Impression du rapport sur la console
+    sys.stdout.write(analysis_output)
+
+    # Sauvegarde du rapport dans le fichier TXT, et exports JSON / CSV demandés, dans le dossier 'output'
+    save_analysis_to_file(analysis_output, directory=directory)
+    export_statistics(results_by_rating, global_stats, directory=directory, distribution=distribution, groups=groups)
+
+
+#fonction principale pour analyser les données des livres ('report' : affichage et sauvegarde du rapport texte)
+def analyze_data(books, report=True):
     
     try:
         #Gestion DataFrame ou liste vide
@@ -180,9 +404,6 @@ def analyze_data(books):
             if books.empty:
                 print("data not found (DataFrame empty)")
                 return {}
-            # Conversio de la DataFrame en liste de dictionnaires
-            books = books.to_dict('records')
-            print(f"DataFrame converti en liste de {len(books)} livres")
         elif isinstance(books, list):
             if len(books) == 0:
                 print("data not found (list empty)")
@@ -193,29 +414,42 @@ def analyze_data(books):
         
         print(f"\nDÉBUT DE L'ANALYSE - {len(books)} livres")
         
-        # Utilisation d'un buffer pour capturer tout impression
-        f = io.StringIO()
-        with redirect_stdout(f):
-            results_by_rating = analyze_by_rating(books)
-            print_analysis_table(results_by_rating)
-            
-            # Statistiques globales 
-            global_stats = get_global_statistics(books)
-            print_global_statistics(global_stats)
-            
-        # Récupération du contenu du buffer
-        analysis_output = f.getvalue()
-        
-        # Impression du contenu capturé sur la console
-        sys.stdout.write(analysis_output)
-        
-        # Sauvegarde le contenu capturé dans le fichier TXT, dans le dossier 'output'
-        save_analysis_to_file(analysis_output, directory="output") 
+        # DataFrame : statistiques par rating et globales calculées dans le même passage
+        with stage('aggregate', rows_in=len(books)) as record:
+            if isinstance(books, pd.DataFrame):
+                accumulator = compute_statistics(books)
+                results_by_rating, global_stats = finalize_statistics_accumulator(accumulator)
+            else:
+                results_by_rating = analyze_by_rating(books)
+                global_stats = get_global_statistics(books)
+                books = pd.DataFrame(books)
+                accumulator = compute_statistics(books)
+            distribution = finalize_distribution(accumulator)
+            rankings = finalize_ranking(accumulator)
+            record['rows_out'] = len(results_by_rating)
+
+        # regroupements supplémentaires demandés (--group-by price_band, rating+price_band, ...)
+        with stage('group_by', rows_in=len(books)):
+            groups = compute_groups(books)
+
+        if report:
+            with stage('write_report'):
+                write_analysis_report(results_by_rating, global_stats, distribution=distribution, groups=groups,
+                                      rankings=rankings)
+            # catalogue nettoyé et agrégats en colonnes, par rating (--export columnar)
+            if columnar_export_enabled():
+                export_columnar(books, results_by_rating, global_stats, distribution)
+            # instantané du jour ajouté à l'historique des prix et des stocks (--history)
+            record_history(books)
         
         return {
             'by_rating': results_by_rating,
             'global_stats': global_stats,
-            'books_list': books  
+            'distribution': distribution,
+            'groups': groups,
+            'rankings': rankings,
+            # catalogue nettoyé partagé (une seule copie en mémoire) pour les graphiques
+            'books': books
         }
         
     except Exception as e:
@@ -224,3 +458,60 @@ def analyze_data(books):
         return {}
 
 
+#fonction pour analyser le fichier 'books.csv' par paquets (mémoire bornée, même rapport que analyze_data)
+#'dedup_index_path' : index de dédoublonnage sauvegardé, pour ignorer les livres déjà vus lors d'exécutions précédentes
+def analyze_data_streaming(chunk_size=None, path=None, dedup_index_path=None):
+
+    export = None
+    try:
+        accumulator = new_statistics_accumulator()
+        if dedup_index_path and Path(dedup_index_path).exists():
+            seen = load_dedup_index(dedup_index_path)
+        else:
+            seen = new_dedup_index()
+        chunk_count = 0
+        # export colonne écrit paquet par paquet (un fichier par paquet et par rating)
+        export = new_columnar_export() if columnar_export_enabled() else None
+
+        for chunk in load_books_chunks(chunk_size, path=path):
+            books_cleaned = clean_data(chunk, seen=seen)
+            with stage('aggregate', rows_in=len(books_cleaned)):
+                update_statistics_accumulator(accumulator, books_cleaned)
+            if export is not None:
+                with stage('export_columnar', rows_in=len(books_cleaned)):
+                    write_columnar_part(export, books_cleaned)
+            chunk_count += 1
+
+        if dedup_index_path:
+            save_dedup_index(seen, dedup_index_path)
+
+        if accumulator['total_books'] == 0:
+            print("data not found (no chunk to analyze)")
+            if export is not None:
+                discard_columnar_export(export)
+            return {}
+
+        print(f"\nDÉBUT DE L'ANALYSE - {accumulator['total_books']} livres ({chunk_count} paquets)")
+
+        results_by_rating, global_stats = finalize_statistics_accumulator(accumulator)
+        distribution = finalize_distribution(accumulator)
+        rankings = finalize_ranking(accumulator)
+        with stage('write_report'):
+            write_analysis_report(results_by_rating, global_stats, distribution=distribution, rankings=rankings)
+        if export is not None:
+            target = finish_columnar_export(export, results_by_rating, global_stats, distribution)
+            print(f"Export colonne ({export['format']}) : **{target}**")
+
+        return {
+            'by_rating': results_by_rating,
+            'global_stats': global_stats,
+            'distribution': distribution,
+            'rankings': rankings
+        }
+
+    except Exception as e:
+        print(f"Error : {e}")
+        traceback.print_exc()
+        if export is not None:
+            discard_columnar_export(export)
+        return {}
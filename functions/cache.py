@@ -0,0 +1,176 @@
+#importation des bibliothèques nécessaires
+import hashlib
+import json
+import os
+from pathlib import Path
+import pandas as pd
+from .data_cleaner import clean_data, CLEANER_VERSION
+from . import near_duplicates
+from .manage import load_books, csv_file
+from .metrics import stage
+
+# répertoire du cache des données nettoyées
+CACHE_DIR = Path(os.environ.get('BOOKS_CACHE_DIR', 'output/cache'))
+
+# limites du cache : taille totale et nombre d'entrées (les plus anciennes sont supprimées)
+CACHE_MAX_BYTES = int(os.environ.get('BOOKS_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+CACHE_MAX_ENTRIES = int(os.environ.get('BOOKS_CACHE_MAX_ENTRIES', 5))
+
+# BOOKS_CACHE=0 désactive complètement le cache
+CACHE_ENABLED = os.environ.get('BOOKS_CACHE', '1') != '0'
+
+# format binaire colonne : Feather (Arrow) si pyarrow est installé, sinon pickle pandas
+try:
+    import pyarrow  # noqa: F401
+    CACHE_FORMAT = 'feather'
+except ImportError:
+    CACHE_FORMAT = 'pkl'
+
+
+#fonction qui calcule l'empreinte du fichier source : chemin, taille, date de modification et contenu
+def file_fingerprint(path):
+    path = Path(path).resolve()
+    stat = path.stat()
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+
+    return {
+        'path': str(path),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'sha256': digest.hexdigest(),
+        'cleaner_version': CLEANER_VERSION,
+        # le seuil des quasi-doublons change le résultat du nettoyage
+        'near_duplicates': near_duplicates.NEAR_DUPLICATE_THRESHOLD
+    }
+
+
+#fonction qui transforme une empreinte en clé de cache
+def cache_key(fingerprint):
+    encoded = json.dumps(fingerprint, sort_keys=True).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()[:32]
+
+
+#fonction qui renvoie le chemin du fichier de cache d'une clé
+def _entry_path(key, directory):
+    return Path(directory) / f"{key}.{CACHE_FORMAT}"
+
+
+#fonction qui renvoie les fichiers des entrées du cache : seuls les noms de clé (32 caractères hexadécimaux,
+#cache_key) sont pris, un autre fichier du dossier (ex. un état .pkl) n'est jamais supprimé
+def _cache_entries(directory):
+    return list(Path(directory).glob('[0-9a-f]' * 32 + f".{CACHE_FORMAT}"))
+
+
+#fonction de lecture d'une entrée du cache (None si absente ou illisible)
+def read_cache(key, directory=None):
+    entry = _entry_path(key, directory or CACHE_DIR)
+    if not entry.exists():
+        return None
+
+    try:
+        if CACHE_FORMAT == 'feather':
+            books = pd.read_feather(entry)
+        else:
+            books = pd.read_pickle(entry)
+
+        # mise à jour de la date d'accès pour l'éviction (la plus ancienne part en premier)
+        os.utime(entry)
+        return books
+
+    except Exception as e:
+        print(f"Cache illisible, il sera reconstruit : {e}")
+        entry.unlink(missing_ok=True)
+        return None
+
+
+#fonction d'écriture d'une entrée du cache (fichier temporaire puis renommage)
+def write_cache(key, books, fingerprint=None, directory=None):
+    directory = Path(directory or CACHE_DIR)
+
+    try:
+        directory.mkdir(parents=True, exist_ok=True)
+        entry = _entry_path(key, directory)
+        temporary = entry.with_name(entry.name + '.tmp')
+
+        if CACHE_FORMAT == 'feather':
+            books.reset_index(drop=True).to_feather(temporary)
+        else:
+            books.to_pickle(temporary)
+        os.replace(temporary, entry)
+
+        if fingerprint is not None:
+            entry.with_suffix('.json').write_text(json.dumps(fingerprint, indent=2), encoding='utf-8')
+
+        evict_cache(directory)
+
+    except Exception as e:
+        print(f"Error during the saving of the cache : {e}")
+
+
+#fonction qui supprime les entrées les plus anciennes au-delà des limites de taille et de nombre
+def evict_cache(directory=None, max_bytes=None, max_entries=None):
+    directory = Path(directory or CACHE_DIR)
+    max_bytes = CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    max_entries = CACHE_MAX_ENTRIES if max_entries is None else max_entries
+
+    if not directory.exists():
+        return
+
+    entries = sorted(_cache_entries(directory), key=lambda e: e.stat().st_mtime, reverse=True)
+    total_bytes = 0
+
+    for position, entry in enumerate(entries):
+        total_bytes += entry.stat().st_size
+        if position >= max_entries or total_bytes > max_bytes:
+            entry.unlink(missing_ok=True)
+            entry.with_suffix('.json').unlink(missing_ok=True)
+
+
+#fonction qui vide le cache (invalidation explicite)
+def invalidate_cache(directory=None):
+    directory = Path(directory or CACHE_DIR)
+    if not directory.exists():
+        return 0
+
+    removed = 0
+    for entry in _cache_entries(directory):
+        entry.unlink(missing_ok=True)
+        entry.with_suffix('.json').unlink(missing_ok=True)
+        removed += 1
+
+    print(f"Cache vidé : {removed} entrée(s) supprimée(s)")
+    return removed
+
+
+#fonction principale : livres nettoyés depuis le cache, ou chargement + nettoyage puis mise en cache
+def load_clean_books(path=None, use_cache=None, refresh=False, directory=None):
+    path = Path(path) if path else csv_file
+    use_cache = CACHE_ENABLED if use_cache is None else use_cache
+
+    if not use_cache or not path.exists():
+        return clean_data(load_books(path))
+
+    try:
+        with stage('cache_fingerprint'):
+            fingerprint = file_fingerprint(path)
+            key = cache_key(fingerprint)
+    except OSError as e:
+        print(f"Error during the fingerprint of {path} : {e}")
+        return clean_data(load_books(path))
+
+    if not refresh:
+        with stage('cache_read') as record:
+            books = read_cache(key, directory)
+            record['rows_out'] = None if books is None else len(books)
+        if books is not None:
+            print(f"Données nettoyées chargées depuis le cache ({len(books)} livres).")
+            return books
+
+    books = clean_data(load_books(path))
+    if isinstance(books, pd.DataFrame) and not books.empty:
+        write_cache(key, books, fingerprint, directory)
+    return books
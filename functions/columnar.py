@@ -0,0 +1,302 @@
+#importation des bibliothèques nécessaires
+import json
+import os
+import shutil
+from datetime import datetime, timezone
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from . import output
+from .schema import CATALOG_SCHEMA, TEXT_COLUMNS, apply_catalog_schema, column_values
+from .metrics import stage
+
+# dossier de l'export colonne du catalogue nettoyé et des agrégats (lisible par d'autres outils sans refaire le nettoyage)
+COLUMNAR_DIR = Path(os.environ.get('BOOKS_COLUMNAR_DIR', 'output/columnar'))
+
+# format des fichiers : Arrow IPC (Feather v2, non compressé pour être lu par mmap) si pyarrow est installé,
+# sinon un fichier .npy par colonne (textes : un bloc UTF-8 et un tableau de positions)
+try:
+    import pyarrow
+    import pyarrow.feather
+    COLUMNAR_FORMAT = 'arrow'
+except ImportError:
+    COLUMNAR_FORMAT = 'npy'
+
+# version du format du dossier (manifest.json)
+COLUMNAR_VERSION = 1
+
+# séparateur des textes dans le bloc UTF-8 (absent des textes nettoyés)
+TEXT_SEPARATOR = '\x00'
+
+
+#fonction qui indique si l'export colonne est demandé (--export columnar ou BOOKS_EXPORT=columnar)
+def columnar_export_enabled():
+    return 'columnar' in output.EXPORT_FORMATS
+
+
+#fonction qui renvoie la catégorie de rating de chaque livre (0 = rating invalide ou hors-limites, comme l'analyse)
+def rating_codes(books):
+    codes = np.asarray(books['rating'], dtype='int64')
+    return np.where((codes < 0) | (codes > 5), 0, codes)
+
+
+# --- Écriture d'une colonne / d'un fichier ---
+
+#fonction qui écrit une colonne texte : bloc UTF-8 (textes séparés par TEXT_SEPARATOR) et position de début de chaque texte
+#le texte i est bloc[offsets[i]:offsets[i + 1] - 1] ; une valeur manquante est écrite vide et notée dans <nom>.null.npy
+def write_text_column(directory, name, values):
+    missing = pd.isna(values)
+    if missing.any():
+        values = np.where(missing, '', values)
+    separator = TEXT_SEPARATOR.encode('utf-8')
+    encoded = [str(value).encode('utf-8').replace(separator, b'') for value in values]
+
+    blob = separator.join(encoded)
+    offsets = np.zeros(len(encoded) + 1, dtype='int64')
+    np.cumsum(np.fromiter(map(len, encoded), dtype='int64', count=len(encoded)) + 1, out=offsets[1:])
+
+    (directory / f"{name}.utf8").write_bytes(blob)
+    np.save(directory / f"{name}.offsets.npy", offsets)
+    if missing.any():
+        np.save(directory / f"{name}.null.npy", np.asarray(missing, dtype=bool))
+
+
+#fonction qui écrit un tableau (DataFrame) au format de l'export ; renvoie le chemin relatif écrit
+def _write_table(df, path):
+    if COLUMNAR_FORMAT == 'arrow':
+        path = path.with_suffix('.arrow')
+        path.parent.mkdir(parents=True, exist_ok=True)
+        table = pyarrow.Table.from_pandas(df.reset_index(drop=True), preserve_index=False)
+        # un seul bloc par fichier : chaque colonne numérique se lit ensuite sans copie
+        pyarrow.feather.write_feather(table, path, compression='uncompressed', chunksize=max(1, len(df)))
+        return path
+
+    path.mkdir(parents=True, exist_ok=True)
+    for name in df.columns:
+        if name in TEXT_COLUMNS or df[name].dtype == object:
+            write_text_column(path, name, df[name].to_numpy(dtype=object))
+        else:
+            np.save(path / f"{name}.npy", df[name].to_numpy())
+    return path
+
+
+# --- Lecture d'une colonne / d'un fichier (mmap) ---
+
+#fonction qui lit une colonne texte écrite par write_text_column (seule étape de décodage de l'export)
+def read_text_column(directory, name):
+    offsets = np.load(directory / f"{name}.offsets.npy", mmap_mode='r')
+    if len(offsets) == 1:
+        return np.empty(0, dtype=object)
+
+    # un seul décodage et un seul découpage du bloc (pas de boucle Python par texte)
+    values = np.array((directory / f"{name}.utf8").read_bytes().decode('utf-8').split(TEXT_SEPARATOR), dtype=object)
+    if (directory / f"{name}.null.npy").exists():
+        values[np.load(directory / f"{name}.null.npy")] = None
+    return values
+
+
+#fonction qui ouvre un tableau de l'export : colonnes numériques projetées en mémoire (mmap, sans copie ni lecture),
+#colonnes texte décodées seulement si elles sont demandées ; renvoie {nom de colonne: tableau NumPy}
+def _read_table(path, columns=None):
+    if path.suffix == '.arrow':
+        table = pyarrow.feather.read_table(path, columns=columns, memory_map=True)
+        arrays = {}
+        for name in table.column_names:
+            column = table.column(name)
+            if column.num_chunks == 1 and column.null_count == 0 and pyarrow.types.is_primitive(column.type):
+                arrays[name] = column.chunk(0).to_numpy(zero_copy_only=True)
+            else:
+                arrays[name] = column.to_numpy()
+        return arrays
+
+    arrays = {}
+    names = columns or [entry.name.split('.')[0] for entry in sorted(path.iterdir())
+                        if entry.suffix in ('.npy', '.utf8') and entry.name.count('.') == 1]
+    for name in dict.fromkeys(names):
+        if (path / f"{name}.npy").exists():
+            arrays[name] = np.load(path / f"{name}.npy", mmap_mode='r')
+        elif (path / f"{name}.utf8").exists():
+            arrays[name] = read_text_column(path, name)
+    return arrays
+
+
+# --- Export du catalogue ---
+
+#fonction qui prépare un export : fichiers écrits dans un dossier temporaire, mis en place d'un bloc à la fin
+#(un lecteur voit l'ancien export ou le nouveau complet, jamais un mélange des deux)
+def new_columnar_export(directory=None):
+    target = Path(directory or COLUMNAR_DIR)
+    staging = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir(parents=True)
+    return {
+        'directory': target,
+        'staging': staging,
+        'format': COLUMNAR_FORMAT,
+        'partitions': {rating: [] for rating in range(0, 6)},
+        'schema': {},
+        'rows': 0
+    }
+
+
+#fonction qui ajoute un paquet de livres nettoyés à l'export, rangés par rating : catalog/rating=<r>/part-<n>
+#(plusieurs paquets -> plusieurs fichiers par rating, par exemple en mode --stream)
+def write_columnar_part(export, books):
+    if books is None or len(books) == 0:
+        return export
+
+    books = apply_catalog_schema(books[[name for name in books.columns if name in CATALOG_SCHEMA]])
+    codes = rating_codes(books)
+
+    # un seul tri pour tous les ratings (ordre des livres conservé dans chaque rating)
+    order = np.argsort(codes, kind='stable')
+    bounds = np.searchsorted(codes[order], np.arange(0, 7))
+    for rating in range(0, 6):
+        rows = order[bounds[rating]:bounds[rating + 1]]
+        if len(rows) == 0:
+            continue
+        parts = export['partitions'][rating]
+        relative = Path('catalog') / f"rating={rating}" / f"part-{len(parts):05d}"
+        written = _write_table(books.iloc[rows], export['staging'] / relative)
+        parts.append({'path': str(written.relative_to(export['staging'])), 'rows': int(len(rows))})
+
+    # schéma écrit dans le manifest (types numériques élargis si un paquet en demande plus, ex. stock en uint32)
+    for name, dtype in books.dtypes.items():
+        if name in TEXT_COLUMNS:
+            export['schema'][name] = 'string'
+        else:
+            known = export['schema'].get(name)
+            export['schema'][name] = str(np.promote_types(known, dtype) if known else dtype)
+
+    export['rows'] += len(books)
+    return export
+
+
+#fonction qui termine l'export : agrégats (par rating, distributions), manifest.json, puis mise en place du dossier
+def finish_columnar_export(export, results_by_rating, global_stats, distribution=None):
+    staging, target = export['staging'], export['directory']
+    try:
+        aggregates = {}
+        by_rating = pd.DataFrame([results_by_rating[rating] for rating in sorted(results_by_rating)])
+        aggregates['by_rating'] = str(_write_table(by_rating, staging / 'aggregates' / 'by_rating').relative_to(staging))
+        if distribution:
+            # rating -1 : ligne globale (colonne entière)
+            rows = pd.DataFrame(output.distribution_rows(distribution, overall=-1), columns=output.DISTRIBUTION_COLUMNS)
+            aggregates['distribution'] = str(_write_table(rows, staging / 'aggregates' / 'distribution').relative_to(staging))
+
+        manifest = {
+            'version': COLUMNAR_VERSION,
+            'format': export['format'],
+            'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'rows': export['rows'],
+            'schema': export['schema'],
+            'partitioning': 'rating',
+            'partitions': {str(rating): parts for rating, parts in export['partitions'].items() if parts},
+            'aggregates': aggregates,
+            'global_stats': global_stats,
+            'distribution': distribution
+        }
+        (staging / 'manifest.json').write_text(json.dumps(manifest, default=output.json_default, ensure_ascii=False,
+                                                          indent=2), encoding='utf-8')
+
+        # mise en place : l'ancien export est renommé puis supprimé (un lecteur qui l'a ouvert par mmap le garde)
+        previous = target.with_name(f".{target.name}.{os.getpid()}.old")
+        if target.exists():
+            os.replace(target, previous)
+        os.replace(staging, target)
+        shutil.rmtree(previous, ignore_errors=True)
+        return target
+
+    except BaseException:
+        discard_columnar_export(export)
+        raise
+
+
+#fonction qui abandonne un export en cours (dossier temporaire supprimé, ancien export conservé)
+def discard_columnar_export(export):
+    shutil.rmtree(export['staging'], ignore_errors=True)
+
+
+#fonction qui exporte un catalogue nettoyé complet et ses agrégats
+def export_columnar(books, results_by_rating, global_stats, distribution=None, directory=None):
+    try:
+        with stage('export_columnar', rows_in=len(books)):
+            export = new_columnar_export(directory)
+            write_columnar_part(export, books)
+            target = finish_columnar_export(export, results_by_rating, global_stats, distribution)
+        print(f"Export colonne ({export['format']}) : **{target}**")
+        return target
+    except Exception as e:
+        print(f"Error during the columnar export : {e}")
+        return None
+
+
+# --- Lecture de l'export ---
+
+#fonction qui lit le manifest d'un export (dictionnaire vide si absent ou illisible)
+def read_columnar_manifest(directory=None):
+    try:
+        return json.loads((Path(directory or COLUMNAR_DIR) / 'manifest.json').read_text(encoding='utf-8'))
+    except (OSError, ValueError) as e:
+        print(f"Columnar export not readable : {e}")
+        return {}
+
+
+#fonction qui ouvre les colonnes du catalogue exporté : {nom: tableau NumPy}
+#un seul fichier lu -> tableaux projetés en mémoire sans copie ; plusieurs (ratings, paquets) -> une copie des colonnes demandées
+def open_columnar(directory=None, ratings=None, columns=None):
+    directory = Path(directory or COLUMNAR_DIR)
+    manifest = read_columnar_manifest(directory)
+    if not manifest:
+        return {}
+
+    # colonnes dans l'ordre du catalogue nettoyé (ordre du schéma du manifest)
+    columns = columns or list(manifest['schema'])
+    parts = [part for rating, rating_parts in sorted(manifest['partitions'].items(), key=lambda item: int(item[0]))
+             if ratings is None or int(rating) in ratings for part in rating_parts]
+    tables = [_read_table(directory / part['path'], columns) for part in parts]
+    if not tables:
+        return {name: np.empty(0) for name in columns}
+    if len(tables) == 1:
+        return tables[0]
+    return {name: np.concatenate([table[name] for table in tables]) for name in tables[0]}
+
+
+#fonction qui lit le catalogue exporté en DataFrame (schéma du catalogue nettoyé)
+def read_columnar(directory=None, ratings=None, columns=None):
+    arrays = open_columnar(directory, ratings, columns)
+    books = pd.DataFrame(arrays)
+    return apply_catalog_schema(books)
+
+
+#fonction qui lit les agrégats exportés : (résultats par rating, statistiques globales, distributions)
+#(mêmes formats que analyze_data : les graphiques peuvent être dessinés sans relire le CSV)
+def read_columnar_aggregates(directory=None):
+    directory = Path(directory or COLUMNAR_DIR)
+    manifest = read_columnar_manifest(directory)
+    if not manifest:
+        return {}, {}, {}
+
+    table = _read_table(directory / manifest['aggregates']['by_rating'])
+    results_by_rating = {}
+    for position, rating in enumerate(table['Rating']):
+        results_by_rating[int(rating)] = {
+            'Rating': int(rating),
+            'Average_Price': float(table['Average_Price'][position]),
+            'Total_Stock': int(table['Total_Stock'][position]),
+            'Value': float(table['Value'][position]),
+            'Book_Count': int(table['Book_Count'][position])
+        }
+
+    # clés JSON en texte : ratings remis en entiers
+    distribution = manifest.get('distribution') or {}
+    for entry in distribution.values():
+        entry['by_rating'] = {int(rating): summary for rating, summary in entry['by_rating'].items()}
+        entry['histogram']['by_rating'] = {int(rating): counts for rating, counts in entry['histogram']['by_rating'].items()}
+    return results_by_rating, manifest['global_stats'], distribution
+
+
+#fonction qui renvoie les colonnes du catalogue exporté utiles aux graphiques (prix remis en float64 au centime)
+def columnar_chart_columns(directory=None, names=('price', 'available', 'rating')):
+    arrays = open_columnar(directory, columns=list(names))
+    return {name: column_values(arrays, name) for name in names if name in arrays}
@@ -1,6 +1,15 @@
 #importation des modules nécessaires
-import re
+import numpy as np
 import pandas as pd
+from .metrics import stage
+from . import near_duplicates
+from .dedup_index import filter_new_keys
+from .schema import apply_catalog_schema
+from .parsers import parse_price, parse_rating, parse_available, parse_text_column, \
+    new_error_tally, record_parse_error, error_count, format_error_tally
+
+# version du nettoyage : à incrémenter dès que le résultat de clean_data change (invalide le cache)
+CLEANER_VERSION = 3
 
 #fonction pour nettoyer les espaces blancs dans les données des livres
 def clean_whitespace(books):
@@ -61,84 +70,46 @@ def handle_missing_values(books):
 
 
 #fonction pour corriger les formats des données des livres
-def fix_formats(books):
+#les valeurs invalides sont comptées dans 'errors' (functions/parsers.py), pas affichées ligne par ligne
+def fix_formats(books, errors=None):
     if books is None:
         return []
-    
-    # Mapping pour les ratings en texte
-    rating_map = {
-        'One': 1,
-        'Two': 2,
-        'Three': 3,
-        'Four': 4,
-        'Five': 5
-    }
-    
-    
+
+    tally = errors if errors is not None else new_error_tally()
+
     for book in books:
         # nettoyage du prix
-        try:
-            price = book.get('price', 0)
-            
-            if isinstance(price, str):
-                # retrait des £, €, $, espaces
-                price = price.replace('£', '').replace('€', '').replace('$', '').strip()
-                # formatage décimal avec virgule en point
-                price = price.replace(',', '.')
-                # Conversion en float
-                book['price'] = float(price)
-            elif not isinstance(price, (int, float)):
-                book['price'] = 0.0
-                
-        except (ValueError, TypeError, AttributeError) as e:
-            print(f"Error during the conversion of price '{book.get('price')}' : {e}")
+        price = book.get('price', 0)
+        if isinstance(price, str):
+            book['price'], ok = parse_price(price)
+            if not ok:
+                record_parse_error(tally, 'price', price)
+        elif not isinstance(price, (int, float)):
             book['price'] = 0.0
-        
-        # nettoyage du rating 
-        try:
-            rating = book.get('rating', 0)
-            
-            if isinstance(rating, str):
-                # retrait de ' stars' 
-                cleaned_rating = rating.lower().replace(' stars', '').strip()
-            
-                if cleaned_rating.capitalize() in rating_map:
-                    book['rating'] = rating_map[cleaned_rating.capitalize()]
-                else:
-                    book['rating'] = int(cleaned_rating)
-            
-            elif not isinstance(rating, int):
-                book['rating'] = 0
-                
-        except (ValueError, TypeError) as e:
-            print(f"Error during the conversion of rating '{book.get('rating')}' : {e}")
+
+        # nettoyage du rating
+        rating = book.get('rating', 0)
+        if isinstance(rating, str):
+            book['rating'], ok = parse_rating(rating)
+            if not ok:
+                record_parse_error(tally, 'rating', rating)
+        elif not isinstance(rating, int):
             book['rating'] = 0
-        
+
         # nettoyage de la disponibilité
-        try:
-            available = book.get('available', 0)
-            
-            if isinstance(available, str):
-                if 'In stock' in available:
-                    # extraction du nombre entre parenthèses
-                    match = re.search(r'\((\d+)', available)
-                    if match:
-                        book['available'] = int(match.group(1))
-                    else:
-                        book['available'] = 0
-                elif 'Out of stock' in available:
-                    book['available'] = 0
-                else:
-                    # essai de conversion directe
-                    book['available'] = int(available)
-            elif not isinstance(available, int):
-                # Sécurité si le type n'est pas un int
-                book['available'] = 0
-                
-        except (ValueError, TypeError, AttributeError) as e:
-            print(f"error during the conversion '{book.get('available')}' : {e}")
+        available = book.get('available', 0)
+        if isinstance(available, str):
+            book['available'], ok = parse_available(available)
+            if not ok:
+                record_parse_error(tally, 'available', available)
+        elif not isinstance(available, int):
+            # Sécurité si le type n'est pas un int
             book['available'] = 0
 
+    # sans bilan fourni par l'appelant : un seul résumé des erreurs
+    if errors is None and error_count(tally) > 0:
+        print(f"Errors during the conversion : {format_error_tally(tally)}")
+
     return books
 
 
@@ -174,31 +145,237 @@ def remove_duplicates(books):
     return unique_books
 
 
+# --- Versions vectorisées (colonne par colonne) des étapes de nettoyage ---
+
+# types Python acceptés comme entiers par les versions "liste de dictionnaires"
+_INT_TYPES = (int, np.integer)
+_NUMBER_TYPES = (int, float, np.integer, np.floating)
+
+
+#fonction qui indique, pour chaque cellule d'une colonne, si son type fait partie de 'kinds'
+def _type_mask(column, kinds):
+    if column.dtype != object:
+        return pd.Series(False, index=column.index)
+
+    # on ne teste qu'une fois chaque type distinct présent dans la colonne
+    types = column.map(type)
+    matching = [t for t in types.unique() if issubclass(t, kinds)]
+    return types.isin(matching)
+
+
+#fonction qui indique les cellules contenant du texte
+def _text_mask(column):
+    if isinstance(column.dtype, pd.StringDtype):
+        return column.notna()
+    return _type_mask(column, str)
+
+
+#fonction pour nettoyer les espaces blancs d'une DataFrame
+def clean_whitespace_df(df):
+    if df is None:
+        return pd.DataFrame()
+
+    df = df.copy(deep=False)
+    for column_name in df.columns:
+        column = df[column_name]
+        texts = _text_mask(column)
+        if texts.any():
+            df[column_name] = column.mask(texts, column[texts].str.strip())
+    return df
+
+
+#fonction pour gérer les valeurs manquantes d'une DataFrame
+def handle_missing_values_df(df):
+    if df is None:
+        return pd.DataFrame()
+
+    df = df.copy(deep=False)
+
+    # prix manquant -> 0.0
+    if 'price' not in df.columns:
+        df['price'] = 0.0
+    else:
+        df['price'] = df['price'].mask(df['price'].isna(), 0.0)
+
+    # rating et disponibilité manquants ou vides -> 0
+    for column_name in ('rating', 'available'):
+        if column_name not in df.columns:
+            df[column_name] = 0
+        else:
+            column = df[column_name]
+            missing = column.isna()
+            if column.dtype == object:
+                missing |= column.eq('')
+            df[column_name] = column.mask(missing, 0)
+
+    return df
+
+
+#fonction pour convertir la colonne des prix en float
+def _fix_price_column(column, errors=None):
+    if pd.api.types.is_bool_dtype(column):
+        return pd.Series(0.0, index=column.index)
+    if pd.api.types.is_numeric_dtype(column):
+        return column.astype('float64').fillna(0.0)
+
+    prices = pd.Series(0.0, index=column.index)
+    numbers = _type_mask(column, _NUMBER_TYPES)
+    prices[numbers] = column[numbers].astype('float64')
+
+    texts = _text_mask(column)
+    if texts.any():
+        prices[texts] = parse_text_column(column[texts], parse_price, 'float64', errors, 'price')
+
+    return prices
+
+
+#fonction pour convertir la colonne des ratings en entiers
+def _fix_rating_column(column, errors=None):
+    if pd.api.types.is_integer_dtype(column):
+        return column.astype('int64')
+
+    # comme pour la version liste, tout ce qui n'est ni texte ni entier vaut 0
+    ratings = pd.Series(0, index=column.index, dtype='int64')
+    integers = _type_mask(column, _INT_TYPES)
+    ratings[integers] = column[integers].astype('int64')
+
+    texts = _text_mask(column)
+    if texts.any():
+        ratings[texts] = parse_text_column(column[texts], parse_rating, 'int64', errors, 'rating')
+
+    return ratings
+
+
+#fonction pour convertir la colonne des disponibilités en entiers
+def _fix_available_column(column, errors=None):
+    if pd.api.types.is_integer_dtype(column):
+        return column.astype('int64')
+
+    available = pd.Series(0, index=column.index, dtype='int64')
+    integers = _type_mask(column, _INT_TYPES)
+    available[integers] = column[integers].astype('int64')
+
+    texts = _text_mask(column)
+    if texts.any():
+        available[texts] = parse_text_column(column[texts], parse_available, 'int64', errors, 'available')
+
+    return available
+
+
+#fonction pour corriger les formats d'une DataFrame (erreurs de conversion comptées dans 'errors')
+def fix_formats_df(df, errors=None):
+    if df is None:
+        return pd.DataFrame()
+
+    df = df.copy(deep=False)
+    df['price'] = _fix_price_column(df['price'], errors)
+    df['rating'] = _fix_rating_column(df['rating'], errors)
+    df['available'] = _fix_available_column(df['available'], errors)
+    return df
+
+
+#fonction pour supprimer les livres en double d'une DataFrame (clé : titre + prix)
+#'seen' : clés déjà rencontrées (lecture par paquets), complété au passage ; de préférence un index
+#de dédoublonnage (functions/dedup_index.py, empreintes de 64/128 bits), sinon un ensemble Python de clés
+def remove_duplicates_df(df, seen=None):
+    if df is None:
+        return pd.DataFrame()
+
+    keys = pd.DataFrame(index=df.index)
+    for column_name in ('title', 'price'):
+        if column_name in df.columns:
+            column = df[column_name]
+            texts = _text_mask(column)
+            keys[column_name] = column.mask(texts, column[texts].str.strip()) if texts.any() else column
+        else:
+            keys[column_name] = ''
+
+    # index d'empreintes : doublons du paquet et des paquets précédents en une fois
+    if isinstance(seen, dict):
+        keep = filter_new_keys(seen, keys['title'].to_numpy(), keys['price'].to_numpy())
+        return df[keep].reset_index(drop=True)
+
+    keep = ~keys.duplicated(keep='first').to_numpy()
+
+    # doublons avec les paquets précédents
+    if seen is not None:
+        new_keys = list(zip(keys['title'][keep], keys['price'][keep]))
+        keep[keep] = [key not in seen for key in new_keys]
+        seen.update(new_keys)
+
+    return df[keep].reset_index(drop=True)
+
+
+#fonction pour supprimer les quasi-doublons d'une DataFrame : titres presque identiques (casse, ponctuation, accents,
+#troncature '...', suffixe de série) au même prix, trouvés par MinHash/LSH (functions/near_duplicates.py)
+#renvoie (DataFrame sans les quasi-doublons, tableau des groupes fusionnés) ; threshold 0 : rien n'est retiré
+def remove_near_duplicates_df(df, threshold=None):
+    threshold = near_duplicates.NEAR_DUPLICATE_THRESHOLD if threshold is None else threshold
+    if df is None or len(df) == 0 or 'title' not in df.columns or not threshold:
+        return df, near_duplicates.cluster_table(np.arange(0), np.zeros(0, dtype=bool), [])
+
+    titles = df['title'].to_numpy(dtype=object)
+    prices = df['price'].to_numpy(dtype='float64') if 'price' in df.columns else None
+    labels = near_duplicates.near_duplicate_groups(titles, prices, threshold)
+    keep = near_duplicates.representatives(labels, titles)
+    table = near_duplicates.cluster_table(labels, keep, titles, prices)
+    return df[keep].reset_index(drop=True), table
+
+
 #fonction principale de nettoyage des données des livres
-def clean_data(books):
+#'seen' permet de dédoublonner à travers plusieurs appels (un appel par paquet de lignes)
+#'errors' : bilan des valeurs invalides (new_error_tally), complété au passage si fourni
+def clean_data(books, seen=None, errors=None):
 
     try:
-        if not books:
+        if books is None or len(books) == 0:
             print("Books list is empty, nothing to clean.")
             return []
         
-        books_initial = len(books)
+        # une seule construction de DataFrame, puis toutes les étapes travaillent par colonne
+        df_books = books if isinstance(books, pd.DataFrame) else pd.DataFrame(books)
+
+        books_initial = len(df_books)
         print(f"\n START CLEANING - {books_initial} books")
         
         # Étape 1 : nettoyer les espaces
-        books = clean_whitespace(books)
+        with stage('clean_whitespace', rows_in=len(df_books)) as record:
+            df_books = clean_whitespace_df(df_books)
+            record['rows_out'] = len(df_books)
         
         # Étape 2 : gerer les valeurs manquantes
-        books = handle_missing_values(books)
+        with stage('handle_missing_values', rows_in=len(df_books)) as record:
+            df_books = handle_missing_values_df(df_books)
+            record['rows_out'] = len(df_books)
         
         # Étape 3 : corriger les formats
-        books = fix_formats(books)
+        tally = errors if errors is not None else new_error_tally()
+        with stage('fix_formats', rows_in=len(df_books)) as record:
+            df_books = fix_formats_df(df_books, tally)
+            record['rows_out'] = len(df_books)
+            record['parse_errors'] = error_count(tally)
+
+        if errors is None and error_count(tally) > 0:
+            print(f"Errors during the conversion : {format_error_tally(tally)}")
         
         # Étape 4 : enlever les doublons
-        books = remove_duplicates(books)
+        with stage('remove_duplicates', rows_in=len(df_books)) as record:
+            df_books = remove_duplicates_df(df_books, seen=seen)
+            record['rows_out'] = len(df_books)
+
+        # Étape 4 bis (optionnelle) : enlever les quasi-doublons (BOOKS_NEAR_DUPLICATES / --near-duplicates)
+        if near_duplicates.NEAR_DUPLICATE_THRESHOLD > 0:
+            with stage('remove_near_duplicates', rows_in=len(df_books)) as record:
+                df_books, clusters = remove_near_duplicates_df(df_books)
+                record['rows_out'] = len(df_books)
+                record['clusters'] = int(clusters['cluster'].nunique())
+            print(f"Quasi-doublons : {near_duplicates.format_cluster_summary(clusters)}")
+        
+        # Étape finale : conversion vers le schéma compact du catalogue (functions/schema.py)
+        with stage('apply_schema', rows_in=len(df_books)) as record:
+            df_books = apply_catalog_schema(df_books)
+            record['rows_out'] = len(df_books)
         
-        # Étape finale : transformation en DataFrame pandas pour vérification
-        df_books = pd.DataFrame(books)
         return df_books
         
     except Exception as e:
@@ -0,0 +1,221 @@
+#importation des bibliothèques nécessaires
+import os
+import pickle
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+# taille des empreintes (64 ou 128 bits) et vérification exacte des doublons (BOOKS_DEDUP_VERIFY=1)
+DEDUP_BITS = int(os.environ.get('BOOKS_DEDUP_BITS', 64))
+DEDUP_VERIFY = os.environ.get('BOOKS_DEDUP_VERIFY', '0') == '1'
+
+# clés de hachage (16 caractères) : deux clés différentes donnent deux empreintes indépendantes pour le mode 128 bits
+HASH_KEY = 'speakta-dedup-01'
+HASH_KEY_HIGH = 'speakta-dedup-02'
+
+# version des empreintes sauvegardées : un index d'une autre version n'est pas relu
+DEDUP_VERSION = 2
+
+# clé d'un prix manquant ou infini (les autres prix sont comptés en centimes)
+MISSING_CENTS = np.iinfo('int64').min
+
+
+#fonction qui crée un index de dédoublonnage vide (empreintes de 64 ou 128 bits, vérification exacte en option)
+def new_dedup_index(bits=None, verify=None):
+    bits = DEDUP_BITS if bits is None else bits
+    verify = DEDUP_VERIFY if verify is None else verify
+    if bits not in (64, 128):
+        raise ValueError(f"bits must be 64 or 128, not {bits}")
+
+    return {
+        'bits': bits,
+        'verify': verify,
+        # suites triées d'empreintes : fusionnées au fur et à mesure (coût d'insertion O(n log n) au total)
+        'runs': [],
+        # mode vérification : clé exacte de chaque empreinte et clés en collision
+        'keys': {},
+        'collisions': set()
+    }
+
+
+#fonction qui normalise les clés (titre, prix) : titre sans espaces autour, prix en centimes (int64)
+#une même clé donne la même empreinte quelle que soit l'étape du nettoyage (prix float64, ou float32 après le schéma)
+#un prix non numérique (texte) est gardé tel quel
+def dedup_keys(titles, prices):
+    titles = pd.Series(np.asarray(titles, dtype=object))
+    stripped = titles.str.strip()
+    titles = stripped.where(stripped.notna(), titles).to_numpy(dtype=object)
+
+    prices = np.asarray(prices)
+    numbers = prices if prices.dtype.kind in 'biuf' else pd.to_numeric(pd.Series(prices), errors='coerce').to_numpy()
+    numbers = numbers.astype('float64')
+    finite = np.isfinite(numbers)
+    cents = np.full(len(numbers), MISSING_CENTS, dtype='int64')
+    cents[finite] = np.round(numbers[finite] * 100).astype('int64')
+    if prices.dtype.kind in 'biuf' or finite.all():
+        return titles, cents
+
+    # prix textes : gardés tels quels (sans espaces autour), les autres en centimes
+    texts = ~finite & pd.Series(prices).map(lambda price: isinstance(price, str)).to_numpy()
+    price_keys = cents.astype(object)
+    price_keys[texts] = [price.strip() for price in prices[texts]]
+    return titles, price_keys
+
+
+#fonction qui calcule les empreintes des clés (titre, prix) ; renvoie (bas, haut) avec haut=None en 64 bits
+def hash_keys(titles, prices, bits=64):
+    titles, prices = dedup_keys(titles, prices)
+    frame = pd.DataFrame({'title': titles, 'price': prices})
+    low = pd.util.hash_pandas_object(frame, index=False, hash_key=HASH_KEY).to_numpy()
+    if bits == 64:
+        return low, None
+    high = pd.util.hash_pandas_object(frame, index=False, hash_key=HASH_KEY_HIGH).to_numpy()
+    return low, high
+
+
+#fonction qui trie une suite d'empreintes (ordre lexicographique haut / bas en 128 bits)
+def _sorted_run(low, high):
+    if high is None:
+        return (np.sort(low, kind='stable'), None)
+    order = np.lexsort((high, low))
+    return (low[order], high[order])
+
+
+#fonction qui indique quelles empreintes sont déjà dans une suite triée
+def _run_contains(run, low, high):
+    run_low, run_high = run
+    if len(run_low) == 0:
+        return np.zeros(len(low), dtype=bool)
+    left = np.searchsorted(run_low, low, side='left')
+    inside = np.minimum(left, len(run_low) - 1)
+    found = (left < len(run_low)) & (run_low[inside] == low)
+    if high is None:
+        return found
+
+    # 128 bits : la partie haute départage les (rares) empreintes basses identiques
+    right = np.searchsorted(run_low, low, side='right')
+    single = found & (right - left == 1)
+    result = single & (run_high[inside] == high)
+    for position in np.flatnonzero(found & (right - left > 1)):
+        result[position] = high[position] in run_high[left[position]:right[position]]
+    return result
+
+
+#fonction qui ajoute une suite triée et fusionne les dernières suites de tailles voisines
+def _add_run(index, run):
+    runs = index['runs']
+    if len(run[0]) == 0:
+        return
+    runs.append(run)
+    while len(runs) > 1 and len(runs[-1][0]) * 2 >= len(runs[-2][0]):
+        newer, older = runs.pop(), runs.pop()
+        high = None if newer[1] is None else np.concatenate([older[1], newer[1]])
+        runs.append(_sorted_run(np.concatenate([older[0], newer[0]]), high))
+
+
+#fonction qui renvoie le masque des premières apparitions (dans le paquet et par rapport à l'index) et les ajoute à l'index
+def filter_new_keys(index, titles, prices):
+    low, high = hash_keys(titles, prices, index['bits'])
+    if len(low) == 0:
+        return np.zeros(0, dtype=bool)
+
+    # premières apparitions à l'intérieur du paquet
+    if high is None:
+        _, first_positions = np.unique(low, return_index=True)
+    else:
+        _, first_positions = np.unique(np.stack([low, high], axis=1), axis=0, return_index=True)
+    keep = np.zeros(len(low), dtype=bool)
+    keep[first_positions] = True
+
+    # empreintes déjà présentes dans l'index
+    candidates = np.flatnonzero(keep)
+    for run in index['runs']:
+        run_high = None if high is None else high[candidates]
+        seen = _run_contains(run, low[candidates], run_high)
+        keep[candidates[seen]] = False
+        candidates = candidates[~seen]
+
+    new_positions = np.flatnonzero(keep)
+    _add_run(index, _sorted_run(low[new_positions], None if high is None else high[new_positions]))
+
+    if index['verify']:
+        _verify_duplicates(index, keep, new_positions, low, high, titles, prices)
+
+    return keep
+
+
+#fonction du mode vérification : un doublon dont la clé exacte diffère est une collision d'empreintes, le livre est gardé
+def _verify_duplicates(index, keep, new_positions, low, high, titles, prices):
+    titles, prices = dedup_keys(titles, prices)
+
+    def fingerprint(position):
+        return int(low[position]) if high is None else (int(low[position]), int(high[position]))
+
+    for position in new_positions:
+        index['keys'].setdefault(fingerprint(position), (titles[position], prices[position]))
+
+    for position in np.flatnonzero(~keep):
+        key = (titles[position], prices[position])
+        if index['keys'].get(fingerprint(position)) == key:
+            continue
+        if key not in index['collisions']:
+            index['collisions'].add(key)
+            keep[position] = True
+
+
+#fonction qui renvoie le nombre de clés distinctes de l'index
+def dedup_index_size(index):
+    return sum(len(run[0]) for run in index['runs']) + len(index['collisions'])
+
+
+#fonction qui renvoie la mémoire occupée par les empreintes (en octets)
+def dedup_index_nbytes(index):
+    return sum(run[0].nbytes + (0 if run[1] is None else run[1].nbytes) for run in index['runs'])
+
+
+#fonction de sauvegarde de l'index (tableaux NumPy ; clés exactes à part en mode vérification)
+def save_dedup_index(index, path):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    # une seule suite triée sur disque
+    while len(index['runs']) > 1:
+        newer, older = index['runs'].pop(), index['runs'].pop()
+        high = None if newer[1] is None else np.concatenate([older[1], newer[1]])
+        index['runs'].append(_sorted_run(np.concatenate([older[0], newer[0]]), high))
+
+    low, high = index['runs'][0] if index['runs'] else (np.zeros(0, dtype='uint64'), None)
+    arrays = {'low': low, 'version': np.array(DEDUP_VERSION)}
+    if index['bits'] == 128:
+        arrays['high'] = high if high is not None else np.zeros(0, dtype='uint64')
+
+    temporary = path.with_name(path.name + '.tmp.npz')
+    np.savez(temporary, **arrays)
+    os.replace(temporary, path)
+
+    if index['verify']:
+        with open(path.with_suffix('.keys.pkl'), 'wb') as f:
+            pickle.dump({'keys': index['keys'], 'collisions': index['collisions']}, f)
+
+
+#fonction de lecture d'un index sauvegardé (dédoublonnage entre exécutions ou entre fichiers)
+def load_dedup_index(path, verify=None):
+    path = Path(path)
+    with np.load(path) as arrays:
+        bits = 128 if 'high' in arrays.files else 64
+        index = new_dedup_index(bits=bits, verify=verify)
+        verify = index['verify']
+        if 'version' not in arrays.files or int(arrays['version']) != DEDUP_VERSION:
+            print(f"Dedup index {path} uses another key format : starting from an empty index.")
+            return index
+        run = (arrays['low'], arrays['high'] if bits == 128 else None)
+
+    if len(run[0]) > 0:
+        index['runs'].append(run)
+
+    keys_path = path.with_suffix('.keys.pkl')
+    if verify and keys_path.exists():
+        with open(keys_path, 'rb') as f:
+            index.update(pickle.load(f))
+
+    return index
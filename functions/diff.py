@@ -0,0 +1,237 @@
+#importation des bibliothèques nécessaires
+import json
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from .dedup_index import HASH_KEY
+from .groupby import group_by
+from . import output
+from .metrics import stage
+from .output import submit_write, json_default
+from .schema import column_values
+
+# nombre de changements affichés dans le rapport texte pour chaque catégorie (les plus importants)
+MAX_DIFF_EXAMPLES = 10
+
+# mesures par rating comparées entre les deux catalogues
+DIFF_METRICS = ['Average_Price', 'Total_Stock', 'Value', 'Book_Count']
+
+
+#fonction qui mélange deux tableaux d'entiers 64 bits en une empreinte (multiplication et décalage)
+def _mix(keys, values):
+    mixed = keys ^ (values.astype('uint64') * np.uint64(0x9E3779B97F4A7C15))
+    mixed ^= mixed >> np.uint64(31)
+    mixed *= np.uint64(0xBF58476D1CE4E5B9)
+    mixed ^= mixed >> np.uint64(29)
+    return mixed
+
+
+#fonction qui renvoie les colonnes utiles d'un catalogue nettoyé : empreinte du titre, prix au centime, note, stock
+def _catalog_columns(books):
+    titles = np.asarray(books['title'], dtype=object) if 'title' in books.columns else np.full(len(books), '', dtype=object)
+    prices = column_values(books, 'price').astype('float64', copy=False)
+    return {
+        'title': titles,
+        'title_hash': pd.util.hash_array(titles, hash_key=HASH_KEY, categorize=False),
+        'price': prices,
+        'cents': np.round(prices * 100).astype('int64'),
+        'rating': np.asarray(books['rating']),
+        'available': np.asarray(books['available']).astype('int64')
+    }
+
+
+#fonction de jointure par empreintes triées : renvoie les positions (gauche, droite) des clés présentes des deux côtés
+#un seul tri des deux côtés réunis ; dans une suite de clés égales, la k-ième ligne de gauche est associée
+#à la k-ième ligne de droite (ordre d'origine de chaque côté, le tri étant stable)
+def _join(left, right):
+    keys = np.concatenate([left, right])
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+    first = np.ones(len(keys), dtype=bool)
+    first[1:] = sorted_keys[1:] != sorted_keys[:-1]
+    run = np.cumsum(first) - 1
+    starts = np.flatnonzero(first)
+
+    # lignes de gauche de chaque suite (placées avant celles de droite) et rang des lignes de droite
+    is_left = order < len(left)
+    left_counts = np.add.reduceat(is_left.astype('int64'), starts) if len(keys) > 0 else np.zeros(0, dtype='int64')
+    right_rank = np.arange(len(keys)) - starts[run] - left_counts[run]
+    right_positions = np.flatnonzero(~is_left & (right_rank < left_counts[run]))
+    left_positions = starts[run[right_positions]] + right_rank[right_positions]
+    return order[left_positions], order[right_positions] - len(left)
+
+
+#fonction qui compare deux catalogues nettoyés (clé titre + prix, comme remove_duplicates)
+#1) même titre et même prix : livre conservé (changement de stock éventuel)
+#2) parmi les autres, même titre : changement de prix (les lignes d'un même titre appariées par ordre de prix)
+#3) le reste : livres ajoutés ou retirés
+def diff_catalogs(old, new):
+    before, after = _catalog_columns(old), _catalog_columns(new)
+
+    # 1) jointure sur l'empreinte titre + prix
+    old_keys = _mix(before['title_hash'], before['cents'])
+    new_keys = _mix(after['title_hash'], after['cents'])
+    same_old, same_new = _join(old_keys, new_keys)
+
+    # 2) jointure sur le titre seul des lignes restantes, rangées par prix croissant
+    old_left = np.ones(len(old_keys), dtype=bool)
+    old_left[same_old] = False
+    new_left = np.ones(len(new_keys), dtype=bool)
+    new_left[same_new] = False
+    old_rest, new_rest = np.flatnonzero(old_left), np.flatnonzero(new_left)
+    old_rest = old_rest[np.argsort(before['price'][old_rest], kind='stable')]
+    new_rest = new_rest[np.argsort(after['price'][new_rest], kind='stable')]
+    moved_old, moved_new = _join(before['title_hash'][old_rest], after['title_hash'][new_rest])
+    moved_old, moved_new = old_rest[moved_old], new_rest[moved_new]
+
+    # 3) lignes sans correspondance
+    old_left[moved_old] = False
+    new_left[moved_new] = False
+    removed, added = np.flatnonzero(old_left), np.flatnonzero(new_left)
+
+    restocked = before['available'][same_old] != after['available'][same_new]
+    stock_old, stock_new = same_old[restocked], same_new[restocked]
+
+    return {
+        'summary': {
+            'Old_Books': len(old_keys),
+            'New_Books': len(new_keys),
+            'Added': len(added),
+            'Removed': len(removed),
+            'Price_Changes': len(moved_old),
+            'Stock_Changes': len(stock_old),
+            'Unchanged': int(len(same_old) - len(stock_old))
+        },
+        'added': _rows(new, added),
+        'removed': _rows(old, removed),
+        'price_changes': pd.DataFrame({
+            'title': before['title'][moved_old],
+            'rating': after['rating'][moved_new],
+            'old_price': before['price'][moved_old],
+            'new_price': after['price'][moved_new],
+            'price_delta': np.round(after['price'][moved_new] - before['price'][moved_old], 2),
+            'old_available': before['available'][moved_old],
+            'new_available': after['available'][moved_new]
+        }),
+        'stock_changes': pd.DataFrame({
+            'title': after['title'][stock_new],
+            'rating': after['rating'][stock_new],
+            'price': after['price'][stock_new],
+            'old_available': before['available'][stock_old],
+            'new_available': after['available'][stock_new],
+            'stock_delta': after['available'][stock_new] - before['available'][stock_old]
+        }),
+        'by_rating': diff_by_rating(old, new)
+    }
+
+
+#fonction qui renvoie les lignes choisies d'un catalogue (titre, prix, note, stock)
+def _rows(books, positions):
+    columns = [name for name in ('title', 'price', 'rating', 'available') if name in books.columns]
+    rows = books.iloc[positions][columns].reset_index(drop=True)
+    if 'price' in rows.columns:
+        rows['price'] = column_values(rows, 'price')
+    return rows
+
+
+#fonction qui renvoie, pour chaque rating, les mesures de analyze_by_rating des deux catalogues et leur écart
+def diff_by_rating(old, new):
+    before, after = group_by(old, 'rating'), group_by(new, 'rating')
+    results = {}
+    for rating in after:
+        row = {'Rating': rating}
+        for name in DIFF_METRICS:
+            row[f"Old_{name}"] = before[rating][name]
+            row[f"New_{name}"] = after[rating][name]
+            delta = after[rating][name] - before[rating][name]
+            row[f"Delta_{name}"] = round(delta, 2) if isinstance(delta, float) else delta
+        results[rating] = row
+    return results
+
+
+#fonction qui renvoie le rapport des différences (texte) : résumé, écarts par rating, plus grands changements
+def format_diff_report(diff, old_name='ancien', new_name='nouveau'):
+    summary = diff['summary']
+    lines = [
+        "",
+        "=" * 80,
+        f"DIFFÉRENCES ENTRE LES CATALOGUES ({old_name} -> {new_name})",
+        "=" * 80,
+        f"Livres avant                 : {summary['Old_Books']}",
+        f"Livres après                 : {summary['New_Books']}",
+        f"Livres ajoutés               : {summary['Added']}",
+        f"Livres retirés               : {summary['Removed']}",
+        f"Changements de prix          : {summary['Price_Changes']}",
+        f"Changements de stock         : {summary['Stock_Changes']}",
+        f"Livres inchangés             : {summary['Unchanged']}",
+        "",
+        "ÉCARTS PAR RATING (après - avant)",
+        "-" * 80,
+        f"{'Rating':<10} {'Average_Price':<15} {'Total_Stock':<15} {'Value':<15} {'Book_Count':<15}"
+    ]
+    for rating, row in diff['by_rating'].items():
+        lines.append(f"{rating:<10} "
+                     f"{row['Delta_Average_Price']:<+15.2f} "
+                     f"{row['Delta_Total_Stock']:<+15} "
+                     f"{row['Delta_Value']:<+15.2f} "
+                     f"{row['Delta_Book_Count']:<+15}")
+
+    # plus grands changements en valeur absolue
+    examples = [
+        ("PRIX", diff['price_changes'], 'price_delta',
+         lambda row: f"{row.old_price:.2f} £ -> {row.new_price:.2f} £"),
+        ("STOCK", diff['stock_changes'], 'stock_delta',
+         lambda row: f"{row.old_available} -> {row.new_available}"),
+    ]
+    for label, table, column, describe in examples:
+        if table.empty:
+            continue
+        lines += ["", f"PLUS GRANDS CHANGEMENTS DE {label}", "-" * 80]
+        largest = table.iloc[np.argsort(-np.abs(table[column].to_numpy()), kind='stable')[:MAX_DIFF_EXAMPLES]]
+        lines += [f"{str(row.title)[:50]:<52} {describe(row)}" for row in largest.itertuples()]
+
+    for label, table in (("AJOUTÉS", diff['added']), ("RETIRÉS", diff['removed'])):
+        if table.empty:
+            continue
+        lines += ["", f"LIVRES {label} ({len(table)})", "-" * 80]
+        lines += [f"{str(row.title)[:50]:<52} {row.price:.2f} £" for row in table.head(MAX_DIFF_EXAMPLES).itertuples()]
+
+    lines.append("=" * 80 + "\n")
+    return "\n".join(lines) + "\n"
+
+
+#fonction qui écrit le rapport des différences et, selon les formats d'export, les changements (CSV) et le résumé (JSON)
+def write_diff_report(diff, directory="output", formats=None, old_name='ancien', new_name='nouveau'):
+    formats = output.EXPORT_FORMATS if formats is None else formats
+    directory = Path(directory)
+    written = [submit_write(directory / 'catalog_diff.txt', format_diff_report(diff, old_name, new_name))]
+
+    if 'json' in formats:
+        content = {'summary': diff['summary'], 'by_rating': {str(rating): row for rating, row in diff['by_rating'].items()}}
+        written.append(submit_write(directory / 'catalog_diff.json',
+                                    json.dumps(content, default=json_default, ensure_ascii=False, indent=2)))
+    if 'csv' in formats:
+        for name in ('added', 'removed', 'price_changes', 'stock_changes'):
+            written.append(submit_write(directory / f"catalog_diff_{name}.csv", diff[name].to_csv(index=False)))
+        written.append(submit_write(directory / 'catalog_diff_by_rating.csv',
+                                    pd.DataFrame(list(diff['by_rating'].values())).to_csv(index=False)))
+    return written
+
+
+#fonction principale : compare deux fichiers CSV (nettoyés, via le cache) et écrit le rapport des différences
+def run_diff(old_path, new_path, directory="output"):
+    from .cache import load_clean_books
+
+    old, new = load_clean_books(old_path), load_clean_books(new_path)
+    if not isinstance(old, pd.DataFrame) or not isinstance(new, pd.DataFrame) or old.empty or new.empty:
+        print("Nothing to compare : one of the catalogs is empty.")
+        return None
+
+    with stage('catalog_diff', rows_in=len(old) + len(new)) as record:
+        diff = diff_catalogs(old, new)
+        record['rows_out'] = sum(diff['summary'][name] for name in ('Added', 'Removed', 'Price_Changes', 'Stock_Changes'))
+
+    report = format_diff_report(diff, Path(old_path).name, Path(new_path).name)
+    print(report)
+    write_diff_report(diff, directory, old_name=Path(old_path).name, new_name=Path(new_path).name)
+    return diff
@@ -0,0 +1,90 @@
+#importation des bibliothèques nécessaires
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+# vocabulaire pour fabriquer des titres du style books.toscrape.com
+TITLE_WORDS = np.array([
+    'Light', 'Attic', 'Velvet', 'Objects', 'Sapiens', 'Requiem', 'Dirty', 'Little', 'Secrets',
+    'Coming', 'Boys', 'Boat', 'Black', 'Maria', 'Starving', 'Hearts', 'Shakespeare', 'Sonnets',
+    'Set', 'Me', 'Free', 'Scott', 'Pilgrim', 'Rat', 'Mortal', 'Engines', 'Dream', 'River',
+    'Night', 'Garden', 'History', 'Love', 'War', 'Kingdom', 'Shadow', 'Ocean', 'Fire', 'Stone'
+])
+RATING_WORDS = np.array(['One', 'Two', 'Three', 'Four', 'Five'])
+IMAGE_PREFIX = 'http://books.toscrape.com/media/cache/'
+
+# valeurs invalides injectées dans un flux "sale" (prix / disponibilité / note illisibles)
+INVALID_VALUES = np.array(['N/A', 'unknown', '??', 'see site', '-'])
+
+
+#fonction qui fabrique un paquet de lignes brutes (texte, comme dans books.csv)
+def _generate_rows(rng, start, rows, duplicate_rate, missing_rate, invalid_rate=0.0):
+    ids = np.arange(start, start + rows)
+
+    # titres : trois mots du vocabulaire + numéro unique
+    words = rng.integers(0, len(TITLE_WORDS), size=(3, rows))
+    titles = (pd.Series(TITLE_WORDS[words[0]]) + ' ' + TITLE_WORDS[words[1]] + ' '
+              + TITLE_WORDS[words[2]] + ' ' + pd.Series(ids).astype(str))
+
+    # images : même préfixe long pour toutes les lignes, comme le vrai site
+    hashes = pd.Series(rng.integers(0, 2**62, size=rows, dtype='int64')).map('{:016x}'.format)
+    images = IMAGE_PREFIX + hashes.str[:2] + '/' + hashes.str[2:4] + '/' + hashes + '.jpg'
+
+    # prix '£51.77'
+    pence = pd.Series(rng.integers(1000, 6000, size=rows))
+    prices = '£' + (pence // 100).astype(str) + '.' + (pence % 100).astype(str).str.zfill(2)
+
+    # disponibilité : 'In stock (n available)', 'In stock' ou 'Out of stock'
+    stock = pd.Series(rng.integers(1, 23, size=rows))
+    kind = rng.random(rows)
+    available = ('In stock (' + stock.astype(str) + ' available)').where(kind < 0.6, 'In stock')
+    available = available.where(kind < 0.95, 'Out of stock')
+
+    ratings = pd.Series(RATING_WORDS[rng.integers(0, 5, size=rows)]) + ' stars'
+
+    books = pd.DataFrame({
+        'image': images,
+        'title': titles,
+        'price': prices,
+        'available': available,
+        'rating': ratings
+    })
+
+    # valeurs manquantes dispersées dans les colonnes prix / disponibilité / note
+    for column_name in ('price', 'available', 'rating'):
+        books.loc[rng.random(rows) < missing_rate, column_name] = np.nan
+
+    # valeurs illisibles (flux sale) : aucun tirage si le taux est nul, le fichier reste identique
+    if invalid_rate > 0:
+        for column_name in ('price', 'available', 'rating'):
+            invalid = np.flatnonzero(rng.random(rows) < invalid_rate)
+            books.loc[invalid, column_name] = INVALID_VALUES[rng.integers(0, len(INVALID_VALUES), size=len(invalid))]
+
+    # doublons : copies de lignes déjà générées dans le paquet (avec espaces parasites parfois)
+    duplicates = np.flatnonzero(rng.random(rows) < duplicate_rate)
+    duplicates = duplicates[duplicates > 0]
+    if len(duplicates) > 0:
+        sources = rng.integers(0, duplicates)
+        books.iloc[duplicates] = books.iloc[sources].to_numpy()
+        padded = duplicates[rng.random(len(duplicates)) < 0.5]
+        books.iloc[padded, 1] = '  ' + books.iloc[padded, 1] + ' '
+
+    return books
+
+
+#fonction qui écrit un catalogue synthétique déterministe (même graine -> même fichier)
+def generate_catalog(path, rows, seed=0, duplicate_rate=0.02, missing_rate=0.01, chunk_rows=1_000_000, invalid_rate=0.0):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    written = 0
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        while written < rows:
+            size = min(chunk_rows, rows - written)
+            # une graine par paquet : le contenu ne dépend pas de l'ordre des appels
+            rng = np.random.default_rng([seed, written])
+            books = _generate_rows(rng, written, size, duplicate_rate, missing_rate, invalid_rate)
+            books.to_csv(f, header=(written == 0), index=False)
+            written += size
+
+    return path
@@ -0,0 +1,222 @@
+#importation des bibliothèques nécessaires
+import os
+import numpy as np
+import pandas as pd
+from .schema import column_values
+
+# dimensions de regroupement connues : colonne et niveaux fixes ('values'), ou colonne découpée en tranches ('bins')
+# 'values' : une valeur hors de la liste (ou illisible) va dans le niveau 'other'
+# 'bins' : tranches [début, fin[ ; la dernière tranche est ouverte ; une valeur sous la première borne va dans la première
+DIMENSIONS = {
+    'rating': {'name': 'Rating', 'column': 'rating', 'values': list(range(0, 6)), 'other': 0},
+    'price_band': {'name': 'Price_Band', 'column': 'price', 'bins': [0, 10, 20, 30, 40, 50, 60]},
+    'stock_band': {'name': 'Stock_Band', 'column': 'available', 'bins': [0, 1, 5, 10, 20],
+                   'labels': ['0', '1-4', '5-9', '10-19', '20+']},
+}
+
+# mesures calculées pour chaque groupe : (nom, calcul, colonne) ; calculs possibles : count, sum, mean, min, max
+DEFAULT_METRICS = [
+    ('Average_Price', 'mean', 'price'),
+    ('Total_Stock', 'sum', 'available'),
+    ('Value', 'sum', 'value'),
+    ('Book_Count', 'count', None),
+]
+
+# colonnes calculées à partir du catalogue
+DERIVED_COLUMNS = {
+    'value': lambda columns: columns['price'] * columns['available']
+}
+
+# colonnes entières : sommes, minimums et maximums rendus en entiers (les autres sont arrondis au centime)
+INTEGER_COLUMNS = {'available', 'rating'}
+
+# au-delà de ce nombre de combinaisons possibles, seuls les groupes présents sont numérotés (et les groupes vides omis)
+DENSE_MAX_GROUPS = 65536
+
+# regroupements ajoutés au rapport (ex. BOOKS_GROUP_BY=price_band,rating+price_band ; '+' combine des dimensions)
+GROUP_BY = [name for name in os.environ.get('BOOKS_GROUP_BY', '').split(',') if name]
+
+
+#fonction qui renvoie la description d'un regroupement à partir de son nom ('rating+price_band', 'title', ...)
+#un nom qui n'est pas une dimension connue désigne une colonne du catalogue, regroupée par valeur
+def group_spec(name, metrics=None):
+    dimensions = [DIMENSIONS.get(part, {'name': part.capitalize(), 'column': part}) for part in name.split('+')]
+    return {'name': name, 'dimensions': dimensions, 'metrics': metrics or DEFAULT_METRICS}
+
+
+#fonction qui renvoie les libellés des tranches d'une dimension 'bins' ('10-20', ..., '60+')
+def bin_labels(dimension):
+    if 'labels' in dimension:
+        return list(dimension['labels'])
+    edges = dimension['bins']
+    return [f"{low:g}-{high:g}" for low, high in zip(edges[:-1], edges[1:])] + [f"{edges[-1]:g}+"]
+
+
+#fonction qui renvoie le niveau de chaque ligne pour une dimension : (codes, libellés des niveaux, lignes lisibles)
+#'lignes lisibles' vaut None si toutes le sont ; une ligne illisible est comptée sans participer aux sommes
+def dimension_codes(books, dimension):
+    column = books[dimension['column']]
+
+    if 'bins' in dimension:
+        values = column_values(books, dimension['column']).astype('float64', copy=False)
+        valid = ~np.isnan(values)
+        codes = np.searchsorted(np.asarray(dimension['bins'], dtype='float64'), values, side='right') - 1
+        codes = np.clip(codes, 0, len(dimension['bins']) - 1)
+        if valid.all():
+            return codes, bin_labels(dimension), None
+        # une valeur manquante n'a pas de tranche : ligne écartée
+        return np.where(valid, codes, -1), bin_labels(dimension), valid
+
+    if 'values' in dimension:
+        levels = dimension['values']
+        if pd.api.types.is_integer_dtype(column):
+            numbers, valid = column.to_numpy(dtype='int64'), None
+        else:
+            numeric = pd.to_numeric(column, errors='coerce').to_numpy(dtype='float64')
+            valid = ~np.isnan(numeric)
+            numbers = np.where(valid, numeric, levels[0]).astype('int64')
+            valid = None if valid.all() else valid
+
+        # niveaux consécutifs (cas des ratings) : position calculée directement, sinon recherche dans la liste triée
+        if levels == list(range(levels[0], levels[0] + len(levels))):
+            codes = numbers - levels[0]
+            outside = (codes < 0) | (codes >= len(levels))
+        else:
+            order = np.argsort(levels)
+            sorted_levels = np.asarray(levels)[order]
+            positions = np.clip(np.searchsorted(sorted_levels, numbers), 0, len(levels) - 1)
+            outside = sorted_levels[positions] != numbers
+            codes = order[positions]
+
+        other = levels.index(dimension['other']) if 'other' in dimension else -1
+        codes = np.where(outside, other, codes)
+        if valid is not None:
+            codes = np.where(valid, codes, other)
+        return codes, list(levels), valid
+
+    # colonne quelconque : un niveau par valeur présente (ordre croissant), valeurs manquantes écartées
+    codes, uniques = pd.factorize(column, sort=True)
+    return codes, list(uniques), None
+
+
+#fonction qui renvoie le tableau d'une colonne utile aux mesures (prix remis en float64 au centime)
+def _metric_column(books, name, cache):
+    if name not in cache:
+        if name in DERIVED_COLUMNS:
+            cache[name] = DERIVED_COLUMNS[name]({column: _metric_column(books, column, cache)
+                                                 for column in ('price', 'available')})
+        else:
+            cache[name] = column_values(books, name).astype('float64', copy=False)
+    return cache[name]
+
+
+#fonction qui arrondit les valeurs d'une mesure (nombres de livres et colonnes entières en int, montants au centime)
+def _round_metric(kind, column, values):
+    if kind == 'count' or (column in INTEGER_COLUMNS and kind != 'mean'):
+        return np.rint(values).astype('int64').tolist()
+    # round() de Python (arrondi exact de la valeur décimale), comme finalize_statistics_accumulator
+    return [round(value, 2) for value in values.tolist()]
+
+
+#fonction qui calcule les mesures de chaque groupe en un passage NumPy (bincount sur le numéro de groupe)
+#renvoie {clé: ligne} dans l'ordre des niveaux ; clé = libellé (une dimension) ou tuple de libellés (plusieurs)
+#les groupes vides sont gardés quand toutes les dimensions ont des niveaux fixes (ratings 0 à 5, tranches)
+def group_by(books, spec):
+    spec = group_spec(spec) if isinstance(spec, str) else spec
+    dimensions = spec['dimensions']
+
+    # numéro de groupe : combinaison des niveaux de chaque dimension (comme un nombre écrit en base mixte)
+    codes = np.zeros(len(books), dtype='int64')
+    valid = np.ones(len(books), dtype=bool)
+    counted = np.ones(len(books), dtype=bool)
+    levels = []
+    for dimension in dimensions:
+        dimension_code, labels, readable = dimension_codes(books, dimension)
+        codes = codes * len(labels) + dimension_code
+        counted &= dimension_code >= 0
+        if readable is not None:
+            valid &= readable
+        levels.append(labels)
+
+    sizes = [len(labels) for labels in levels]
+    dense = all('values' in dimension or 'bins' in dimension for dimension in dimensions)
+    total_groups = int(np.prod(sizes)) if sizes else 1
+
+    # lignes sans groupe (valeur manquante d'une dimension sans niveau 'other') : écartées
+    if not counted.all():
+        codes, valid = codes[counted], valid[counted]
+    valid = None if valid.all() else valid
+
+    if not dense or total_groups > DENSE_MAX_GROUPS:
+        # beaucoup de combinaisons possibles : seuls les groupes présents sont numérotés
+        group_ids, present = pd.factorize(codes, sort=True)
+        group_count = len(present)
+    else:
+        group_ids, present, group_count = codes, None, total_groups
+
+    cache = {}
+    counts = np.bincount(group_ids, minlength=group_count)
+    metrics = {}
+    for name, kind, column in spec['metrics']:
+        if kind == 'count':
+            metrics[name] = counts
+            continue
+        values = _metric_column(books, column, cache)
+        values = values[counted] if len(values) != len(group_ids) else values
+        if kind in ('sum', 'mean'):
+            # ligne à la valeur de dimension illisible : comptée sans participer aux sommes
+            weights = values if valid is None else np.where(valid, values, 0.0)
+            sums = np.bincount(group_ids, weights=weights, minlength=group_count)
+            metrics[name] = sums if kind == 'sum' else np.divide(sums, counts, out=np.zeros(group_count),
+                                                                  where=counts > 0)
+        else:
+            neutral = np.inf if kind == 'min' else -np.inf
+            reduced = np.full(group_count, neutral)
+            (np.minimum if kind == 'min' else np.maximum).at(reduced, group_ids,
+                                                             values if valid is None else np.where(valid, values, neutral))
+            metrics[name] = np.where(np.isfinite(reduced), reduced, 0.0)
+
+    # libellés et mesures de tous les groupes calculés colonne par colonne (pas de calcul NumPy par groupe)
+    group_codes = present if present is not None else np.arange(group_count)
+    columns = {}
+    for axis, (dimension, positions) in enumerate(zip(dimensions, np.unravel_index(group_codes, sizes))):
+        labels = [level.item() if hasattr(level, 'item') else level for level in levels[axis]]
+        columns[dimension['name']] = [labels[level] for level in positions.tolist()]
+    for name, kind, column in spec['metrics']:
+        columns[name] = _round_metric(kind, column, metrics[name])
+
+    if len(dimensions) == 1:
+        keys = columns[dimensions[0]['name']]
+    else:
+        keys = list(zip(*(columns[dimension['name']] for dimension in dimensions)))
+    names = list(columns)
+    return {key: dict(zip(names, values)) for key, values in zip(keys, zip(*columns.values()))}
+
+
+#fonction qui renvoie le tableau d'un regroupement (texte), dans le style des autres tableaux du rapport
+def format_group_table(results, spec):
+    spec = group_spec(spec) if isinstance(spec, str) else spec
+    columns = [dimension['name'] for dimension in spec['dimensions']] + [name for name, _, _ in spec['metrics']]
+    widths = [max(15, len(column) + 2) for column in columns]
+    width = max(80, sum(widths))
+
+    lines = ["", "=" * width, f"ANALYSE DES LIVRES PAR {spec['name'].upper()}", "=" * width]
+    lines.append("".join(f"{column:<{size}}" for column, size in zip(columns, widths)).rstrip())
+    lines.append("-" * width)
+    for row in results.values():
+        cells = [f"{row[column]:.2f}" if isinstance(row[column], float) else str(row[column]) for column in columns]
+        lines.append("".join(f"{cell:<{size}}" for cell, size in zip(cells, widths)).rstrip())
+    lines.append("=" * width + "\n")
+    return "\n".join(lines) + "\n"
+
+
+#fonction qui calcule les regroupements demandés (GROUP_BY par défaut) ; un regroupement sur une colonne absente
+#est signalé et ignoré
+def compute_groups(books, names=None):
+    groups = {}
+    for name in (GROUP_BY if names is None else names):
+        try:
+            groups[name] = group_by(books, name)
+        except KeyError as e:
+            print(f"Unknown column for the group-by '{name}' : {e}")
+    return groups
@@ -0,0 +1,321 @@
+#importation des bibliothèques nécessaires
+import json
+import os
+import shutil
+from datetime import date, timedelta
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from .columnar import write_text_column, read_text_column
+from .groupby import group_by
+from .metrics import stage
+from .output import write_atomic
+from .schema import column_values
+
+# dossier de l'historique des prix et des stocks (un instantané par jour, ajouté à chaque analyse si activé)
+HISTORY_DIR = Path(os.environ.get('BOOKS_HISTORY_DIR', 'output/history'))
+
+# BOOKS_HISTORY=1 (ou --history) : chaque analyse complète ajoute son instantané à l'historique
+HISTORY_ENABLED = os.environ.get('BOOKS_HISTORY', '0') == '1'
+
+# version du format du dossier (manifest.json)
+HISTORY_VERSION = 1
+
+# colonnes d'un instantané et leur type : titre remplacé par son numéro, prix en centimes (valeurs exactes),
+# stock sur 2 octets (4 si une valeur dépasse 65535) ; 11 octets par livre et par jour, sans compression
+# générale pour que chaque colonne reste lisible par mmap
+SNAPSHOT_COLUMNS = {
+    'title_id': 'uint32',
+    'price_cents': 'int32',
+    'available': 'uint16',
+    'rating': 'int8'
+}
+
+# colonne supplémentaire des blocs mensuels : jour du mois de chaque ligne
+BLOCK_DAY_COLUMN = ('day', 'uint8')
+
+# mesures par rating gardées dans le manifest (requêtes sur une période sans ouvrir les instantanés)
+HISTORY_METRICS = ['Average_Price', 'Total_Stock', 'Value', 'Book_Count']
+
+
+#fonction qui lit le manifest de l'historique (historique vide si absent)
+def read_history_manifest(directory=None):
+    path = Path(directory or HISTORY_DIR) / 'manifest.json'
+    if not path.exists():
+        return {'version': HISTORY_VERSION, 'title_count': 0, 'title_parts': [], 'snapshots': []}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+#fonction qui lit le dictionnaire des titres : le titre de numéro i est titles[i]
+def read_history_titles(directory=None, manifest=None):
+    directory = Path(directory or HISTORY_DIR)
+    manifest = manifest or read_history_manifest(directory)
+    parts = [read_text_column(directory / part, 'title') for part in manifest['title_parts']]
+    return np.concatenate(parts) if parts else np.empty(0, dtype=object)
+
+
+#fonction qui écrit la table de recherche des titres (titres/lookup) : titres triés (octets UTF-8, largeur fixe)
+#et numéro de chaque titre ; un titre se trouve ensuite par recherche dichotomique, sans lire le dictionnaire
+def _write_title_lookup(directory, titles):
+    keys = np.array([title.encode('utf-8') if isinstance(title, str) else b'' for title in titles], dtype='S')
+    order = np.argsort(keys, kind='stable')
+    _write_columns(Path(directory) / 'titles' / 'lookup', {'title': keys[order], 'title_id': order},
+                   {'title': keys.dtype, 'title_id': 'uint32'})
+
+
+#fonction qui ouvre la table de recherche des titres (mmap) ; reconstruite si absente ou en retard sur le dictionnaire
+#(historique écrit avant son ajout)
+def _title_lookup(directory, manifest):
+    path = Path(directory) / 'titles' / 'lookup'
+    if not (path / 'title_id.npy').exists() or \
+            len(np.load(path / 'title_id.npy', mmap_mode='r')) != manifest['title_count']:
+        _write_title_lookup(directory, read_history_titles(directory, manifest))
+    return np.load(path / 'title.npy', mmap_mode='r'), np.load(path / 'title_id.npy', mmap_mode='r')
+
+
+#fonction qui renvoie le numéro d'un titre dans le dictionnaire (None s'il n'y a jamais été ajouté)
+def find_title_id(title, directory=None, manifest=None):
+    directory = Path(directory or HISTORY_DIR)
+    manifest = manifest or read_history_manifest(directory)
+    if manifest['title_count'] == 0 or not isinstance(title, str):
+        return None
+    keys, ids = _title_lookup(directory, manifest)
+    word = title.encode('utf-8')
+    if len(word) > keys.dtype.itemsize:
+        return None
+    position = np.searchsorted(keys, word)
+    if position == len(keys) or keys[position] != word:
+        return None
+    return int(ids[position])
+
+
+#fonction qui renvoie le numéro de chaque titre (dictionnaire complété par les titres jamais vus ; titre manquant : '')
+#renvoie (numéros, nouveaux titres à ajouter au dictionnaire)
+def intern_titles(titles, known):
+    # titre manquant : numéroté comme le titre vide (factorize ne numérote pas les valeurs manquantes)
+    titles = pd.Series(titles, dtype=object).fillna('').to_numpy(dtype=object)
+    index = pd.Index(known, dtype=object)
+    ids = index.get_indexer(titles) if len(index) > 0 else np.full(len(titles), -1, dtype='int64')
+    unknown = ids < 0
+    if not unknown.any():
+        return ids.astype('uint32'), np.empty(0, dtype=object)
+
+    # nouveaux titres : numéros suivants, dans l'ordre de première apparition
+    codes, new_titles = pd.factorize(pd.Series(titles[unknown], dtype=object))
+    ids[unknown] = len(index) + codes
+    return ids.astype('uint32'), np.asarray(new_titles, dtype=object)
+
+
+#fonction qui écrit des colonnes .npy dans un dossier, mis en place d'un bloc (un dossier existant est remplacé)
+def _write_columns(target, columns, dtypes):
+    staging = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir(parents=True)
+    for name, dtype in dtypes.items():
+        values = np.asarray(columns[name])
+        # entier trop grand pour le type prévu (stock au-delà de 65535) : type sur 4 octets
+        if len(values) > 0 and np.issubdtype(np.dtype(dtype), np.integer) and values.max() > np.iinfo(dtype).max:
+            dtype = np.promote_types(dtype, 'uint32')
+        np.save(staging / f"{name}.npy", values.astype(dtype))
+    if target.exists():
+        shutil.rmtree(target)
+    os.replace(staging, target)
+
+
+#fonction qui ajoute (ou remplace) l'instantané d'un jour : colonnes typées rangées par numéro de titre,
+#nouveaux titres dans une nouvelle partie du dictionnaire, mesures par rating dans le manifest
+def append_snapshot(books, day=None, directory=None):
+    directory = Path(directory or HISTORY_DIR)
+    day = (day or date.today()).isoformat() if not isinstance(day, str) else day
+    manifest = read_history_manifest(directory)
+
+    titles = np.asarray(books['title'], dtype=object)
+    known = read_history_titles(directory, manifest)
+    ids, new_titles = intern_titles(titles, known)
+
+    if len(new_titles) > 0:
+        part = f"titles/part-{len(manifest['title_parts']):05d}"
+        (directory / part).mkdir(parents=True, exist_ok=True)
+        write_text_column(directory / part, 'title', new_titles)
+        _write_title_lookup(directory, np.concatenate([known, new_titles]))
+        manifest['title_parts'].append(part)
+        manifest['title_count'] += len(new_titles)
+
+    # lignes rangées par numéro de titre : l'historique d'un livre se trouve par recherche dichotomique
+    order = np.argsort(ids, kind='stable')
+    columns = {
+        'title_id': ids[order],
+        'price_cents': np.round(column_values(books, 'price').astype('float64')[order] * 100),
+        'available': np.asarray(books['available'])[order],
+        'rating': np.asarray(books['rating'])[order]
+    }
+
+    # dossier écrit à côté puis mis en place d'un bloc (un instantané du même jour est remplacé)
+    target = directory / 'snapshots' / f"date={day}"
+    _write_columns(target, columns, SNAPSHOT_COLUMNS)
+
+    by_rating = group_by(books, 'rating')
+    entry = {
+        'date': day,
+        'path': str(target.relative_to(directory)),
+        'rows': len(books),
+        'by_rating': {str(rating): {name: row[name] for name in HISTORY_METRICS} for rating, row in by_rating.items()}
+    }
+    manifest['snapshots'] = sorted([snapshot for snapshot in manifest['snapshots'] if snapshot['date'] != day] + [entry],
+                                   key=lambda snapshot: snapshot['date'])
+    _write_manifest(directory, manifest)
+
+    # les mois précédents terminés sont regroupés en blocs
+    compact_history(directory, before=day)
+    return target
+
+
+#fonction qui écrit le manifest de l'historique (écriture atomique)
+def _write_manifest(directory, manifest):
+    write_atomic(Path(directory) / 'manifest.json', json.dumps(manifest, ensure_ascii=False, indent=2))
+
+
+#fonction qui renvoie les lignes d'un instantané, qu'il soit seul dans son dossier ou dans un bloc mensuel
+#'rows' : tranche de lignes à lire (toutes par défaut) ; colonnes projetées en mémoire (mmap)
+def _snapshot_columns(directory, snapshot, names, rows=slice(None)):
+    path = Path(directory) / snapshot['path']
+    columns = {name: np.load(path / f"{name}.npy", mmap_mode='r')[rows] for name in names}
+    if not snapshot['path'].startswith('blocks/'):
+        return columns
+    # bloc : seules les lignes du jour demandé
+    day = np.load(path / f"{BLOCK_DAY_COLUMN[0]}.npy", mmap_mode='r')[rows]
+    same_day = day == int(snapshot['date'][8:])
+    return {name: values[same_day] for name, values in columns.items()}
+
+
+#fonction qui regroupe les instantanés quotidiens des mois terminés (avant le mois de 'before') en un bloc par mois,
+#lignes rangées par numéro de titre puis par jour : l'historique d'un livre sur un mois se lit d'un seul morceau
+def compact_history(directory=None, before=None):
+    directory = Path(directory or HISTORY_DIR)
+    manifest = read_history_manifest(directory)
+    current_month = (before or date.today().isoformat())[:7]
+    months = sorted({snapshot['date'][:7] for snapshot in manifest['snapshots']
+                     if snapshot['date'][:7] < current_month and not snapshot['path'].startswith('blocks/')})
+
+    for month in months:
+        entries = [snapshot for snapshot in manifest['snapshots'] if snapshot['date'][:7] == month]
+        parts = []
+        for snapshot in entries:
+            columns = {name: np.array(values) for name, values in _snapshot_columns(directory, snapshot, SNAPSHOT_COLUMNS).items()}
+            columns[BLOCK_DAY_COLUMN[0]] = np.full(len(columns['title_id']), int(snapshot['date'][8:]))
+            parts.append(columns)
+        block = {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+        order = np.lexsort((block[BLOCK_DAY_COLUMN[0]], block['title_id']))
+        block = {name: values[order] for name, values in block.items()}
+
+        target = directory / 'blocks' / f"month={month}"
+        _write_columns(target, block, {**SNAPSHOT_COLUMNS, BLOCK_DAY_COLUMN[0]: BLOCK_DAY_COLUMN[1]})
+        daily = [directory / snapshot['path'] for snapshot in entries if not snapshot['path'].startswith('blocks/')]
+        for snapshot in entries:
+            snapshot['path'] = str(target.relative_to(directory))
+        _write_manifest(directory, manifest)
+
+        # dossiers quotidiens supprimés une fois le manifest à jour
+        for path in daily:
+            shutil.rmtree(path, ignore_errors=True)
+    return months
+
+
+#fonction qui renvoie les instantanés d'une période (dates ISO incluses ; 'days' : derniers jours jusqu'à 'end')
+def _snapshots_between(manifest, start=None, end=None, days=None):
+    end = end or date.today().isoformat()
+    if days is not None:
+        start = (date.fromisoformat(end) - timedelta(days=days - 1)).isoformat()
+    return [snapshot for snapshot in manifest['snapshots']
+            if (start is None or snapshot['date'] >= start) and snapshot['date'] <= end]
+
+
+#fonction qui renvoie l'historique d'un livre : une ligne par jour (et par prix si le titre a plusieurs éditions)
+#lecture par mmap et recherche dichotomique (table des titres, puis chaque bloc ou instantané) : seules quelques pages sont lues
+def price_history(title, start=None, end=None, days=None, directory=None):
+    directory = Path(directory or HISTORY_DIR)
+    manifest = read_history_manifest(directory)
+    title_id = find_title_id(title, directory, manifest)
+    if title_id is None:
+        return pd.DataFrame(columns=['date', 'price', 'available', 'rating'])
+
+    # jours demandés de chaque dossier (un bloc mensuel est ouvert une seule fois pour tous ses jours)
+    wanted = {}
+    for snapshot in _snapshots_between(manifest, start, end, days):
+        wanted.setdefault(snapshot['path'], []).append(snapshot['date'])
+
+    parts = []
+    for path, dates in wanted.items():
+        ids = np.load(directory / path / 'title_id.npy', mmap_mode='r')
+        rows = slice(np.searchsorted(ids, title_id, side='left'), np.searchsorted(ids, title_id, side='right'))
+        if rows.start == rows.stop:
+            continue
+        names = ['price_cents', 'available', 'rating'] + ([BLOCK_DAY_COLUMN[0]] if path.startswith('blocks/') else [])
+        columns = {name: np.asarray(np.load(directory / path / f"{name}.npy", mmap_mode='r')[rows]) for name in names}
+        part = pd.DataFrame({
+            'date': dates[0],
+            'price': columns['price_cents'].astype('int64') / 100,
+            'available': columns['available'].astype('int64'),
+            'rating': columns['rating'].astype('int64')
+        })
+        if BLOCK_DAY_COLUMN[0] in columns:
+            # bloc : jour de chaque ligne, seuls les jours demandés (et toujours rattachés au bloc) sont gardés
+            part['date'] = [f"{dates[0][:7]}-{day:02d}" for day in columns[BLOCK_DAY_COLUMN[0]].tolist()]
+            part = part[part['date'].isin(dates)]
+        parts.append(part)
+
+    if not parts:
+        return pd.DataFrame(columns=['date', 'price', 'available', 'rating'])
+    return pd.concat(parts, ignore_index=True).sort_values('date', kind='stable').reset_index(drop=True)
+
+
+#fonction qui renvoie les mesures par rating de chaque jour d'une période, lues dans le manifest seul
+#(une ligne par jour et par rating ; ex. valeur du stock par rating sur les 90 derniers jours)
+def rating_history(start=None, end=None, days=None, directory=None):
+    manifest = read_history_manifest(directory)
+    rows = [{'date': snapshot['date'], 'rating': int(rating), **metrics}
+            for snapshot in _snapshots_between(manifest, start, end, days)
+            for rating, metrics in snapshot['by_rating'].items()]
+    return pd.DataFrame(rows, columns=['date', 'rating'] + HISTORY_METRICS)
+
+
+#fonction qui renvoie un tableau jour x rating d'une mesure (texte), dans le style des autres tableaux du rapport
+def format_rating_history(history, metric='Value'):
+    table = history.pivot(index='date', columns='rating', values=metric) if not history.empty else pd.DataFrame()
+    width = max(80, 12 + 12 * len(table.columns))
+    lines = ["", "=" * width, f"HISTORIQUE PAR RATING : {metric}", "=" * width]
+    lines.append(f"{'Date':<12}" + "".join(f"{rating:<12}" for rating in table.columns))
+    lines.append("-" * width)
+    for day, values in table.iterrows():
+        cells = [f"{value:.2f}" if isinstance(value, float) else str(value) for value in values.tolist()]
+        lines.append(f"{day:<12}" + "".join(f"{cell:<12}" for cell in cells))
+    lines.append("=" * width + "\n")
+    return "\n".join(lines) + "\n"
+
+
+#fonction appelée après une analyse complète : ajoute l'instantané du jour si l'historique est activé
+def record_history(books):
+    if not HISTORY_ENABLED or books is None or len(books) == 0:
+        return None
+    try:
+        with stage('append_history', rows_in=len(books)):
+            return append_snapshot(books)
+    except Exception as e:
+        print(f"Error during the saving of the history : {e}")
+        return None
+
+
+#fonction principale de la commande 'history' : historique d'un livre ou mesures par rating sur une période
+def run_history(title=None, days=None, metric='Value'):
+    if title:
+        history = price_history(title, days=days)
+        if history.empty:
+            print(f"No history for the book '{title}'.")
+        else:
+            print(history.to_string(index=False))
+        return history
+
+    history = rating_history(days=days)
+    print(format_rating_history(history, metric), end="")
+    return history
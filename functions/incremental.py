@@ -0,0 +1,194 @@
+#importation des bibliothèques nécessaires
+import hashlib
+import io
+import os
+import pickle
+import traceback
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from .data_cleaner import clean_data, CLEANER_VERSION
+from . import near_duplicates
+from .manage import csv_file, chunk_size, read_options
+from .metrics import stage
+from .dedup_index import new_dedup_index
+from .schema import column_values
+from .analyzer import (new_statistics_accumulator, update_statistics_accumulator,
+                       finalize_statistics_accumulator, finalize_distribution, finalize_ranking,
+                       write_analysis_report)
+
+# fichier d'état du mode incrémental (position lue, clés déjà vues, accumulateurs)
+# hors du dossier du cache : vider le cache (--clear-cache) ne fait pas repartir du début
+STATE_FILE = Path(os.environ.get('BOOKS_INCREMENTAL_STATE', 'output/state/incremental_state.pkl'))
+
+# version du contenu de l'état (accumulateurs) : un état d'une autre version est reconstruit depuis le début
+STATE_VERSION = 5
+
+# colonnes gardées dans l'état pour le nuage de points prix / stock (livres en stock seulement, comme
+# create_relationship_plot) : le graphique est redessiné sans relire le CSV
+CHART_COLUMNS = {'price': 'float64', 'available': 'int64', 'rating': 'int64'}
+
+# nombre d'octets du début de fichier utilisés pour détecter une réécriture complète du CSV
+HEAD_BYTES = 64 * 1024
+
+
+#fonction qui calcule l'empreinte du début du fichier (détection d'un fichier remplacé et non complété)
+def _head_digest(path, length):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read(min(length, HEAD_BYTES))).hexdigest()
+
+
+#fonction qui crée un état vide (tout sera relu depuis le début du fichier)
+def new_incremental_state(path):
+    return {
+        'path': str(Path(path).resolve()),
+        'state_version': STATE_VERSION,
+        'cleaner_version': CLEANER_VERSION,
+        'near_duplicates': near_duplicates.NEAR_DUPLICATE_THRESHOLD,
+        'offset': 0,
+        'head_digest': None,
+        'header': None,
+        'seen': new_dedup_index(),
+        'accumulator': new_statistics_accumulator(),
+        'chart_columns': {name: np.empty(0, dtype=dtype) for name, dtype in CHART_COLUMNS.items()}
+    }
+
+
+#fonction qui vérifie que le fichier n'a été que complété depuis la création de l'état (pas réécrit ni tronqué)
+def state_matches_file(state, path):
+    return (
+        state['path'] == str(Path(path).resolve())
+        and state.get('state_version') == STATE_VERSION
+        and state['cleaner_version'] == CLEANER_VERSION
+        and state.get('near_duplicates', 0) == near_duplicates.NEAR_DUPLICATE_THRESHOLD
+        and state['offset'] <= Path(path).stat().st_size
+        and state['head_digest'] == _head_digest(path, state['offset'])
+    )
+
+
+#fonction de lecture de l'état sauvegardé (état vide si absent, illisible ou périmé)
+def load_incremental_state(path, state_file=None):
+    state_file = Path(state_file or STATE_FILE)
+
+    if state_file.exists():
+        try:
+            with open(state_file, 'rb') as f:
+                state = pickle.load(f)
+
+            if state_matches_file(state, path):
+                return state
+
+            print("Le fichier CSV a été réécrit : analyse complète depuis le début.")
+
+        except Exception as e:
+            print(f"Etat incrémental illisible, analyse complète : {e}")
+
+    return new_incremental_state(path)
+
+
+#fonction d'écriture de l'état (fichier temporaire puis renommage)
+def save_incremental_state(state, state_file=None):
+    state_file = Path(state_file or STATE_FILE)
+    state_file.parent.mkdir(parents=True, exist_ok=True)
+
+    temporary = state_file.with_name(state_file.name + '.tmp')
+    with open(temporary, 'wb') as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temporary, state_file)
+
+
+#fonction qui lit uniquement les lignes complètes ajoutées depuis la dernière exécution
+def read_new_rows(path, state, size=None):
+    with open(path, 'rb') as f:
+        f.seek(state['offset'])
+        data = f.read()
+
+    # une dernière ligne sans retour à la ligne est peut-être en cours d'écriture : elle sera lue la prochaine fois
+    end = data.rfind(b'\n') + 1
+    data = data[:end]
+    if not data.strip():
+        return [], 0
+
+    # première lecture : la ligne d'en-tête donne les noms de colonnes pour les lectures suivantes
+    header = 'infer'
+    if state['header'] is None:
+        state['header'] = list(pd.read_csv(io.BytesIO(data), nrows=0, **read_options).columns)
+        header = 0
+
+    reader = pd.read_csv(io.BytesIO(data), chunksize=size or chunk_size, header=header,
+                         names=state['header'], **read_options)
+    return reader, end
+
+
+#fonction qui ajoute aux colonnes du nuage de points de l'état les livres en stock d'un paquet nettoyé
+def append_chart_columns(state, books):
+    if len(books) == 0:
+        return
+    columns = {name: column_values(books, name) for name in CHART_COLUMNS}
+    in_stock = (columns['available'] > 0) & (columns['price'] > 0.0)
+    state['chart_columns'] = {
+        name: np.concatenate([state['chart_columns'][name], columns[name][in_stock].astype(dtype)])
+        for name, dtype in CHART_COLUMNS.items()
+    }
+
+
+#fonction qui nettoie les lignes ajoutées au CSV et les ajoute aux accumulateurs de l'état
+#renvoie le nombre de lignes lues et, si 'keep', les paquets nettoyés (sinon liste vide)
+def consume_new_rows(path, state, size=None, keep=False):
+    reader, consumed = read_new_rows(path, state, size)
+
+    new_rows = 0
+    frames = []
+    for chunk in reader:
+        new_rows += len(chunk)
+        books_cleaned = clean_data(chunk, seen=state['seen'])
+        with stage('aggregate', rows_in=len(books_cleaned)):
+            update_statistics_accumulator(state['accumulator'], books_cleaned)
+        append_chart_columns(state, books_cleaned)
+        if keep and len(books_cleaned) > 0:
+            frames.append(books_cleaned)
+
+    state['offset'] += consumed
+    state['head_digest'] = _head_digest(path, state['offset'])
+    return new_rows, frames
+
+
+#fonction principale : met à jour le rapport avec les seules lignes ajoutées au CSV
+def analyze_data_incremental(path=None, state_file=None, size=None):
+    path = Path(path) if path else csv_file
+
+    if not path.exists():
+        print(f"File : {path} not found.")
+        return {}
+
+    try:
+        state = load_incremental_state(path, state_file)
+        new_rows, _ = consume_new_rows(path, state, size)
+        save_incremental_state(state, state_file)
+
+        print(f"\nMISE À JOUR INCRÉMENTALE - {new_rows} nouvelles lignes, "
+              f"{state['accumulator']['total_books']} livres au total")
+
+        if state['accumulator']['total_books'] == 0:
+            print("data not found (no book to analyze)")
+            return {}
+
+        results_by_rating, global_stats = finalize_statistics_accumulator(state['accumulator'])
+        distribution = finalize_distribution(state['accumulator'])
+        rankings = finalize_ranking(state['accumulator'])
+        with stage('write_report'):
+            write_analysis_report(results_by_rating, global_stats, distribution=distribution, rankings=rankings)
+
+        return {
+            'by_rating': results_by_rating,
+            'global_stats': global_stats,
+            'distribution': distribution,
+            'rankings': rankings,
+            'chart_columns': state['chart_columns'],
+            'new_rows': new_rows
+        }
+
+    except Exception as e:
+        print(f"Error : {e}")
+        traceback.print_exc()
+        return {}
@@ -1,27 +1,55 @@
 #importer les librairies nécessaires
 import pandas as pd
 from pathlib import Path
+import glob
 import os
+from collections import defaultdict
+from .metrics import stage
+from .schema import TEXT_COLUMNS, TEXT_DTYPE
 
 
 #indication du chemin du fichier csv 'books.csv'
 csv_filename = os.environ.get('BOOKS_CSV_FILE', 'input/books.csv')
 csv_file=Path(__file__).parent.parent/csv_filename
 
+#taille des paquets de lignes lus en mode streaming
+chunk_size=int(os.environ.get('BOOKS_CHUNK_SIZE', 100_000))
+
+#options de lecture communes : toutes les colonnes restent du texte brut,
+#c'est le nettoyage qui se charge des conversions (même résultat quel que soit le découpage) ;
+#les colonnes texte du schéma (titre, image) sont lues directement dans leur type final
+read_options={'encoding': 'utf-8', 'dtype': defaultdict(lambda: str, {name: TEXT_DTYPE for name in TEXT_COLUMNS})}
+
+
+#fonction qui liste les fichiers CSV à lire : un fichier, un dossier (tous ses *.csv) ou un motif glob
+def list_csv_shards(source=None):
+
+    source=str(source) if source else str(csv_file)
+    path=Path(source)
+
+    if path.is_dir():
+        return sorted(path.glob('*.csv'))
+    if any(character in source for character in '*?['):
+        return sorted(Path(name) for name in glob.glob(source))
+    if path.exists():
+        return [path]
+    return []
+
 
 #fonction de lecture du fichier 'books.csv'
-def load_books():
+def load_books(path=None):
 
-    if not csv_file.exists():
-        print(f"File : {csv_file} not found.")
+    file=Path(path) if path else csv_file
+
+    if not file.exists():
+        print(f"File : {file} not found.")
         return []
     
     try:
-        #lecture du contenu du fichier 'books.csv'
-        data_csv=pd.read_csv(csv_file,encoding='utf-8')
-
-        #conversion des données en une liste de dictionnaires
-        books=data_csv.to_dict(orient='records')
+        #lecture du contenu du fichier 'books.csv' (la DataFrame est passée telle quelle au nettoyage)
+        with stage('load_books') as record:
+            books=pd.read_csv(file,**read_options)
+            record['rows_out']=len(books)
 
         print("Fichier CSV chargé avec succès.")
         return books
@@ -35,6 +63,34 @@ def load_books():
     except Exception as e:
         print(f"Une erreur inattendue s'est produite: {e}")
         return []
-    
 
-    
+
+#fonction de lecture du fichier 'books.csv' par paquets de lignes (mémoire bornée)
+def load_books_chunks(size=None, path=None):
+
+    file=Path(path) if path else csv_file
+
+    if not file.exists():
+        print(f"File : {file} not found.")
+        return
+
+    size=size or chunk_size
+
+    try:
+        with pd.read_csv(file,chunksize=size,**read_options) as reader:
+            chunks=iter(reader)
+            while True:
+                with stage('load_books_chunk') as record:
+                    chunk=next(chunks,None)
+                    record['rows_out']=0 if chunk is None else len(chunk)
+                if chunk is None:
+                    break
+                yield chunk
+
+    #capture des erreurs fichier introuvable et erreurs de decodage
+    except (FileNotFoundError,pd.errors.EmptyDataError,IOError) as e:
+        print(f"Erreur lors de la lecture du fichier CSV: {e}")
+
+    #autres erreurs inattendues
+    except Exception as e:
+        print(f"Une erreur inattendue s'est produite: {e}")
@@ -0,0 +1,103 @@
+#importation des bibliothèques nécessaires
+import json
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:
+    # pas de module resource sous Windows : pas de mesure du pic de mémoire du processus
+    resource = None
+
+# BOOKS_METRICS=1 : temps, CPU, lignes et pic mémoire (RSS) de chaque étape
+# BOOKS_METRICS=trace : en plus, pic mémoire Python de chaque étape via tracemalloc (plus lent)
+METRICS_MODE = os.environ.get('BOOKS_METRICS', '0')
+METRICS_ENABLED = METRICS_MODE not in ('', '0')
+TRACE_MEMORY = METRICS_MODE == 'trace'
+
+# mesures de l'exécution en cours
+_records = []
+
+
+#fonction qui renvoie le pic de mémoire résidente du processus en Mo (None si indisponible)
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss est en Ko sous Linux et en octets sous macOS
+    return round(peak / 1024 / (1024 if sys.platform == 'darwin' else 1), 2)
+
+
+#fonction qui mesure une étape du pipeline ; le bloc peut renseigner record['rows_out']
+@contextmanager
+def stage(name, rows_in=None, collect=True):
+    if not METRICS_ENABLED:
+        yield {}
+        return
+
+    record = {'stage': name, 'rows_in': rows_in, 'rows_out': None}
+    if TRACE_MEMORY:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    try:
+        yield record
+    finally:
+        record['wall_seconds'] = round(time.perf_counter() - wall_start, 6)
+        record['cpu_seconds'] = round(time.process_time() - cpu_start, 6)
+        record['peak_rss_mb'] = _peak_rss_mb()
+        if TRACE_MEMORY:
+            record['peak_traced_mb'] = round(tracemalloc.get_traced_memory()[1] / 1e6, 2)
+        record['pid'] = os.getpid()
+        if collect:
+            _records.append(record)
+
+
+#fonction qui ajoute une mesure faite ailleurs (par exemple dans un processus de rendu)
+def add_record(record):
+    if METRICS_ENABLED and record:
+        _records.append(record)
+
+
+#fonction qui renvoie les mesures de l'exécution en cours
+def get_records():
+    return list(_records)
+
+
+#fonction qui vide les mesures (début d'une nouvelle exécution)
+def reset_metrics():
+    _records.clear()
+
+
+#fonction de sauvegarde des mesures en JSON, à côté du rapport d'analyse
+def save_metrics(directory="output", filename="analysis_metrics.json"):
+    if not METRICS_ENABLED:
+        return None
+
+    try:
+        output_dir = Path(directory)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        filepath = output_dir / filename
+
+        content = {
+            'generated_at': datetime.now(timezone.utc).isoformat(),
+            'mode': METRICS_MODE,
+            'total_wall_seconds': round(sum(r['wall_seconds'] for r in _records), 6),
+            'stages': _records
+        }
+        filepath.write_text(json.dumps(content, indent=2), encoding='utf-8')
+
+        print(f"Metrics save in : **{filepath}**")
+        return filepath
+
+    except Exception as e:
+        print(f"Error during the saving of the metrics : {e}")
+        return None
@@ -0,0 +1,268 @@
+#importation des bibliothèques nécessaires
+import os
+import re
+import string
+import unicodedata
+import numpy as np
+import pandas as pd
+
+# seuil de similarité (Jaccard des trigrammes de caractères des titres) au-delà duquel deux livres au même prix
+# sont des quasi-doublons ; 0 désactive l'étape (ex. BOOKS_NEAR_DUPLICATES=0.8)
+NEAR_DUPLICATE_THRESHOLD = float(os.environ.get('BOOKS_NEAR_DUPLICATES', 0) or 0)
+
+# signature MinHash : nombre de fonctions de hachage, découpées en bandes pour le LSH
+# 8 bandes de 4 valeurs : deux titres similaires à 0.8 partagent au moins une bande dans 98 % des cas
+MINHASH_PERMUTATIONS = 32
+LSH_BANDS = 8
+
+# nombre de titres traités à la fois pour le calcul des signatures (mémoire bornée)
+MINHASH_BLOCK = 200_000
+
+# nombre d'exemples de groupes fusionnés affichés dans le résumé
+MAX_CLUSTER_EXAMPLES = 3
+
+# fonctions de hachage (a * x + b sur 64 bits, a impair) : graine fixe, signatures identiques d'une exécution à l'autre
+_rng = np.random.default_rng(2024)
+_HASH_A = _rng.integers(1, 2**63, size=MINHASH_PERMUTATIONS, dtype='uint64') * np.uint64(2) + np.uint64(1)
+_HASH_B = _rng.integers(0, 2**63, size=MINHASH_PERMUTATIONS, dtype='uint64')
+
+# suffixe de série en fin de titre : '(Triangular Trade Trilogy, #1)', '(Scott Pilgrim #1)'
+SERIES_SUFFIX = re.compile(r'\s*\([^()]*#\s*\d+[^()]*\)\s*$')
+
+# un titre tronqué est aussi comparé aux titres de même prix qui commencent par les mêmes caractères
+TRUNCATED_PREFIX = 16
+
+# titre tronqué par le site : '... Changing Whether...'
+TRUNCATION_SUFFIX = re.compile(r'(\.{3,}|…)\s*$')
+
+# ponctuation remplacée par des espaces (un seul passage str.translate par titre)
+PUNCTUATION_TABLE = str.maketrans({character: ' ' for character in string.punctuation + '‘’“”«»–—…·'})
+
+
+#fonction qui retire les accents d'un texte ('Café' -> 'Cafe') ; un texte ASCII est rendu tel quel
+def strip_accents(text):
+    if text.isascii():
+        return text
+    return ''.join(character for character in unicodedata.normalize('NFKD', text) if not unicodedata.combining(character))
+
+
+#fonction qui normalise un titre avant comparaison : minuscules, accents, ponctuation, espaces,
+#suffixe de série et marque de troncature retirés ; renvoie (titre normalisé, titre tronqué)
+def normalize_title(title):
+    text = strip_accents(title if isinstance(title, str) else '').lower().rstrip()
+    if text.endswith(')'):
+        text = SERIES_SUFFIX.sub('', text)
+    truncated = text.endswith(('...', '…'))
+    if truncated:
+        text = TRUNCATION_SUFFIX.sub('', text)
+    return ' '.join(text.translate(PUNCTUATION_TABLE).split()), truncated
+
+
+#fonction qui renvoie les nombres d'un titre normalisé ('23', '1 2') : deux titres aux nombres différents
+#(tome, année, numéro) ne sont pas fusionnés
+def title_numbers(text):
+    return ' '.join(re.findall(r'\d+', text))
+
+
+#fonction qui calcule les trigrammes (3 octets UTF-8 consécutifs) de chaque titre, sur un seul tableau d'octets
+#renvoie (trigrammes mélangés sur 64 bits, position du premier trigramme de chaque titre)
+def _title_shingles(texts):
+    # un titre de moins de 3 octets est complété par des espaces : au moins un trigramme par titre
+    encoded = [text.encode('utf-8').ljust(3) for text in texts]
+    data = np.frombuffer(b'\x00'.join(encoded), dtype='uint8').astype('uint64')
+
+    # trigramme à chaque position ; ceux qui chevauchent deux titres (octet nul) sont écartés
+    grams = (data[:-2] << np.uint64(16)) | (data[1:-1] << np.uint64(8)) | data[2:]
+    inside = (data[:-2] != 0) & (data[1:-1] != 0) & (data[2:] != 0)
+    grams = grams[inside]
+
+    counts = np.fromiter(map(len, encoded), dtype='int64', count=len(encoded)) - 2
+    starts = np.zeros(len(encoded), dtype='int64')
+    np.cumsum(counts[:-1], out=starts[1:])
+
+    # mélange des bits (multiplication par une constante impaire puis décalage) avant les fonctions de hachage
+    grams = grams * np.uint64(0x9E3779B97F4A7C15)
+    grams ^= grams >> np.uint64(29)
+    return grams, starts
+
+
+#fonction qui calcule les signatures MinHash des titres normalisés : (nombre de titres, MINHASH_PERMUTATIONS) en uint32
+#(pour chaque fonction de hachage, plus petite valeur sur les trigrammes du titre, en un passage NumPy)
+def minhash_signatures(texts):
+    signatures = np.empty((len(texts), MINHASH_PERMUTATIONS), dtype='uint32')
+    for block in range(0, len(texts), MINHASH_BLOCK):
+        grams, starts = _title_shingles(texts[block:block + MINHASH_BLOCK])
+        hashed = np.empty_like(grams)
+        for column in range(MINHASH_PERMUTATIONS):
+            np.multiply(grams, _HASH_A[column], out=hashed)
+            hashed += _HASH_B[column]
+            signatures[block:block + len(starts), column] = np.minimum.reduceat(hashed, starts) >> np.uint64(32)
+    return signatures
+
+
+#fonction qui associe chaque membre d'un seau au premier membre du seau (coût linéaire, pas toutes les paires)
+#renvoie les paires (premier membre, autre membre)
+def _bucket_pairs(bucket):
+    order = np.argsort(bucket, kind='stable')
+    sorted_buckets = bucket[order]
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = sorted_buckets[1:] != sorted_buckets[:-1]
+    leaders = order[np.flatnonzero(first)[np.cumsum(first) - 1]]
+    members = ~first
+    return np.stack([leaders[members], order[members]], axis=1)
+
+
+#fonction qui combine des valeurs dans l'empreinte 64 bits d'un seau
+def _mix(bucket, values):
+    bucket = bucket * np.uint64(0x100000001B3) + values.astype('uint64')
+    return bucket ^ (bucket >> np.uint64(31))
+
+
+#fonction qui renvoie les paires candidates (i, j), i < j : titres qui partagent une bande entière de leur signature
+#(et le même prix si 'keys' est donné)
+def lsh_candidates(signatures, keys=None):
+    rows = MINHASH_PERMUTATIONS // LSH_BANDS
+    pairs = []
+    for band in range(LSH_BANDS):
+        # empreinte de la bande : combinaison des valeurs de la bande (et de la clé) sur 64 bits
+        bucket = np.full(len(signatures), band + 1, dtype='uint64')
+        if keys is not None:
+            bucket = _mix(bucket, keys)
+        for column in range(band * rows, (band + 1) * rows):
+            bucket = _mix(bucket, signatures[:, column])
+        pairs.append(_bucket_pairs(bucket))
+
+    if not pairs:
+        return np.empty((0, 2), dtype='int64')
+    pairs = np.concatenate(pairs)
+    return np.unique(np.sort(pairs, axis=1), axis=0)
+
+
+#fonction qui renvoie les paires candidates des titres tronqués : titres de même début (et même prix si 'keys'
+#est donné), seulement dans les seaux qui contiennent un titre tronqué
+#(un titre tronqué partage peu de trigrammes avec le titre complet : le LSH seul le manquerait souvent)
+def prefix_candidates(texts, truncated, keys=None):
+    bucket = pd.factorize(pd.Series([text[:TRUNCATED_PREFIX] for text in texts], dtype=object))[0]
+    bucket = bucket.astype('uint64')
+    if keys is not None:
+        bucket = _mix(bucket, keys)
+    rows = np.flatnonzero(np.isin(bucket, bucket[truncated]))
+    pairs = rows[_bucket_pairs(bucket[rows])]
+    return np.sort(pairs, axis=1)
+
+
+#fonction qui regroupe les lignes reliées par des paires (union-find par propagation du plus petit numéro)
+#renvoie le numéro de groupe de chaque ligne (numéro de sa plus petite ligne)
+def connected_components(count, pairs):
+    labels = np.arange(count)
+    if len(pairs) == 0:
+        return labels
+    left, right = pairs[:, 0], pairs[:, 1]
+    while True:
+        smallest = np.minimum(labels[left], labels[right])
+        before = labels.copy()
+        np.minimum.at(labels, left, smallest)
+        np.minimum.at(labels, right, smallest)
+        # raccourci des chaînes : chaque ligne pointe directement vers la racine de son groupe
+        while True:
+            jumped = labels[labels]
+            if np.array_equal(jumped, labels):
+                break
+            labels = jumped
+        if np.array_equal(labels, before):
+            return labels
+
+
+#fonction qui trouve les groupes de quasi-doublons parmi des titres (et des prix, même prix exigé si donnés)
+#renvoie le numéro de groupe de chaque livre (numéro de sa première ligne)
+def near_duplicate_groups(titles, prices=None, threshold=None):
+    threshold = NEAR_DUPLICATE_THRESHOLD if threshold is None else threshold
+    texts, truncated = zip(*map(normalize_title, titles)) if len(titles) > 0 else ((), ())
+    truncated = np.array(truncated, dtype=bool)
+
+    # titres vides après normalisation : jamais rapprochés
+    comparable = np.flatnonzero([len(text) > 0 for text in texts])
+    labels = np.arange(len(texts))
+    if len(comparable) < 2:
+        return labels
+    texts = [texts[position] for position in comparable]
+    truncated = truncated[comparable]
+
+    signatures = minhash_signatures(texts)
+    keys = None
+    if prices is not None:
+        keys = np.round(np.asarray(prices, dtype='float64')[comparable] * 100).astype('int64')
+    pairs = lsh_candidates(signatures, keys)
+    if truncated.any():
+        pairs = np.unique(np.concatenate([pairs, prefix_candidates(texts, truncated, keys)]), axis=0)
+
+    # vérification : similarité estimée (part des valeurs de signature égales), même prix, mêmes nombres
+    if len(pairs) > 0:
+        first, second = pairs[:, 0], pairs[:, 1]
+        similarity = (signatures[first] == signatures[second]).mean(axis=1)
+
+        # titre tronqué : part de ses trigrammes présents dans l'autre titre (déduite de la similarité et des tailles)
+        cut = truncated[first] | truncated[second]
+        if cut.any():
+            sizes = np.maximum(np.fromiter(map(len, texts), dtype='float64', count=len(texts)) - 2, 1)
+            small = np.minimum(sizes[first], sizes[second])
+            containment = similarity * (sizes[first] + sizes[second]) / ((1 + similarity) * small)
+            similarity = np.where(cut, np.maximum(similarity, np.minimum(containment, 1.0)), similarity)
+
+        verified = similarity >= threshold
+        if keys is not None:
+            verified &= keys[first] == keys[second]
+
+        # mêmes nombres (un titre tronqué peut avoir perdu les derniers : ses nombres au début de ceux de l'autre)
+        for index in np.flatnonzero(verified).tolist():
+            left, right = int(first[index]), int(second[index])
+            numbers = title_numbers(texts[left]), title_numbers(texts[right])
+            if numbers[0] != numbers[1] and not (truncated[left] and numbers[1].startswith(numbers[0])) and \
+                    not (truncated[right] and numbers[0].startswith(numbers[1])):
+                verified[index] = False
+        pairs = pairs[verified]
+
+    labels[comparable] = comparable[connected_components(len(comparable), pairs)]
+    return labels
+
+
+#fonction qui choisit le livre conservé de chaque groupe : titre le plus long (pas tronqué), sinon le premier
+#renvoie le masque des lignes conservées
+def representatives(labels, titles):
+    lengths = pd.Series(titles, dtype=object).fillna('').astype(str).str.len().to_numpy()
+    order = np.lexsort((np.arange(len(labels)), -lengths, labels))
+    keep = np.zeros(len(labels), dtype=bool)
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = labels[order][1:] != labels[order][:-1]
+    keep[order[first]] = True
+    return keep
+
+
+#fonction qui renvoie le tableau des groupes fusionnés : une ligne par livre d'un groupe de plus d'un livre
+#(numéro du groupe, livre conservé ou non, titre, prix)
+def cluster_table(labels, keep, titles, prices=None):
+    sizes = np.bincount(labels, minlength=len(labels))
+    merged = np.flatnonzero(sizes[labels] > 1)
+    merged = merged[np.lexsort((~keep[merged], labels[merged]))]
+    table = pd.DataFrame({
+        'cluster': labels[merged],
+        'kept': keep[merged],
+        'title': np.asarray(titles, dtype=object)[merged],
+    })
+    if prices is not None:
+        table['price'] = np.asarray(prices)[merged]
+    return table.reset_index(drop=True)
+
+
+#fonction qui résume les groupes fusionnés en une ligne ('12 livres fusionnés dans 5 groupes, ex: ...')
+def format_cluster_summary(table):
+    if table.empty:
+        return "0 livre fusionné"
+    clusters = table['cluster'].nunique()
+    removed = int((~table['kept']).sum())
+    examples = []
+    for _, group in list(table.groupby('cluster', sort=False))[:MAX_CLUSTER_EXAMPLES]:
+        kept = group['title'][group['kept']].iloc[0]
+        others = group['title'][~group['kept']].tolist()
+        examples.append(f"{kept!r} <- {', '.join(repr(title) for title in others)}")
+    return f"{removed} livre(s) fusionné(s) dans {clusters} groupe(s) (ex: {' ; '.join(examples)})"
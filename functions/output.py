@@ -0,0 +1,166 @@
+#importation des bibliothèques nécessaires
+import atexit
+import csv
+import io
+import json
+import os
+import queue
+import tempfile
+import threading
+from pathlib import Path
+
+# écritures sur disque dans un fil dédié (BOOKS_ASYNC_WRITES=0 : écriture immédiate, dans le fil appelant)
+ASYNC_WRITES = os.environ.get('BOOKS_ASYNC_WRITES', '1') != '0'
+
+# nombre maximal de fichiers en attente d'écriture (au-delà, l'appelant attend : mémoire bornée)
+WRITE_QUEUE_SIZE = int(os.environ.get('BOOKS_WRITE_QUEUE_SIZE', 16))
+
+# exports lisibles par machine des statistiques, à côté du rapport texte (ex. BOOKS_EXPORT=json,csv)
+EXPORT_FORMATS = [name for name in os.environ.get('BOOKS_EXPORT', '').split(',') if name]
+
+# fil d'écriture du processus courant (recréé dans un processus fils)
+_writer = {'queue': None, 'thread': None, 'pid': None}
+_writer_lock = threading.Lock()
+
+# droits des fichiers écrits (0o666 moins le umask, comme open()) : mkstemp crée le fichier temporaire en 0o600
+# le umask est lu une fois ici, os.umask n'étant pas sûr depuis le fil d'écriture
+_umask = os.umask(0)
+os.umask(_umask)
+FILE_MODE = 0o666 & ~_umask
+
+
+#fonction d'écriture atomique : fichier temporaire dans le même dossier puis renommage
+#(un lecteur voit l'ancien fichier ou le nouveau complet, jamais un fichier à moitié écrit)
+def write_atomic(path, data):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+
+    descriptor, temporary = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix='.tmp')
+    try:
+        with os.fdopen(descriptor, 'wb') as f:
+            f.write(data)
+        os.chmod(temporary, FILE_MODE)
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+    return path
+
+
+#fonction du fil d'écriture : vide la file dans l'ordre d'arrivée
+def _writer_loop(pending):
+    while True:
+        path, data = pending.get()
+        try:
+            write_atomic(path, data)
+        except Exception as e:
+            print(f"Error during the saving of {path} : {e}")
+        finally:
+            pending.task_done()
+
+
+#fonction qui renvoie la file d'écriture du processus (fil démarré à la première écriture)
+def _writer_queue():
+    with _writer_lock:
+        if _writer['pid'] != os.getpid():
+            _writer['queue'] = queue.Queue(maxsize=WRITE_QUEUE_SIZE)
+            _writer['thread'] = threading.Thread(target=_writer_loop, args=(_writer['queue'],), daemon=True)
+            _writer['thread'].start()
+            _writer['pid'] = os.getpid()
+        return _writer['queue']
+
+
+#fonction qui confie un fichier (texte ou octets) au fil d'écriture et rend la main aussitôt
+def submit_write(path, data):
+    if not ASYNC_WRITES:
+        return write_atomic(path, data)
+    _writer_queue().put((Path(path), data))
+    return Path(path)
+
+
+#fonction qui attend la fin de toutes les écritures en attente
+def flush_writes():
+    if _writer['pid'] == os.getpid():
+        _writer['queue'].join()
+
+
+# les écritures en attente sont terminées avant la sortie du programme
+atexit.register(flush_writes)
+
+
+#fonction qui convertit les nombres NumPy pour json.dumps
+def json_default(value):
+    return value.item() if hasattr(value, 'item') else str(value)
+
+
+#fonction qui renvoie les statistiques au format JSON
+def format_statistics_json(results_by_rating, global_stats, distribution=None, groups=None):
+    content = {
+        'by_rating': {str(rating): data for rating, data in sorted(results_by_rating.items())},
+        'global_stats': global_stats
+    }
+    if distribution:
+        content['distribution'] = distribution
+    if groups:
+        # regroupements : une liste de lignes (les clés à plusieurs dimensions ne sont pas des clés JSON)
+        content['groups'] = {name: list(results.values()) for name, results in groups.items()}
+    return json.dumps(content, default=json_default, ensure_ascii=False, indent=2)
+
+
+#fonction qui renvoie un tableau CSV (en-tête puis une ligne par dictionnaire)
+def format_csv(rows, columns):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction='ignore', lineterminator='\n')
+    writer.writeheader()
+    writer.writerows(rows)
+    return buffer.getvalue()
+
+
+# colonnes du tableau des distributions (une ligne par mesure et par rating)
+DISTRIBUTION_COLUMNS = ['measure', 'rating', 'count', 'mean', 'std', 'min', 'median', 'p90', 'p99', 'max']
+
+
+#fonction qui renvoie une ligne par mesure (prix, stock) et par rating, plus une ligne globale (rating 'overall')
+def distribution_rows(distribution, overall='all'):
+    rows = []
+    for name, entry in distribution.items():
+        rows.append({'measure': name, 'rating': overall, **entry['overall']})
+        rows += [{'measure': name, 'rating': rating, **summary} for rating, summary in sorted(entry['by_rating'].items())]
+    return rows
+
+
+#fonction qui exporte les statistiques par rating, globales, de distribution et les regroupements (JSON et/ou CSV)
+#via le fil d'écriture
+def export_statistics(results_by_rating, global_stats, directory="output", formats=None, distribution=None, groups=None):
+    formats = EXPORT_FORMATS if formats is None else formats
+    directory = Path(directory)
+    written = []
+
+    if 'json' in formats:
+        written.append(submit_write(directory / 'analysis_statistics.json',
+                                    format_statistics_json(results_by_rating, global_stats, distribution, groups)))
+    if 'csv' in formats:
+        rows = [results_by_rating[rating] for rating in sorted(results_by_rating)]
+        written.append(submit_write(directory / 'analysis_by_rating.csv',
+                                    format_csv(rows, ['Rating', 'Average_Price', 'Total_Stock', 'Value', 'Book_Count'])))
+        written.append(submit_write(directory / 'analysis_global.csv',
+                                    format_csv([global_stats], list(global_stats))))
+        if distribution:
+            written.append(submit_write(directory / 'analysis_distribution.csv',
+                                        format_csv(distribution_rows(distribution), DISTRIBUTION_COLUMNS)))
+        # un fichier par regroupement ('+' remplacé dans le nom : analysis_group_rating_price_band.csv)
+        for name, results in (groups or {}).items():
+            rows = list(results.values())
+            if rows:
+                written.append(submit_write(directory / f"analysis_group_{name.replace('+', '_')}.csv",
+                                            format_csv(rows, list(rows[0]))))
+    return written
+
+
+#fonction qui encode une figure matplotlib en PNG en mémoire et confie l'écriture au fil d'écriture
+def save_figure(fig, filepath):
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png')
+    return submit_write(filepath, buffer.getvalue())
@@ -0,0 +1,108 @@
+#importation des bibliothèques nécessaires
+import re
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+
+# Mapping pour les ratings en texte
+RATING_MAP = {
+    'One': 1,
+    'Two': 2,
+    'Three': 3,
+    'Four': 4,
+    'Five': 5
+}
+
+# table de conversion des prix : retrait des £, €, $ et virgule décimale en point (un seul passage sur le texte)
+PRICE_TABLE = str.maketrans({'£': None, '€': None, '$': None, ',': '.'})
+
+# nombre entre parenthèses : 'In stock (19 available)'
+STOCK_PATTERN = re.compile(r'\((\d+)')
+
+# nombre de textes distincts gardés en mémoire par parseur (notes et disponibilités en ont très peu)
+PARSER_CACHE_SIZE = 65536
+
+# nombre d'exemples de valeurs invalides conservés par colonne dans le bilan des erreurs
+MAX_ERROR_EXAMPLES = 5
+
+
+#fonction qui convertit un prix texte en float ; renvoie (valeur, conversion réussie)
+@lru_cache(maxsize=PARSER_CACHE_SIZE)
+def parse_price(text):
+    try:
+        return float(text.translate(PRICE_TABLE).strip()), True
+    except ValueError:
+        return 0.0, False
+
+
+#fonction qui convertit une note texte ('Three', 'four stars', '4') en entier ; renvoie (valeur, conversion réussie)
+@lru_cache(maxsize=PARSER_CACHE_SIZE)
+def parse_rating(text):
+    # retrait de ' stars'
+    cleaned = text.lower().replace(' stars', '').strip()
+    name = cleaned.capitalize()
+    if name in RATING_MAP:
+        return RATING_MAP[name], True
+    try:
+        return int(cleaned), True
+    except ValueError:
+        return 0, False
+
+
+#fonction qui convertit une disponibilité texte en nombre d'exemplaires ; renvoie (valeur, conversion réussie)
+@lru_cache(maxsize=PARSER_CACHE_SIZE)
+def parse_available(text):
+    if 'In stock' in text:
+        # extraction du nombre entre parenthèses ('In stock' seul -> 0)
+        match = STOCK_PATTERN.search(text)
+        return (int(match.group(1)) if match else 0), True
+    if 'Out of stock' in text:
+        return 0, True
+    # essai de conversion directe
+    try:
+        return int(text), True
+    except ValueError:
+        return 0, False
+
+
+#fonction qui crée un bilan des erreurs de conversion (nombre de lignes et exemples par colonne)
+def new_error_tally():
+    return {field: {'count': 0, 'examples': []} for field in ('price', 'rating', 'available')}
+
+
+#fonction qui compte 'count' lignes invalides pour une colonne du bilan
+def record_parse_error(tally, field, value, count=1):
+    if tally is None:
+        return
+    entry = tally[field]
+    entry['count'] += count
+    if len(entry['examples']) < MAX_ERROR_EXAMPLES and value not in entry['examples']:
+        entry['examples'].append(value)
+
+
+#fonction qui renvoie le nombre total de lignes invalides du bilan
+def error_count(tally):
+    return sum(entry['count'] for entry in tally.values())
+
+
+#fonction qui résume le bilan des erreurs en une ligne ('price: 3 (ex: 'abc', 'n/a')')
+def format_error_tally(tally):
+    parts = [f"{field}: {entry['count']} (ex: {', '.join(repr(value) for value in entry['examples'])})"
+             for field, entry in tally.items() if entry['count'] > 0]
+    return ', '.join(parts)
+
+
+#fonction qui convertit une colonne de textes en tableau NumPy : chaque texte distinct n'est converti qu'une fois
+def parse_text_column(texts, parser, dtype, tally=None, field=None):
+    codes, uniques = pd.factorize(texts)
+    parsed = [parser(value) for value in uniques]
+    values = np.array([value for value, _ in parsed], dtype=dtype)
+    valid = np.array([ok for _, ok in parsed], dtype=bool)
+
+    # erreurs comptées par ligne (un texte invalide répété compte autant de fois qu'il apparaît)
+    if tally is not None and not valid.all():
+        counts = np.bincount(codes, minlength=len(uniques))
+        for position in np.flatnonzero(~valid):
+            record_parse_error(tally, field, uniques[position], int(counts[position]))
+
+    return values[codes]
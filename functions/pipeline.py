@@ -0,0 +1,21 @@
+#importation des modules nécessaires (aucun import de matplotlib : utilisable par le rapport seul)
+from .analyzer import analyze_data
+from .cache import load_clean_books
+from .sharding import analyze_data_sharded
+from .manage import list_csv_shards
+
+
+#fonction qui charge le catalogue nettoyé (cache, ou fichiers en parallèle) et calcule les statistiques
+#'report' : affichage et sauvegarde du rapport texte
+def load_analysis_results(refresh_cache=False, report=True):
+    try:
+        # BOOKS_CSV_FILE peut désigner un dossier ou un motif glob : les fichiers sont alors lus en parallèle
+        shards = list_csv_shards()
+        if len(shards) > 1:
+            return analyze_data_sharded(report=report)
+
+        books_cleaned = load_clean_books(shards[0] if shards else None, refresh=refresh_cache)
+        return analyze_data(books_cleaned, report=report)
+    except Exception as e:
+        print(f"Error during the treamtment: {e}")
+        return {}
@@ -0,0 +1,132 @@
+#importation des bibliothèques nécessaires
+import os
+import numpy as np
+
+# nombre de livres de chaque classement (BOOKS_TOP_K ou --top)
+TOP_K = int(os.environ.get('BOOKS_TOP_K', 10))
+
+# classements du rapport : mesure classée, ordre (les plus grands d'abord ou non), un classement par rating ou global
+# seuls les livres en stock et au prix lisible sont classés
+RANKINGS = {
+    'top_value': {'label': "LIVRES DE PLUS GRANDE VALEUR EN STOCK (prix x stock)", 'score': 'value',
+                  'descending': True, 'by_rating': False},
+    'cheapest_in_stock': {'label': "LIVRES EN STOCK LES MOINS CHERS PAR RATING", 'score': 'price',
+                          'descending': False, 'by_rating': True},
+    'overstocked': {'label': "LIVRES LES PLUS STOCKÉS", 'score': 'available',
+                    'descending': True, 'by_rating': False},
+}
+
+# colonnes gardées pour chaque livre classé
+RANKING_COLUMNS = ['title', 'price', 'available', 'rating', 'order']
+
+
+#fonction qui crée un accumulateur de classements vide : au plus k livres par classement et par groupe
+def new_ranking_accumulator(k=None):
+    return {'k': TOP_K if k is None else k, 'rows': 0, 'rankings': {name: {} for name in RANKINGS}}
+
+
+#fonction qui renvoie les positions des k meilleurs scores (le plus petit d'abord), en O(n) : np.partition puis
+#tri des seuls k retenus ; à score égal, la première ligne passe devant (même résultat qu'un tri complet stable)
+def best_positions(scores, k):
+    if len(scores) > k:
+        threshold = np.partition(scores, k - 1)[k - 1]
+        better = np.flatnonzero(scores < threshold)
+        ties = np.flatnonzero(scores == threshold)[:k - len(better)]
+        chosen = np.concatenate([better, ties])
+    else:
+        chosen = np.arange(len(scores))
+    return chosen[np.lexsort((chosen, scores[chosen]))]
+
+
+#fonction qui calcule les classements d'un paquet de livres nettoyés (prix, stocks et catégories de rating déjà calculés)
+def compute_rankings(books, prices, stocks, codes, k=None):
+    accumulator = new_ranking_accumulator(k)
+    accumulator['rows'] = len(books)
+    k = accumulator['k']
+    if len(books) == 0 or k <= 0:
+        return accumulator
+
+    candidates = np.flatnonzero((stocks > 0) & (prices > 0))
+    measures = {'price': prices, 'available': stocks, 'value': prices * stocks}
+    titles = books['title'] if 'title' in books.columns else None
+
+    for name, ranking in RANKINGS.items():
+        scores = measures[ranking['score']][candidates]
+        # scores rangés du meilleur au moins bon : le plus petit d'abord
+        scores = -scores if ranking['descending'] else scores
+        groups = {rating: codes[candidates] == rating for rating in range(0, 6)} if ranking['by_rating'] else {'all': None}
+
+        for group, mask in groups.items():
+            positions = np.flatnonzero(mask) if mask is not None else np.arange(len(candidates))
+            rows = candidates[positions[best_positions(scores[positions], k)]]
+            if len(rows) == 0:
+                continue
+            accumulator['rankings'][name][group] = {
+                'title': np.asarray(titles.iloc[rows], dtype=object) if titles is not None else np.full(len(rows), ''),
+                'price': prices[rows],
+                'available': stocks[rows],
+                'rating': codes[rows],
+                'order': rows.astype('int64')
+            }
+    return accumulator
+
+
+#fonction qui fusionne deux accumulateurs de classements ('other' : lignes venant après celles de 'accumulator')
+def merge_ranking_accumulators(accumulator, other):
+    k = accumulator['k']
+    for name, ranking in RANKINGS.items():
+        for group, entries in other['rankings'][name].items():
+            entries = {**entries, 'order': entries['order'] + accumulator['rows']}
+            current = accumulator['rankings'][name].get(group)
+            if current is not None:
+                entries = {column: np.concatenate([current[column], entries[column]]) for column in RANKING_COLUMNS}
+            measure = entries['price'] * entries['available'] if ranking['score'] == 'value' else entries[ranking['score']]
+            scores = -measure if ranking['descending'] else measure
+            # au plus 2k livres : tri complet par score puis par ordre d'arrivée
+            kept = np.lexsort((entries['order'], scores))[:k]
+            accumulator['rankings'][name][group] = {column: values[kept] for column, values in entries.items()}
+    accumulator['rows'] += other['rows']
+    return accumulator
+
+
+#fonction qui transforme l'accumulateur en classements : {nom: {groupe: [lignes]}} ('all' ou rating)
+def finalize_rankings(accumulator):
+    rankings = {}
+    for name in RANKINGS:
+        groups = accumulator['rankings'][name]
+        rankings[name] = {}
+        for group in sorted(groups, key=str):
+            entries = groups[group]
+            rankings[name][group] = [{
+                'Rank': position + 1,
+                'Title': title,
+                'Price': round(price, 2),
+                'Available': int(available),
+                'Rating': int(rating),
+                'Value': round(price * available, 2)
+            } for position, (title, price, available, rating) in enumerate(zip(
+                entries['title'].tolist(), entries['price'].tolist(), entries['available'].tolist(),
+                entries['rating'].tolist()))]
+    return rankings
+
+
+#fonction qui renvoie les classements (texte), dans le style des autres tableaux du rapport
+def format_rankings_report(rankings):
+    lines = []
+    for name, ranking in RANKINGS.items():
+        groups = rankings.get(name) or {}
+        if not groups:
+            continue
+        lines += ["", "=" * 80, ranking['label'], "=" * 80]
+        lines.append(f"{'Rang':<6} {'Titre':<44} {'Prix':<9} {'Stock':<7} {'Rating':<7} {'Valeur':<10}")
+        lines.append("-" * 80)
+        for group, rows in groups.items():
+            if ranking['by_rating']:
+                lines.append(f"Rating {'0 (Erreur)' if group == 0 else group}")
+            for row in rows:
+                title = str(row['Title'])
+                title = title if len(title) <= 43 else title[:40] + "..."
+                lines.append(f"{row['Rank']:<6} {title:<44} {row['Price']:<9.2f} {row['Available']:<7} "
+                             f"{row['Rating']:<7} {row['Value']:<10.2f}")
+        lines.append("=" * 80 + "\n")
+    return "\n".join(lines) + "\n" if lines else ""
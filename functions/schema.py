@@ -0,0 +1,63 @@
+#importation des bibliothèques nécessaires
+import numpy as np
+
+# textes stockés en chaînes Arrow (un seul buffer contigu) si pyarrow est installé, sinon objets Python
+try:
+    import pyarrow  # noqa: F401
+    TEXT_DTYPE = 'string[pyarrow]'
+except ImportError:
+    TEXT_DTYPE = object
+
+# schéma du catalogue nettoyé : prix en float32 (centimes exacts une fois arrondis), note sur 1 octet,
+# stock en entier non signé sur 2 octets (4 si une valeur dépasse 65535)
+CATALOG_SCHEMA = {
+    'image': TEXT_DTYPE,
+    'title': TEXT_DTYPE,
+    'price': 'float32',
+    'rating': 'int8',
+    'available': 'uint16'
+}
+
+# colonnes texte lues directement dans le bon type par load_books
+TEXT_COLUMNS = [name for name, dtype in CATALOG_SCHEMA.items() if dtype is TEXT_DTYPE]
+
+
+#fonction qui convertit une DataFrame nettoyée vers le schéma compact du catalogue
+def apply_catalog_schema(df):
+    df = df.copy(deep=False)
+
+    for column_name in TEXT_COLUMNS:
+        if column_name in df.columns and df[column_name].dtype != TEXT_DTYPE:
+            df[column_name] = df[column_name].astype(TEXT_DTYPE)
+
+    if 'price' in df.columns:
+        df['price'] = df['price'].astype('float32')
+
+    # une note hors de l'intervalle int8 est de toute façon classée en catégorie 0 par l'analyse
+    if 'rating' in df.columns:
+        ratings = df['rating']
+        df['rating'] = ratings.where((ratings >= -128) & (ratings <= 127), 0).astype('int8')
+
+    # un stock négatif n'a pas de sens : ramené à 0
+    if 'available' in df.columns:
+        available = df['available'].clip(lower=0)
+        dtype = 'uint16' if len(available) == 0 or available.max() <= np.iinfo('uint16').max else 'uint32'
+        df['available'] = available.astype(dtype)
+
+    return df
+
+
+#fonction qui renvoie une colonne sous forme de tableau NumPy pour les calculs ; les prix float32 sont
+#remis en float64 arrondis au centime pour que sommes et moyennes soient celles des prix d'origine
+def column_values(books, name):
+    values = np.asarray(books[name])
+    if name == 'price' and values.dtype == np.float32:
+        return np.round(values.astype('float64'), 2)
+    return values
+
+
+#fonction qui renvoie l'occupation mémoire moyenne d'une ligne (chaînes comprises)
+def bytes_per_row(df):
+    if len(df) == 0:
+        return 0.0
+    return float(df.memory_usage(deep=True, index=False).sum() / len(df))
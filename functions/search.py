@@ -0,0 +1,259 @@
+#importation des bibliothèques nécessaires
+import json
+import os
+import shutil
+from datetime import datetime, timezone
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from .columnar import write_text_column
+from .data_cleaner import CLEANER_VERSION
+from . import near_duplicates
+from .near_duplicates import PUNCTUATION_TABLE, strip_accents
+from .schema import column_values
+
+# dossier de l'index de recherche des titres
+SEARCH_DIR = Path(os.environ.get('BOOKS_SEARCH_DIR', 'output/search'))
+
+# version du format du dossier (manifest.json)
+SEARCH_VERSION = 1
+
+# nombre de livres renvoyés par défaut
+SEARCH_LIMIT = 20
+
+
+#fonction qui découpe un texte en mots de recherche : minuscules, sans accents ni ponctuation
+def tokenize(text):
+    if not isinstance(text, str):
+        return []
+    return strip_accents(text).lower().translate(PUNCTUATION_TABLE).split()
+
+
+#fonction qui construit l'index inversé des titres d'un catalogue nettoyé
+#renvoie {vocabulaire trié (octets UTF-8, largeur fixe), début des listes de chaque mot, listes de livres (int32)}
+#la liste du mot i est postings[offsets[i]:offsets[i + 1]] : numéros de livres croissants, sans répétition
+def build_inverted_index(titles):
+    tokens, documents = [], []
+    for position, title in enumerate(titles):
+        words = set(tokenize(title))
+        tokens.extend(words)
+        documents.extend([position] * len(words))
+
+    if not tokens:
+        return {'vocabulary': np.zeros(0, dtype='S1'), 'offsets': np.zeros(1, dtype='int64'),
+                'postings': np.zeros(0, dtype='int32')}
+
+    # numéro de chaque mot dans le vocabulaire trié (ordre des octets UTF-8 = ordre des caractères)
+    codes, vocabulary = pd.factorize(pd.Series(tokens, dtype=object), sort=True)
+    documents = np.asarray(documents, dtype='int32')
+    order = np.lexsort((documents, codes))
+    counts = np.bincount(codes, minlength=len(vocabulary))
+    offsets = np.zeros(len(vocabulary) + 1, dtype='int64')
+    np.cumsum(counts, out=offsets[1:])
+    return {
+        'vocabulary': np.array([word.encode('utf-8') for word in vocabulary], dtype='S'),
+        'offsets': offsets,
+        'postings': documents[order]
+    }
+
+
+#fonction qui écrit l'index de recherche d'un catalogue nettoyé : index inversé, colonnes des filtres et titres
+#(dossier préparé à côté puis mis en place d'un bloc) ; 'source' : description du catalogue indexé (_index_source)
+def build_search_index(books, directory=None, source=None):
+    directory = Path(directory or SEARCH_DIR)
+    titles = np.asarray(books['title'], dtype=object)
+    index = build_inverted_index(titles)
+
+    staging = directory.with_name(f".{directory.name}.{os.getpid()}.tmp")
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir(parents=True)
+    for name, values in index.items():
+        np.save(staging / f"{name}.npy", values)
+
+    # colonnes des filtres, typées comme le catalogue nettoyé (prix en centimes)
+    np.save(staging / 'price_cents.npy', np.round(column_values(books, 'price').astype('float64') * 100).astype('int32'))
+    np.save(staging / 'rating.npy', np.asarray(books['rating']).astype('int8'))
+    np.save(staging / 'available.npy', np.asarray(books['available']))
+    write_text_column(staging, 'title', titles)
+
+    manifest = {
+        'version': SEARCH_VERSION,
+        'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'documents': len(titles),
+        'terms': len(index['vocabulary']),
+        'postings': len(index['postings']),
+        'source': source
+    }
+    (staging / 'manifest.json').write_text(json.dumps(manifest, indent=2), encoding='utf-8')
+
+    previous = directory.with_name(f".{directory.name}.old")
+    shutil.rmtree(previous, ignore_errors=True)
+    if directory.exists():
+        os.replace(directory, previous)
+    os.replace(staging, directory)
+    shutil.rmtree(previous, ignore_errors=True)
+    return directory
+
+
+#fonction qui ouvre l'index de recherche : tous les tableaux projetés en mémoire (mmap), rien n'est décodé
+#renvoie None si l'index est absent ou d'une autre version
+def open_search_index(directory=None):
+    directory = Path(directory or SEARCH_DIR)
+    if not (directory / 'manifest.json').exists():
+        return None
+    manifest = json.loads((directory / 'manifest.json').read_text(encoding='utf-8'))
+    if manifest.get('version') != SEARCH_VERSION:
+        return None
+
+    index = {'manifest': manifest}
+    for name in ('vocabulary', 'offsets', 'postings', 'price_cents', 'rating', 'available'):
+        index[name] = np.load(directory / f"{name}.npy", mmap_mode='r')
+    index['title_offsets'] = np.load(directory / 'title.offsets.npy', mmap_mode='r')
+    title_bytes = directory / 'title.utf8'
+    index['title_bytes'] = np.memmap(title_bytes, dtype='uint8', mode='r') if title_bytes.stat().st_size > 0 \
+        else np.zeros(0, dtype='uint8')
+    return index
+
+
+#fonction qui renvoie la liste des livres d'un mot ('mot*' : tous les mots qui commencent ainsi, listes réunies)
+def term_postings(index, term):
+    vocabulary = index['vocabulary']
+    prefix = term.endswith('*')
+    word = term.rstrip('*').encode('utf-8')
+    if len(vocabulary) == 0 or not word or len(word) > vocabulary.dtype.itemsize:
+        return np.zeros(0, dtype='int32')
+
+    start = np.searchsorted(vocabulary, word, side='left')
+    if not prefix:
+        if start == len(vocabulary) or vocabulary[start] != word:
+            return np.zeros(0, dtype='int32')
+        return np.asarray(index['postings'][index['offsets'][start]:index['offsets'][start + 1]])
+
+    # mots du préfixe : de 'mot' (inclus) à 'mot' suivi du plus grand octet (exclu) ; un préfixe aussi long
+    # que le plus long mot ne peut être suivi de rien
+    if len(word) == vocabulary.dtype.itemsize:
+        stop = np.searchsorted(vocabulary, word, side='right')
+    else:
+        stop = np.searchsorted(vocabulary, word + b'\xff', side='left')
+    if stop - start == 1:
+        return np.asarray(index['postings'][index['offsets'][start]:index['offsets'][stop]])
+    return np.unique(index['postings'][index['offsets'][start]:index['offsets'][stop]])
+
+
+#fonction qui renvoie les numéros présents dans deux listes triées : recherche de la plus courte dans la plus longue,
+#ou, pour deux listes de tailles proches, marquage de la plus courte dans un tableau de booléens
+def intersect_postings(left, right):
+    if len(left) > len(right):
+        left, right = right, left
+    if len(left) == 0:
+        return left
+    if len(left) * 8 >= len(right):
+        marked = np.zeros(int(right[-1]) + 1, dtype=bool)
+        marked[left[left <= right[-1]]] = True
+        return right[marked[right]]
+    positions = np.minimum(np.searchsorted(right, left), len(right) - 1)
+    return left[right[positions] == left]
+
+
+#fonction qui découpe une requête en mots de recherche ; 'mot*' : préfixe (porte sur le dernier mot de 'l'attic*')
+def query_terms(query):
+    terms = []
+    for word in query.split():
+        tokens = tokenize(word)
+        if tokens and word.endswith('*'):
+            tokens[-1] += '*'
+        terms.extend(tokens)
+    return terms
+
+
+#fonction de recherche : tous les mots de la requête (ET ; 'mot*' pour un préfixe), puis filtres sur le rating,
+#le prix (bornes incluses) et la disponibilité ; renvoie (nombre de livres trouvés, 'limit' premiers livres)
+def search_books(index, query, rating=None, min_price=None, max_price=None, in_stock=False, limit=None):
+    limit = SEARCH_LIMIT if limit is None else limit
+    terms = query_terms(query)
+    # requête sans aucun mot (ponctuation seule, ex. '!!') : rien ne correspond ; seule une requête vide renvoie tout
+    if query.strip() and not terms:
+        return 0, []
+
+    if terms:
+        # listes les plus courtes d'abord : les intersections suivantes portent sur peu de numéros
+        lists = sorted((term_postings(index, term) for term in terms), key=len)
+        documents = lists[0]
+        for postings in lists[1:]:
+            documents = intersect_postings(documents, postings)
+    else:
+        documents = np.arange(index['manifest']['documents'], dtype='int32')
+
+    # filtres appliqués aux seuls livres trouvés
+    keep = np.ones(len(documents), dtype=bool)
+    if rating is not None:
+        keep &= index['rating'][documents] == rating
+    if min_price is not None:
+        keep &= index['price_cents'][documents] >= round(min_price * 100)
+    if max_price is not None:
+        keep &= index['price_cents'][documents] <= round(max_price * 100)
+    if in_stock:
+        keep &= index['available'][documents] > 0
+    documents = documents[keep]
+
+    return len(documents), [search_result(index, document) for document in documents[:limit].tolist()]
+
+
+#fonction qui renvoie un livre de l'index (seul son titre est décodé)
+def search_result(index, document):
+    start, stop = int(index['title_offsets'][document]), int(index['title_offsets'][document + 1]) - 1
+    return {
+        'Title': bytes(index['title_bytes'][start:stop]).decode('utf-8'),
+        'Price': int(index['price_cents'][document]) / 100,
+        'Available': int(index['available'][document]),
+        'Rating': int(index['rating'][document])
+    }
+
+
+#fonction qui décrit le catalogue indexé : CSV (chemin, taille, date de modification) et réglages du nettoyage,
+#comme l'empreinte du cache (sans le contenu, relu sinon à chaque recherche) ; un index construit autrement est reconstruit
+def _index_source(path):
+    path = Path(path).resolve()
+    stat = path.stat()
+    return {
+        'path': str(path),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'cleaner_version': CLEANER_VERSION,
+        # le seuil des quasi-doublons change les livres du catalogue nettoyé
+        'near_duplicates': near_duplicates.NEAR_DUPLICATE_THRESHOLD
+    }
+
+
+#fonction qui ouvre l'index du CSV, construit (depuis le catalogue nettoyé, via le cache) s'il manque,
+#s'il a été construit sur une autre version du fichier ou si 'rebuild' est demandé
+def load_search_index(path=None, directory=None, rebuild=False):
+    from .cache import load_clean_books
+    from .manage import csv_file
+
+    path = Path(path) if path else csv_file
+    index = open_search_index(directory)
+    source = _index_source(path) if path.exists() else None
+    if index is not None and not rebuild and (source is None or index['manifest']['source'] == source):
+        return index
+
+    books = load_clean_books(path)
+    if not isinstance(books, pd.DataFrame) or books.empty:
+        print("Rien à indexer : le catalogue est vide.")
+        return index
+    build_search_index(books, directory, source)
+    print(f"Index de recherche construit : {len(books)} livres.")
+    return open_search_index(directory)
+
+
+#fonction principale de la commande 'search' : affiche les livres trouvés
+def run_search(query, rating=None, min_price=None, max_price=None, in_stock=False, limit=None, rebuild=False):
+    index = load_search_index(rebuild=rebuild)
+    if index is None:
+        return 0, []
+
+    total, results = search_books(index, query, rating, min_price, max_price, in_stock, limit)
+    print(f"{total} livre(s) trouvé(s)" + (f", {len(results)} affiché(s)" if total > len(results) else ""))
+    for row in results:
+        print(f"  {row['Title'][:60]:<62} {row['Price']:>7.2f} £  stock {row['Available']:<5} rating {row['Rating']}")
+    return total, results
@@ -0,0 +1,246 @@
+#importation des bibliothèques nécessaires
+import json
+import os
+import threading
+import time
+import traceback
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+import pandas as pd
+from .manage import csv_file
+from .analyzer import finalize_statistics_accumulator, finalize_distribution, finalize_ranking, format_analysis_report, \
+    save_analysis_to_file
+from .incremental import new_incremental_state, state_matches_file, consume_new_rows
+from .metrics import METRICS_ENABLED, save_metrics, reset_metrics
+from .output import json_default, export_statistics
+
+# adresse d'écoute du service (locale uniquement par défaut)
+SERVICE_HOST = os.environ.get('BOOKS_SERVICE_HOST', '127.0.0.1')
+SERVICE_PORT = int(os.environ.get('BOOKS_SERVICE_PORT', 8765))
+
+# intervalle (secondes) entre deux vérifications du fichier CSV
+WATCH_INTERVAL = float(os.environ.get('BOOKS_WATCH_INTERVAL', 2.0))
+
+# au-delà de ce nombre de paquets ajoutés, le catalogue en mémoire est regroupé en une seule DataFrame
+MAX_FRAMES = 32
+
+
+#fonction qui crée le service : état du fichier suivi et dernier instantané publié
+#(le fil de surveillance est le seul à modifier 'state' et 'frames' ; les requêtes ne lisent que 'snapshot')
+def new_service(path=None, charts=True, directory="output"):
+    path = Path(path) if path else csv_file
+    return {
+        'path': path,
+        'directory': Path(directory),
+        'charts': charts,
+        'state': new_incremental_state(path),
+        'frames': [],
+        'file_stat': None,
+        'snapshot': None,
+        'version': 0,
+        'charts_version': 0,
+        'charts_wanted': threading.Event(),
+        'stop': threading.Event(),
+        'threads': [],
+        'server': None
+    }
+
+
+#fonction qui renvoie (date de modification, taille) du fichier suivi
+def _file_stat(path):
+    stat = Path(path).stat()
+    return stat.st_mtime_ns, stat.st_size
+
+
+#fonction qui prépare l'instantané publié : réponses calculées une fois, servies telles quelles
+def _build_snapshot(service, new_rows):
+    results_by_rating, global_stats = finalize_statistics_accumulator(service['state']['accumulator'])
+    distribution = finalize_distribution(service['state']['accumulator'])
+    report = format_analysis_report(results_by_rating, global_stats, distribution,
+                                    rankings=finalize_ranking(service['state']['accumulator']))
+    loaded_at = datetime.now(timezone.utc).isoformat(timespec='seconds')
+
+    stats = {
+        'version': service['version'],
+        'loaded_at': loaded_at,
+        'new_rows': new_rows,
+        'by_rating': {str(rating): data for rating, data in results_by_rating.items()},
+        'global_stats': global_stats,
+        'distribution': distribution
+    }
+    return {
+        'version': service['version'],
+        'loaded_at': loaded_at,
+        'by_rating': results_by_rating,
+        'global_stats': global_stats,
+        'distribution': distribution,
+        'frames': tuple(service['frames']),
+        'report': report.encode('utf-8'),
+        'stats': json.dumps(stats, default=json_default, ensure_ascii=False).encode('utf-8')
+    }
+
+
+#fonction qui relit le fichier s'il a changé : seules les lignes ajoutées sont nettoyées,
+#analyse complète si le fichier a été réécrit ; renvoie True si un nouvel instantané a été publié
+def refresh_service(service):
+    path = service['path']
+    if not path.exists():
+        return False
+
+    file_stat = _file_stat(path)
+    if file_stat == service['file_stat']:
+        return False
+
+    state = service['state']
+    if state['offset'] > 0 and not state_matches_file(state, path):
+        print("Le fichier CSV a été réécrit : analyse complète depuis le début.")
+        state = service['state'] = new_incremental_state(path)
+        service['frames'] = []
+
+    new_rows, frames = consume_new_rows(path, state, keep=True)
+    service['file_stat'] = file_stat
+    if new_rows == 0 and service['snapshot'] is not None:
+        return False
+
+    service['frames'].extend(frames)
+    if len(service['frames']) > MAX_FRAMES:
+        service['frames'] = [pd.concat(service['frames'], ignore_index=True)]
+
+    service['version'] += 1
+    service['snapshot'] = _build_snapshot(service, new_rows)
+    snapshot = service['snapshot']
+    save_analysis_to_file(snapshot['report'].decode('utf-8'), directory=service['directory'])
+    export_statistics(snapshot['by_rating'], snapshot['global_stats'], directory=service['directory'],
+                      distribution=snapshot['distribution'])
+
+    # un seul fichier de mesures (celui du dernier rechargement), sans accumulation en mémoire
+    if METRICS_ENABLED:
+        save_metrics(directory=service['directory'])
+        reset_metrics()
+
+    if service['charts']:
+        service['charts_wanted'].set()
+    return True
+
+
+#fonction du fil de surveillance : vérifie le fichier à intervalle régulier
+def _watch_loop(service, interval):
+    while not service['stop'].wait(interval):
+        try:
+            refresh_service(service)
+        except Exception as e:
+            print(f"Error during the reload : {e}")
+            traceback.print_exc()
+
+
+#fonction du fil des graphiques : redessine les graphiques quand les données ont changé
+#(plusieurs rechargements rapprochés ne donnent qu'un rendu, sur le dernier instantané)
+def _charts_loop(service):
+    from .visualizer import catalog_charts, render_charts
+
+    while not service['stop'].is_set():
+        if not service['charts_wanted'].wait(0.5):
+            continue
+        service['charts_wanted'].clear()
+
+        snapshot = service['snapshot']
+        if snapshot is None or snapshot['version'] == service['charts_version'] or not snapshot['frames']:
+            continue
+        try:
+            books = pd.concat(snapshot['frames'], ignore_index=True)
+            directory = service['directory'] / 'visuals'
+            directory.mkdir(parents=True, exist_ok=True)
+            # rendu dans ce fil (pas de processus créés depuis un programme multi-fils)
+            render_charts(catalog_charts(books, snapshot['by_rating'], snapshot['distribution']),
+                          workers=1, directory=directory)
+            service['charts_version'] = snapshot['version']
+        except Exception as e:
+            print(f"Error during the charts : {e}")
+            traceback.print_exc()
+
+
+#fonction qui crée le gestionnaire des requêtes HTTP du service
+def make_handler(service):
+
+    class ServiceHandler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            snapshot = service['snapshot']
+            route = self.path.split('?', 1)[0].rstrip('/')
+
+            if route == '/health':
+                body = json.dumps({
+                    'status': 'ok' if snapshot is not None else 'loading',
+                    'version': service['version'],
+                    'charts_version': service['charts_version'],
+                    'path': str(service['path'])
+                }).encode('utf-8')
+                self._send(200, body, 'application/json')
+            elif snapshot is None:
+                self._send(503, b'{"error": "catalog not loaded"}', 'application/json')
+            elif route == '/report':
+                self._send(200, snapshot['report'], 'text/plain; charset=utf-8')
+            elif route == '/stats':
+                self._send(200, snapshot['stats'], 'application/json')
+            else:
+                self._send(404, b'{"error": "unknown endpoint"}', 'application/json')
+
+        def _send(self, status, body, content_type):
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        # pas une ligne de journal par requête
+        def log_message(self, format, *args):
+            pass
+
+    return ServiceHandler
+
+
+#fonction qui démarre le service : premier chargement, fils de surveillance et des graphiques, serveur HTTP
+def start_service(path=None, host=None, port=None, interval=None, charts=True, directory="output"):
+    service = new_service(path, charts=charts, directory=directory)
+    refresh_service(service)
+
+    server = ThreadingHTTPServer((host or SERVICE_HOST, SERVICE_PORT if port is None else port),
+                                 make_handler(service))
+    server.daemon_threads = True
+    service['server'] = server
+
+    workers = [
+        threading.Thread(target=_watch_loop, args=(service, interval or WATCH_INTERVAL), daemon=True),
+        threading.Thread(target=server.serve_forever, daemon=True)
+    ]
+    if charts:
+        workers.append(threading.Thread(target=_charts_loop, args=(service,), daemon=True))
+    for worker in workers:
+        worker.start()
+    service['threads'] = workers
+    return service
+
+
+#fonction qui arrête le service
+def stop_service(service):
+    service['stop'].set()
+    if service['server'] is not None:
+        service['server'].shutdown()
+        service['server'].server_close()
+    for worker in service['threads']:
+        worker.join(timeout=5)
+
+
+#fonction principale du mode service : tourne jusqu'à Ctrl+C
+def run_service(path=None, host=None, port=None, interval=None, charts=True):
+    service = start_service(path, host, port, interval, charts)
+    host, port = service['server'].server_address[:2]
+    print(f"\nService démarré : http://{host}:{port}/report , /stats , /health (Ctrl+C pour arrêter)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("\nArrêt du service")
+    finally:
+        stop_service(service)
@@ -0,0 +1,119 @@
+#importation des bibliothèques nécessaires
+import os
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from .manage import list_csv_shards, load_books
+from .data_cleaner import clean_data, remove_duplicates_df
+from .analyzer import (new_statistics_accumulator, compute_statistics, merge_statistics_accumulators,
+                       finalize_statistics_accumulator, finalize_distribution, finalize_ranking,
+                       write_analysis_report)
+from .columnar import columnar_export_enabled, export_columnar
+from .history import record_history
+from .groupby import compute_groups
+from .metrics import stage, get_records, reset_metrics, add_record
+from pathlib import Path
+from .dedup_index import new_dedup_index, load_dedup_index, save_dedup_index
+
+# nombre de processus pour lire et nettoyer les fichiers (un fichier par processus à la fois)
+INGEST_WORKERS = int(os.environ.get('BOOKS_INGEST_WORKERS', os.cpu_count() or 1))
+
+
+#fonction exécutée dans un processus : lecture + nettoyage d'un fichier et statistiques partielles
+def _clean_shard(path):
+    reset_metrics()
+    books_cleaned = clean_data(load_books(path))
+    if not isinstance(books_cleaned, pd.DataFrame) or books_cleaned.empty:
+        return None, None, get_records()
+    return books_cleaned, compute_statistics(books_cleaned), get_records()
+
+
+#fonction qui lit et nettoie tous les fichiers en parallèle puis fusionne les résultats dans l'ordre des fichiers
+#'dedup_index_path' : index de dédoublonnage sauvegardé, partagé entre exécutions
+def load_clean_shards(source=None, workers=None, dedup_index_path=None):
+    shards = list_csv_shards(source)
+    if not shards:
+        print(f"No CSV file found for : {source}")
+        return pd.DataFrame(), new_statistics_accumulator()
+
+    workers = INGEST_WORKERS if workers is None else workers
+    workers = max(1, min(workers, len(shards)))
+    print(f"\nLecture de {len(shards)} fichier(s) avec {workers} processus")
+
+    if dedup_index_path and Path(dedup_index_path).exists():
+        seen = load_dedup_index(dedup_index_path)
+    else:
+        seen = new_dedup_index()
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            merged = _merge_shards(pool.map(_clean_shard, shards), seen)
+    else:
+        merged = _merge_shards((_clean_shard(shard) for shard in shards), seen)
+
+    if dedup_index_path:
+        save_dedup_index(seen, dedup_index_path)
+    return merged
+
+
+#fonction qui fusionne les fichiers nettoyés : dédoublonnage entre fichiers et fusion des statistiques partielles
+def _merge_shards(results, seen):
+    accumulator = new_statistics_accumulator()
+    frames = []
+
+    for books_cleaned, partial, records in results:
+        for record in records:
+            add_record(record)
+        if books_cleaned is None:
+            continue
+
+        # un livre déjà vu dans un fichier précédent est retiré ; les statistiques du fichier sont alors recalculées
+        with stage('merge_shard', rows_in=len(books_cleaned)) as record:
+            unique_books = remove_duplicates_df(books_cleaned, seen=seen)
+            if len(unique_books) != len(books_cleaned):
+                partial = compute_statistics(unique_books)
+            merge_statistics_accumulators(accumulator, partial)
+            frames.append(unique_books)
+            record['rows_out'] = len(unique_books)
+
+    books = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    return books, accumulator
+
+
+#fonction principale d'analyse d'un ensemble de fichiers CSV (dossier ou motif glob)
+def analyze_data_sharded(source=None, workers=None, dedup_index_path=None, report=True):
+
+    try:
+        books, accumulator = load_clean_shards(source, workers, dedup_index_path)
+        if accumulator['total_books'] == 0:
+            print("data not found (no shard to analyze)")
+            return {}
+
+        print(f"\nDÉBUT DE L'ANALYSE - {accumulator['total_books']} livres")
+
+        results_by_rating, global_stats = finalize_statistics_accumulator(accumulator)
+        distribution = finalize_distribution(accumulator)
+        rankings = finalize_ranking(accumulator)
+        with stage('group_by', rows_in=len(books)):
+            groups = compute_groups(books)
+        if report:
+            with stage('write_report'):
+                write_analysis_report(results_by_rating, global_stats, distribution=distribution, groups=groups,
+                                      rankings=rankings)
+            if columnar_export_enabled():
+                export_columnar(books, results_by_rating, global_stats, distribution)
+            record_history(books)
+
+        return {
+            'by_rating': results_by_rating,
+            'global_stats': global_stats,
+            'distribution': distribution,
+            'groups': groups,
+            'rankings': rankings,
+            'books': books
+        }
+
+    except Exception as e:
+        print(f"Error : {e}")
+        traceback.print_exc()
+        return {}
@@ -0,0 +1,250 @@
+#importation des bibliothèques nécessaires
+import os
+import numpy as np
+
+# précision des résumés de quantiles (KLL) : erreur de rang d'environ 1.7 / k, mémoire d'environ 3 * k valeurs
+SKETCH_K = int(os.environ.get('BOOKS_SKETCH_K', 200))
+
+# histogrammes à cases fixes (mêmes cases pour tous les paquets : fusion par simple addition)
+# prix : cases de 0.50 £ de 0 à 200 £ ; stock : cases d'un exemplaire de 0 à 100 ; une case de dépassement en plus
+HISTOGRAM_BINS = {
+    'price': (0.5, 400),
+    'stock': (1.0, 100)
+}
+
+# catégories de rating suivies (0 = erreur, 1 à 5 étoiles)
+RATINGS = range(0, 6)
+
+# quantiles publiés
+QUANTILES = {'median': 0.5, 'p90': 0.9, 'p99': 0.99}
+
+# tirage à pile ou face des compactages (graine fixe : résultats reproductibles d'une exécution à l'autre)
+_coins = np.random.default_rng(0)
+
+
+# --- Résumé de quantiles de type KLL (fusionnable, mémoire bornée) ---
+
+#fonction qui crée un résumé de quantiles vide
+#niveau h : valeurs de poids 2**h ; un niveau plein est trié et une valeur sur deux monte au niveau suivant
+def new_quantile_sketch(k=None):
+    return {'k': k or SKETCH_K, 'levels': [np.empty(0)], 'count': 0, 'min': None, 'max': None}
+
+
+#fonction qui renvoie la capacité d'un niveau (les niveaux bas, de poids faible, sont plus petits)
+def _level_capacity(k, height, level):
+    return max(2, int(np.ceil(k * (2 / 3) ** (height - level - 1))))
+
+
+#fonction qui compacte les niveaux pleins jusqu'à revenir sous les capacités
+def _compress(sketch):
+    levels = sketch['levels']
+    level = 0
+    while level < len(levels):
+        if len(levels[level]) > _level_capacity(sketch['k'], len(levels), level):
+            if level + 1 == len(levels):
+                levels.append(np.empty(0))
+            items = np.sort(levels[level])
+            # nombre impair : la plus petite valeur reste à ce niveau
+            kept, items = items[:len(items) % 2], items[len(items) % 2:]
+            # une valeur sur deux, départ tiré au hasard (sans biais vers les petites ou les grandes valeurs)
+            promoted = items[_coins.integers(2)::2]
+            levels[level] = kept
+            levels[level + 1] = np.concatenate([levels[level + 1], promoted])
+        level += 1
+
+
+#fonction qui ajoute un tableau de valeurs au résumé (les valeurs non finies sont ignorées)
+def update_quantile_sketch(sketch, values):
+    values = np.asarray(values, dtype='float64')
+    values = values[np.isfinite(values)]
+    if len(values) == 0:
+        return sketch
+
+    sketch['count'] += len(values)
+    low, high = float(values.min()), float(values.max())
+    sketch['min'] = low if sketch['min'] is None else min(sketch['min'], low)
+    sketch['max'] = high if sketch['max'] is None else max(sketch['max'], high)
+
+    sketch['levels'][0] = np.concatenate([sketch['levels'][0], values])
+    _compress(sketch)
+    return sketch
+
+
+#fonction qui fusionne le résumé 'other' dans 'sketch' (paquets, fichiers, exécutions successives)
+def merge_quantile_sketches(sketch, other):
+    if other['count'] == 0:
+        return sketch
+
+    for level, items in enumerate(other['levels']):
+        if level == len(sketch['levels']):
+            sketch['levels'].append(np.empty(0))
+        sketch['levels'][level] = np.concatenate([sketch['levels'][level], items])
+
+    sketch['count'] += other['count']
+    sketch['min'] = other['min'] if sketch['min'] is None else min(sketch['min'], other['min'])
+    sketch['max'] = other['max'] if sketch['max'] is None else max(sketch['max'], other['max'])
+    _compress(sketch)
+    return sketch
+
+
+#fonction qui renvoie les quantiles demandés (première valeur dont le rang cumulé atteint q ; exact sous k valeurs)
+def sketch_quantiles(sketch, quantiles):
+    if sketch['count'] == 0:
+        return [0.0 for _ in quantiles]
+
+    items = np.concatenate(sketch['levels'])
+    weights = np.concatenate([np.full(len(level_items), 2.0 ** level)
+                              for level, level_items in enumerate(sketch['levels'])])
+    order = np.argsort(items, kind='stable')
+    items, cumulative = items[order], np.cumsum(weights[order])
+
+    results = []
+    for q in quantiles:
+        if q <= 0:
+            results.append(sketch['min'])
+        elif q >= 1:
+            results.append(sketch['max'])
+        else:
+            position = np.searchsorted(cumulative, q * cumulative[-1], side='left')
+            results.append(float(items[min(position, len(items) - 1)]))
+    return results
+
+
+# --- Moments (nombre, moyenne, somme des carrés des écarts) fusionnables par la formule de Chan ---
+
+#fonction qui crée des moments vides pour chaque rating
+def new_moments():
+    return {'count': np.zeros(len(RATINGS)), 'mean': np.zeros(len(RATINGS)), 'm2': np.zeros(len(RATINGS))}
+
+
+#fonction qui calcule les moments de chaque rating en un passage NumPy
+def compute_moments(values, codes):
+    count = np.bincount(codes, minlength=len(RATINGS)).astype('float64')
+    sums = np.bincount(codes, weights=values, minlength=len(RATINGS))
+    mean = np.divide(sums, count, out=np.zeros(len(RATINGS)), where=count > 0)
+    m2 = np.bincount(codes, weights=(values - mean[codes]) ** 2, minlength=len(RATINGS))
+    return {'count': count, 'mean': mean, 'm2': m2}
+
+
+#fonction qui fusionne les moments 'other' dans 'moments'
+def merge_moments(moments, other):
+    count = moments['count'] + other['count']
+    delta = other['mean'] - moments['mean']
+    safe = np.where(count > 0, count, 1.0)
+    moments['mean'] = moments['mean'] + delta * other['count'] / safe
+    moments['m2'] = moments['m2'] + other['m2'] + delta ** 2 * moments['count'] * other['count'] / safe
+    moments['count'] = count
+    return moments
+
+
+# --- Histogrammes à cases fixes ---
+
+#fonction qui compte les valeurs de chaque case pour chaque rating (dernière case : valeurs au-delà)
+def compute_histogram(values, codes, name):
+    width, bins = HISTOGRAM_BINS[name]
+    positions = np.clip(np.floor(values / width), 0, bins).astype('int64')
+    counts = np.bincount(codes * (bins + 1) + positions, minlength=len(RATINGS) * (bins + 1))
+    return counts.reshape(len(RATINGS), bins + 1)
+
+
+# --- Résumé complet des prix et des stocks, global et par rating ---
+
+#fonction qui crée un résumé de distribution vide
+def new_distribution_sketch():
+    return {
+        name: {
+            'moments': new_moments(),
+            'histogram': np.zeros((len(RATINGS), HISTOGRAM_BINS[name][1] + 1), dtype='int64'),
+            'quantiles': [new_quantile_sketch() for _ in RATINGS]
+        }
+        for name in HISTOGRAM_BINS
+    }
+
+
+#fonction qui calcule le résumé de distribution d'un paquet (codes : rating de 0 à 5 de chaque livre)
+def compute_distribution_sketch(prices, stocks, codes):
+    sketch = new_distribution_sketch()
+    for name, values in (('price', prices), ('stock', stocks)):
+        values = np.asarray(values, dtype='float64')
+        finite = np.isfinite(values)
+        if not finite.all():
+            values, name_codes = values[finite], codes[finite]
+        else:
+            name_codes = codes
+
+        entry = sketch[name]
+        entry['moments'] = compute_moments(values, name_codes)
+        entry['histogram'] = compute_histogram(values, name_codes, name)
+
+        # un seul tri par rating : valeurs regroupées par code
+        order = np.argsort(name_codes, kind='stable')
+        bounds = np.searchsorted(name_codes[order], np.arange(len(RATINGS) + 1))
+        grouped = values[order]
+        for rating in RATINGS:
+            update_quantile_sketch(entry['quantiles'][rating], grouped[bounds[rating]:bounds[rating + 1]])
+    return sketch
+
+
+#fonction qui fusionne le résumé 'other' dans 'sketch'
+def merge_distribution_sketches(sketch, other):
+    for name, entry in sketch.items():
+        merge_moments(entry['moments'], other[name]['moments'])
+        entry['histogram'] += other[name]['histogram']
+        for rating in RATINGS:
+            merge_quantile_sketches(entry['quantiles'][rating], other[name]['quantiles'][rating])
+    return sketch
+
+
+#fonction qui résume moments et quantiles en statistiques lisibles
+def _summary(count, mean, m2, quantile_sketch):
+    # écart-type de l'échantillon (même convention que pandas)
+    std = float(np.sqrt(m2 / (count - 1))) if count > 1 else 0.0
+    values = sketch_quantiles(quantile_sketch, list(QUANTILES.values()))
+    summary = {
+        'count': int(count),
+        'mean': round(float(mean), 2),
+        'std': round(std, 2),
+        'min': round(quantile_sketch['min'] or 0.0, 2),
+        'max': round(quantile_sketch['max'] or 0.0, 2)
+    }
+    for label, value in zip(QUANTILES, values):
+        summary[label] = round(value, 2)
+    return summary
+
+
+#fonction qui transforme le résumé en statistiques (global et par rating) et histogrammes
+def finalize_distribution_sketch(sketch):
+    results = {}
+    for name, entry in sketch.items():
+        moments = entry['moments']
+        width, bins = HISTOGRAM_BINS[name]
+
+        # global : fusion des ratings (moments par la formule de Chan, résumés de quantiles fusionnés)
+        count, mean, m2 = 0.0, 0.0, 0.0
+        overall_quantiles = new_quantile_sketch(entry['quantiles'][0]['k'])
+        for rating in RATINGS:
+            merge_quantile_sketches(overall_quantiles, entry['quantiles'][rating])
+            other_count = moments['count'][rating]
+            if other_count == 0:
+                continue
+            delta = moments['mean'][rating] - mean
+            total = count + other_count
+            mean += delta * other_count / total
+            m2 += moments['m2'][rating] + delta ** 2 * count * other_count / total
+            count = total
+
+        results[name] = {
+            'overall': _summary(count, mean, m2, overall_quantiles),
+            'by_rating': {
+                rating: _summary(moments['count'][rating], moments['mean'][rating], moments['m2'][rating],
+                                 entry['quantiles'][rating])
+                for rating in RATINGS
+            },
+            'histogram': {
+                'edges': [round(width * position, 2) for position in range(bins + 1)],
+                'counts': entry['histogram'][:, :bins].sum(axis=0).tolist(),
+                'overflow': int(entry['histogram'][:, bins].sum()),
+                'by_rating': {rating: entry['histogram'][rating, :bins].tolist() for rating in RATINGS}
+            }
+        }
+    return results
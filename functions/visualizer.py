@@ -1,35 +1,85 @@
 #imortations des bibliothèques nécessaires
-import matplotlib.pyplot as plt
-import pandas as pd
+import os
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')
+from matplotlib.figure import Figure
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from .analyzer import analyze_data, load_books, clean_data 
+from .pipeline import load_analysis_results
+from .incremental import analyze_data_incremental
+from .schema import column_values
+from .metrics import stage, add_record, save_metrics
+from .output import save_figure, flush_writes
+from .columnar import read_columnar_aggregates, columnar_chart_columns
 
 # répertoire de sortie pour les images
 OUTPUT_DIR = Path("output/visuals")
 
-# Fonctions de création de graphiques
+# nombre de processus pour dessiner les graphiques en parallèle (1 = un après l'autre)
+CHART_WORKERS = int(os.environ.get('BOOKS_CHART_WORKERS', 3))
 
-def create_distribution_plot(books_list):
+# au-delà de ce nombre de livres en stock, le nuage de points est remplacé par une carte de densité
+SCATTER_MAX_POINTS = int(os.environ.get('BOOKS_SCATTER_MAX_POINTS', 50_000))
+
+# nombre de cases (prix, stock) de la carte de densité
+DENSITY_BINS = (120, 80)
+
+# nombre de barres visé pour l'histogramme des prix
+DISTRIBUTION_BARS = 30
+
+# Fonctions de création de graphiques (API objet de matplotlib : chaque graphique a sa propre Figure,
+# sans l'état global de pyplot, ce qui permet de les dessiner dans des processus séparés)
+
+#histogramme des prix dessiné à partir du résumé de distribution (cases fixes de functions/sketches.py),
+#sans relire la colonne des prix ; les cases fixes sont regroupées en une trentaine de barres
+#les prix au-delà de la dernière case (case de dépassement) forment une barre à part, à droite, avec une légende
+def create_distribution_plot(distribution, directory=None):
+
+    histogram = distribution['price']['histogram']
+    edges = np.asarray(histogram['edges'], dtype='float64')
+    counts = np.asarray(histogram['counts'], dtype='float64')
+    overflow = histogram.get('overflow', 0)
 
-    df = pd.DataFrame(books_list)
-    
     # Exclusion des prix très faibles ou nuls 
-    prices = df['price'][df['price'] > 1.0] 
-    plt.figure(figsize=(10, 6))
-    plt.hist(prices, bins=30, color='teal', edgecolor='black', alpha=0.7)
+    kept = edges[:-1] >= 1.0
+    edges = np.append(edges[:-1][kept], edges[-1])
+    counts = counts[kept]
+
+    # barres limitées à l'intervalle des prix présents (jusqu'à la dernière case s'il y a des prix au-delà)
+    present = np.flatnonzero(counts)
+    if len(present) > 0:
+        last = len(counts) - 1 if overflow else present[-1]
+        counts = counts[present[0]:last + 1]
+        edges = edges[present[0]:last + 2]
+    group = max(1, int(np.ceil(len(counts) / DISTRIBUTION_BARS)))
+    counts = np.add.reduceat(counts, np.arange(0, len(counts), group)) if len(counts) > 0 else counts
+    edges = np.append(edges[:-1][::group], edges[-1])
+
+    fig = Figure(figsize=(10, 6))
+    ax = fig.add_subplot()
+    ax.hist(edges[:-1], bins=edges, weights=counts, color='teal', edgecolor='black', alpha=0.7)
+
+    # prix au-delà des cases : une barre de la largeur des autres, juste après la dernière
+    if overflow:
+        width = edges[-1] - edges[-2] if len(edges) > 1 else 1.0
+        maximum = distribution['price']['overall']['max']
+        ax.bar(edges[-1] + width / 2, overflow, width=width, color='darkorange', edgecolor='black', hatch='//',
+               alpha=0.7, label=f"> {edges[-1]:.0f} £ : {overflow} livre(s), jusqu'à {maximum:.2f} £")
+        ax.legend()
     
-    plt.title('Distribution des Prix des Livres')
-    plt.xlabel('Prix (£)')
-    plt.ylabel('Fréquence (Nombre de Livres)')
-    plt.grid(axis='y', alpha=0.5)
+    ax.set_title('Distribution des Prix des Livres')
+    ax.set_xlabel('Prix (£)')
+    ax.set_ylabel('Fréquence (Nombre de Livres)')
+    ax.grid(axis='y', alpha=0.5)
     
     # Sauvegarde
-    plt.savefig(OUTPUT_DIR / '01_distribution_prix.png')
-    plt.close()
-    print(f"Généré : {OUTPUT_DIR / '01_distribution_prix.png'}")
+    filepath = Path(directory or OUTPUT_DIR) / '01_distribution_prix.png'
+    return save_figure(fig, filepath)
 
 
-def create_comparison_plot(results_by_rating):
+def create_comparison_plot(results_by_rating, directory=None):
 
     ratings_data = {
         r: results_by_rating[r] for r in sorted(results_by_rating.keys()) if r != 0
@@ -38,85 +88,254 @@ def create_comparison_plot(results_by_rating):
     ratings = list(ratings_data.keys())
     avg_prices = [data['Average_Price'] for data in ratings_data.values()]
     
-    plt.figure(figsize=(9, 6))
+    fig = Figure(figsize=(9, 6))
+    ax = fig.add_subplot()
     
-    bars = plt.bar(ratings, avg_prices, color='skyblue')
+    bars = ax.bar(ratings, avg_prices, color='skyblue')
     
-    plt.title('Prix Moyen des Livres par Note (Rating)')
-    plt.xlabel('Note Étoile')
-    plt.ylabel('Prix Moyen (£)')
-    plt.xticks(ratings)
-    plt.grid(axis='y', alpha=0.5)
+    ax.set_title('Prix Moyen des Livres par Note (Rating)')
+    ax.set_xlabel('Note Étoile')
+    ax.set_ylabel('Prix Moyen (£)')
+    ax.set_xticks(ratings)
+    ax.grid(axis='y', alpha=0.5)
     
     # Affichage de la valeur sur chaque barre
     for bar in bars:
         yval = bar.get_height()
-        plt.text(bar.get_x() + bar.get_width()/2.0, yval + 0.5, 
-                 f'{yval:.2f}', ha='center', va='bottom', fontsize=9)
+        ax.text(bar.get_x() + bar.get_width()/2.0, yval + 0.5, 
+                f'{yval:.2f}', ha='center', va='bottom', fontsize=9)
 
     # Sauvegarde
-    plt.savefig(OUTPUT_DIR / '02_prix_moyen_par_note.png')
-    plt.close()
-    print(f"Généré : {OUTPUT_DIR / '02_prix_moyen_par_note.png'}")
+    filepath = Path(directory or OUTPUT_DIR) / '02_prix_moyen_par_note.png'
+    return save_figure(fig, filepath)
 
 
-def create_relationship_plot(books_list):
+def create_relationship_plot(books, directory=None, max_points=None):
 
-    df = pd.DataFrame(books_list)
-    df_filtered = df[(df['available'] > 0) & (df['price'] > 0.0)]
+    prices = np.asarray(books['price'])
+    stocks = np.asarray(books['available'])
+    in_stock = (stocks > 0) & (prices > 0.0)
+    prices, stocks, ratings = prices[in_stock], stocks[in_stock], np.asarray(books['rating'])[in_stock]
+    max_points = SCATTER_MAX_POINTS if max_points is None else max_points
     
-    plt.figure(figsize=(10, 6))
+    fig = Figure(figsize=(10, 6))
+    ax = fig.add_subplot()
     
-    # Utilisation du Rating pour colorer les points (meilleure information visuelle)
-    scatter = plt.scatter(
-        df_filtered['price'], 
-        df_filtered['available'], 
-        c=df_filtered['rating'], 
-        cmap='viridis', 
-        alpha=0.6,
-        s=30 
-    )
+    if len(prices) > max_points:
+        # gros catalogue : cases (prix, stock) colorées par la note moyenne, coût indépendant du nombre de livres
+        colored = draw_density_map(ax, prices, stocks, ratings)
+        title = 'Relation entre Prix et Stock (densité, colorée par Note moyenne)'
+        colorbar_label = 'Note moyenne (Rating)'
+    else:
+        # Utilisation du Rating pour colorer les points (meilleure information visuelle)
+        colored = ax.scatter(
+            prices, 
+            stocks, 
+            c=ratings, 
+            cmap='viridis', 
+            alpha=0.6,
+            s=30 
+        )
+        title = 'Relation entre Prix et Stock (coloré par Note)'
+        colorbar_label = 'Note (Rating)'
     
-    plt.title('Relation entre Prix et Stock (coloré par Note)')
-    plt.xlabel('Prix (£)')
-    plt.ylabel('Stock Disponible')
-    plt.grid(True, linestyle='--', alpha=0.3)
-    cbar = plt.colorbar(scatter)
-    cbar.set_label('Note (Rating)')
+    ax.set_title(title)
+    ax.set_xlabel('Prix (£)')
+    ax.set_ylabel('Stock Disponible')
+    ax.grid(True, linestyle='--', alpha=0.3)
+    cbar = fig.colorbar(colored, ax=ax)
+    cbar.set_label(colorbar_label)
 
     # Sauvegarde
-    plt.savefig(OUTPUT_DIR / '03_prix_vs_stock.png')
-    plt.close()
-    print(f"Généré : {OUTPUT_DIR / '03_prix_vs_stock.png'}")
+    filepath = Path(directory or OUTPUT_DIR) / '03_prix_vs_stock.png'
+    return save_figure(fig, filepath)
+
+
+#fonction qui calcule les bornes de cases régulières couvrant les valeurs (comme np.histogram2d)
+def _regular_edges(values, bins):
+    low, high = (values.min(), values.max()) if len(values) > 0 else (0.0, 1.0)
+    if low == high:
+        low, high = low - 0.5, high + 0.5
+    return np.linspace(low, high, bins + 1)
+
+
+#fonction qui renvoie le numéro de case de chaque valeur (cases régulières, la dernière inclut la borne haute)
+def _bin_indices(values, edges):
+    bins = len(edges) - 1
+    positions = (values - edges[0]) * (bins / (edges[-1] - edges[0]))
+    return np.clip(positions.astype(np.intp), 0, bins - 1)
+
+
+#fonction qui dessine la carte de densité prix / stock : note moyenne de chaque case (cases vides transparentes)
+def draw_density_map(ax, prices, stocks, ratings, bins=DENSITY_BINS):
+    prices = np.asarray(prices, dtype='float64')
+    stocks = np.asarray(stocks, dtype='float64')
+    ratings = np.asarray(ratings, dtype='float64')
+
+    price_bins, stock_bins = bins
+    price_edges = _regular_edges(prices, price_bins)
+    stock_edges = _regular_edges(stocks, stock_bins)
+
+    # stock entier sur une petite plage : une case par valeur de stock (pas de bandes vides)
+    if len(stocks) > 0:
+        low, high = stocks.min(), stocks.max()
+        if high - low < stock_bins and np.array_equal(stocks, np.round(stocks)):
+            stock_edges = np.arange(low - 0.5, high + 1.5)
+
+    # comptage et somme des notes par case en un passage (np.bincount sur le numéro de case à plat)
+    stock_count = len(stock_edges) - 1
+    cells = _bin_indices(prices, price_edges) * stock_count + _bin_indices(stocks, stock_edges)
+    size = (len(price_edges) - 1) * stock_count
+    counts = np.bincount(cells, minlength=size).reshape(-1, stock_count)
+    rating_sums = np.bincount(cells, weights=ratings, minlength=size).reshape(-1, stock_count)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_ratings = np.ma.masked_where(counts == 0, rating_sums / counts)
+
+    return ax.pcolormesh(price_edges, stock_edges, mean_ratings.T, cmap='viridis', shading='flat')
+
+
+#fonction qui extrait des colonnes du catalogue sous forme de tableaux NumPy (sans copie, sauf les prix float32 remis en float64)
+def chart_columns(books, names):
+    return {name: column_values(books, name) for name in names}
+
+
+#fonction qui renvoie la liste des graphiques du catalogue (fonction de dessin, données)
+#seules les colonnes utiles sont envoyées aux processus de rendu
+def catalog_charts(books, results_by_rating, distribution):
+    return [
+        (create_distribution_plot, distribution),
+        (create_comparison_plot, results_by_rating),
+        (create_relationship_plot, chart_columns(books, ['price', 'available', 'rating'])),
+    ]
+
+
+# graphiques en attente de rendu : hérités par les processus créés par fork (aucune copie des colonnes à envoyer)
+_PENDING_CHARTS = []
+
+
+#fonction qui dessine un graphique et renvoie (fichier, mesure de l'étape) ; la mesure est faite là où le graphique est dessiné
+#l'image est écrite par le fil d'écriture pendant que le graphique suivant est dessiné ; 'flush' : attendre l'écriture
+#(obligatoire dans un processus de rendu, qui se termine sans attendre son fil d'écriture)
+def _render_chart(function, argument, directory, flush=False):
+    rows = len(argument['price']) if isinstance(argument, dict) and isinstance(argument.get('price'), np.ndarray) else None
+    with stage(function.__name__, rows_in=rows, collect=False) as record:
+        filepath = function(argument, directory)
+        if flush:
+            flush_writes()
+    return filepath, record
+
+
+#fonction exécutée dans un processus de rendu : dessine le graphique n° 'position' de la liste héritée
+def _render_pending_chart(position, directory):
+    function, argument = _PENDING_CHARTS[position]
+    return _render_chart(function, argument, directory, flush=True)
+
+
+#fonction qui dessine une liste de graphiques [(fonction, argument), ...], en parallèle si possible
+def render_charts(charts, workers=None, directory=None):
+    workers = CHART_WORKERS if workers is None else workers
+    workers = min(workers, len(charts))
+
+    if workers > 1:
+        try:
+            if 'fork' in multiprocessing.get_all_start_methods():
+                # les données sont partagées par fork : seul le numéro du graphique passe par le pipe
+                # (écritures en cours terminées avant : pas de fork pendant que le fil d'écriture travaille)
+                flush_writes()
+                _PENDING_CHARTS[:] = charts
+                with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('fork')) as pool:
+                    futures = [pool.submit(_render_pending_chart, position, directory) for position in range(len(charts))]
+                    return _collect_rendered([future.result() for future in futures])
+
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(_render_chart, function, argument, directory, True) for function, argument in charts]
+                return _collect_rendered([future.result() for future in futures])
+        except Exception as e:
+            print(f"Rendu parallèle impossible, rendu séquentiel : {e}")
+        finally:
+            _PENDING_CHARTS.clear()
+
+    rendered = [_render_chart(function, argument, directory) for function, argument in charts]
+    flush_writes()
+    return _collect_rendered(rendered)
+
+
+#fonction qui garde les mesures des graphiques et renvoie les chemins des fichiers
+def _collect_rendered(rendered):
+    for _, record in rendered:
+        add_record(record)
+    return [filepath for filepath, _ in rendered]
 
 
 # --- Fonction principale de visualisation  et de l'analyse ---
 
-def run_visualizer():
+def run_visualizer(refresh_cache=False, report=True):
     
-    # Chargement et nettoyage des données
+    # Chargement et nettoyage des données (ou lecture directe depuis le cache si le CSV n'a pas changé)
     print("\n--- Préparation des données pour la visualisation ---")
-    try:
-        books_cleaned = clean_data(load_books()) 
-        analysis_results = analyze_data(books_cleaned) 
-    except Exception as e:
-        print(f"Error during the treamtment: {e}")
-        return
+    analysis_results = load_analysis_results(refresh_cache=refresh_cache, report=report)
 
     OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
     
     print("\nGénération des graphiques")
     
     if analysis_results:
-        books_list = analysis_results['books_list']
-        results_by_rating = analysis_results['by_rating']
-        create_distribution_plot(books_list)
-        create_comparison_plot(results_by_rating)
-        create_relationship_plot(books_list)
+        charts = catalog_charts(analysis_results['books'], analysis_results['by_rating'],
+                                analysis_results['distribution'])
+        for filepath in render_charts(charts):
+            print(f"Généré : {filepath}")
         
         print(f"\nToutes les visualisations ont été sauvegardées dans : **{OUTPUT_DIR.resolve()}**")
     else:
         print("\nImpossible de générer les graphiques : Aucune donnée d'analyse disponible.")
 
+    save_metrics()
+
+
+#fonction de mise à jour incrémentale : seules les lignes ajoutées au CSV sont lues et nettoyées
+def run_visualizer_incremental():
+
+    analysis_results = analyze_data_incremental()
+    if not analysis_results:
+        print("\nImpossible de générer les graphiques : Aucune donnée d'analyse disponible.")
+        return
+
+    # les trois graphiques sont mis à jour sans relire le catalogue : agrégats et résumés de l'état,
+    # colonnes du nuage de points (livres en stock) gardées dans l'état
+    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    charts = [
+        (create_distribution_plot, analysis_results['distribution']),
+        (create_comparison_plot, analysis_results['by_rating']),
+        (create_relationship_plot, analysis_results['chart_columns'])
+    ]
+    for filepath in render_charts(charts):
+        print(f"Généré : {filepath}")
+    save_metrics()
+
+
+#fonction qui dessine les graphiques depuis l'export colonne (--export columnar) : agrégats lus dans le manifest,
+#colonnes du nuage de points projetées en mémoire ; ni lecture du CSV ni nettoyage
+def run_visualizer_columnar(directory=None):
+
+    results_by_rating, _, distribution = read_columnar_aggregates(directory)
+    if not results_by_rating:
+        print("\nImpossible de générer les graphiques : Aucun export colonne disponible (python app.py --export columnar).")
+        return
+
+    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    with stage('read_columnar') as record:
+        columns = columnar_chart_columns(directory)
+        record['rows_out'] = len(columns['price'])
+    charts = [
+        (create_distribution_plot, distribution),
+        (create_comparison_plot, results_by_rating),
+        (create_relationship_plot, columns),
+    ]
+    for filepath in render_charts(charts):
+        print(f"Généré : {filepath}")
+    save_metrics()
+
+
 if __name__ == "__main__":
-    run_visualizer()
\ No newline at end of file
+    run_visualizer()
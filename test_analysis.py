@@ -1,8 +1,23 @@
 #import des bibliothèques nécessaires
 import pytest
+import numpy as np
 import pandas as pd
-from functions.data_cleaner import clean_whitespace, handle_missing_values, fix_formats, remove_duplicates
-from functions.analyzer import analyze_by_rating, get_global_statistics
+from functions.data_cleaner import clean_whitespace, handle_missing_values, fix_formats, fix_formats_df, remove_duplicates, clean_data
+from functions.parsers import new_error_tally
+from functions.analyzer import analyze_by_rating, get_global_statistics, analyze_data, analyze_data_streaming
+from functions.manage import load_books
+from functions.cache import load_clean_books, invalidate_cache
+from functions.incremental import analyze_data_incremental
+from functions import visualizer
+from functions.generator import generate_catalog
+from functions import metrics
+from functions.sharding import analyze_data_sharded
+from functions import dedup_index
+from functions.output import submit_write, flush_writes, export_statistics
+from functions.service import start_service, stop_service, refresh_service
+from functions.schema import apply_catalog_schema, column_values, bytes_per_row
+from benchmark import find_regressions
+import app
 
 # test_analysis.py
 
@@ -66,11 +81,54 @@ def test_fix_formats(raw_books_list):
     assert books_fixed[4]['rating'] == 0
     assert books_fixed[4]['available'] == 25
 
+#fonction de test pour les parseurs : valeurs invalides comptées (pas affichées), mêmes résultats liste / DataFrame
+def test_fix_formats_error_tally(capsys):
+    books = [
+        {'title': 'A', 'price': 'N/A', 'rating': 'four stars', 'available': 'In stock (3 available)'},
+        {'title': 'B', 'price': '€4,50', 'rating': '??', 'available': 'unknown'},
+        {'title': 'C', 'price': 'N/A', 'rating': 'Two', 'available': '7'},
+    ]
+    errors = new_error_tally()
+    books_fixed = fix_formats([dict(book) for book in books], errors)
+    df_fixed = fix_formats_df(pd.DataFrame(books))
+
+    assert capsys.readouterr().out == ''
+    assert [book['price'] for book in books_fixed] == [0.0, 4.5, 0.0]
+    assert [book['rating'] for book in books_fixed] == [4, 0, 2]
+    assert [book['available'] for book in books_fixed] == [3, 0, 7]
+    assert errors['price'] == {'count': 2, 'examples': ['N/A']}
+    assert errors['rating']['count'] == 1 and errors['available']['count'] == 1
+    pd.testing.assert_frame_equal(df_fixed, pd.DataFrame(books_fixed))
+
 #fonction de test pour remove_duplicates.py
 def test_remove_duplicates(raw_books_list):
     books_unique = remove_duplicates(raw_books_list)
     assert len(books_unique) == 4
 
+#fonction de test pour clean_data (version vectorisée) : mêmes résultats que les étapes sur les listes
+def test_clean_data_matches_list_pipeline(raw_books_list):
+    expected = remove_duplicates(fix_formats(handle_missing_values(clean_whitespace(raw_books_list))))
+    df_cleaned = clean_data(pd.DataFrame(raw_books_list))
+
+    pd.testing.assert_frame_equal(df_cleaned, pd.DataFrame(expected), check_dtype=False)
+    assert df_cleaned['rating'].tolist() == [3, 1, 0, 0]
+    assert df_cleaned['available'].tolist() == [2, 0, 1, 25]
+    assert [str(df_cleaned[name].dtype) for name in ['price', 'rating', 'available']] == ['float32', 'int8', 'uint16']
+
+#fonction de test pour le schéma compact : notes/stocks hors limites et prix float32 exacts au centime
+def test_apply_catalog_schema():
+    df_books = apply_catalog_schema(pd.DataFrame({
+        'title': ['A', 'B', 'C'],
+        'price': [51.77, 0.0, 99999.99],
+        'rating': [5, 300, 0],
+        'available': [3, -2, 70000],
+    }))
+
+    assert df_books['rating'].tolist() == [5, 0, 0]
+    assert df_books['available'].tolist() == [3, 0, 70000] and df_books['available'].dtype == 'uint32'
+    assert column_values(df_books, 'price').tolist() == [51.77, 0.0, 99999.99]
+    assert bytes_per_row(df_books) > 0
+
 #fonction de test pour analyze_by_rating.py
 def test_analyze_by_rating(clean_books_list):
     results = analyze_by_rating(clean_books_list)
@@ -93,8 +151,640 @@ def test_get_global_statistics(clean_books_list):
     assert stats['max_price'] == 50.00
     assert stats['total_value'] == 955.00
     
+#fonction de test pour le calcul vectorisé sur DataFrame : mêmes résultats que sur la liste
+def test_statistics_dataframe_matches_list(clean_books_list):
+    df_books = pd.DataFrame(clean_books_list + [{'title': 'Bad', 'price': 3.0, 'rating': 9, 'available': 2}])
+    books = df_books.to_dict('records')
+
+    assert analyze_by_rating(df_books) == analyze_by_rating(books)
+    assert get_global_statistics(df_books) == get_global_statistics(books)
+    assert 'books' not in analyze_by_rating(books)[5]
+
 #fonction de test pour get_global_statistics avec liste vide
 def test_global_statistics_empty_list():
     stats = get_global_statistics([])
     assert stats['total_books'] == 0
-    assert stats['average_price'] == 0.0
\ No newline at end of file
+    assert stats['average_price'] == 0.0
+
+#fonction de test pour analyze_data_streaming : même résultat que l'analyse complète, doublons entre paquets compris
+def test_analyze_data_streaming_matches_batch(raw_books_list, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    csv_path = tmp_path / 'books.csv'
+    pd.DataFrame(raw_books_list * 3).to_csv(csv_path, index=False)
+
+    books_cleaned = clean_data(load_books(csv_path))
+    streamed = analyze_data_streaming(chunk_size=2, path=csv_path)
+
+    assert streamed['by_rating'] == analyze_by_rating(books_cleaned.to_dict('records'))
+    assert streamed['global_stats'] == get_global_statistics(books_cleaned.to_dict('records'))
+    assert streamed['global_stats']['total_books'] == 4
+
+#fonction de test pour le cache des données nettoyées : lecture à chaud, invalidation si le CSV change
+def test_load_clean_books_cache(raw_books_list, tmp_path, monkeypatch):
+    csv_path = tmp_path / 'books.csv'
+    cache_dir = tmp_path / 'cache'
+    pd.DataFrame(raw_books_list).to_csv(csv_path, index=False)
+
+    cold = load_clean_books(csv_path, use_cache=True, directory=cache_dir)
+    monkeypatch.setattr('functions.cache.load_books', lambda path: pytest.fail('CSV relu malgré le cache'))
+    warm = load_clean_books(csv_path, use_cache=True, directory=cache_dir)
+    pd.testing.assert_frame_equal(cold, warm)
+
+    monkeypatch.undo()
+    pd.DataFrame(raw_books_list[:2]).to_csv(csv_path, index=False)
+    assert len(load_clean_books(csv_path, use_cache=True, directory=cache_dir)) == 2
+
+    # un autre fichier du dossier (ex. l'état du mode incrémental) n'est ni évincé ni supprimé avec le cache
+    from functions import cache, incremental
+    other = cache_dir / f"incremental_state.{cache.CACHE_FORMAT}"
+    other.write_bytes(b'state')
+    cache.evict_cache(cache_dir, max_entries=1)
+    assert other.exists() and len(list(cache_dir.glob(f"*.{cache.CACHE_FORMAT}"))) == 2
+    assert invalidate_cache(cache_dir) == 1
+    assert other.exists()
+    assert cache.CACHE_DIR not in incremental.STATE_FILE.parents
+
+#fonction de test pour le mode incrémental : seules les lignes ajoutées sont lues, résultat identique à l'analyse complète
+def test_analyze_data_incremental(raw_books_list, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    csv_path = tmp_path / 'books.csv'
+    state_file = tmp_path / 'state.pkl'
+    pd.DataFrame(raw_books_list[:3]).to_csv(csv_path, index=False)
+    assert analyze_data_incremental(csv_path, state_file)['new_rows'] == 3
+
+    # ajout de deux lignes dont un doublon du livre 1
+    pd.DataFrame(raw_books_list[3:]).to_csv(csv_path, mode='a', header=False, index=False)
+    updated = analyze_data_incremental(csv_path, state_file)
+
+    assert updated['new_rows'] == 2
+    assert updated['by_rating'] == analyze_data_streaming(path=csv_path)['by_rating']
+    assert updated['global_stats']['total_books'] == 4
+
+    # colonnes du nuage de points (livres en stock de tout le catalogue) : les trois graphiques sont redessinés
+    books = clean_data(load_books(csv_path))
+    in_stock = books[(books['available'] > 0) & (books['price'] > 0)]
+    assert updated['chart_columns']['price'].tolist() == column_values(in_stock, 'price').tolist()
+    assert updated['chart_columns']['rating'].tolist() == in_stock['rating'].tolist()
+    monkeypatch.setattr(visualizer, 'OUTPUT_DIR', tmp_path / 'visuals')
+    monkeypatch.setattr(visualizer, 'CHART_WORKERS', 1)
+    monkeypatch.setattr(visualizer, 'analyze_data_incremental', lambda: analyze_data_incremental(csv_path, state_file))
+    visualizer.run_visualizer_incremental()
+    assert sorted(path.name for path in (tmp_path / 'visuals').iterdir()) == \
+        ['01_distribution_prix.png', '02_prix_moyen_par_note.png', '03_prix_vs_stock.png']
+
+#fonction de test pour le rendu parallèle des graphiques : images identiques au rendu séquentiel
+def test_render_charts_parallel_matches_sequential(clean_books_list, tmp_path):
+    df_books = pd.DataFrame(clean_books_list)
+    charts = [
+        (visualizer.create_distribution_plot, analyze_data(df_books, report=False)['distribution']),
+        (visualizer.create_comparison_plot, analyze_by_rating(df_books)),
+        (visualizer.create_relationship_plot, df_books[['price', 'available', 'rating']]),
+    ]
+
+    images = []
+    for workers in (1, 3):
+        directory = tmp_path / str(workers)
+        directory.mkdir()
+        rendered = visualizer.render_charts(charts, workers=workers, directory=directory)
+        images.append([path.read_bytes() for path in rendered])
+
+    assert images[0] == images[1]
+
+#fonction de test pour la carte de densité prix / stock (gros catalogues) : note moyenne par case
+def test_relationship_plot_density_mode(clean_books_list, tmp_path):
+    from matplotlib.figure import Figure
+
+    df_books = pd.DataFrame(clean_books_list)
+    filepath = visualizer.create_relationship_plot(df_books, directory=tmp_path, max_points=2)
+    flush_writes()
+    assert filepath.exists()
+
+    ax = Figure().add_subplot()
+    mesh = visualizer.draw_density_map(ax, [10.0, 10.0, 50.0], [1, 1, 3], [5, 3, 1], bins=(2, 10))
+    mean_ratings = mesh.get_array()
+    assert sorted(mean_ratings.compressed().tolist()) == [1.0, 4.0]
+
+#fonction de test pour analyze_data : le catalogue nettoyé est partagé avec les graphiques, sans copie
+def test_analyze_data_shares_cleaned_catalog(clean_books_list, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    df_books = pd.DataFrame(clean_books_list)
+
+    results = analyze_data(df_books)
+    assert results['books'] is df_books
+
+    columns = visualizer.chart_columns(results['books'], ['price', 'available'])
+    assert np.shares_memory(columns['price'], df_books['price'].to_numpy())
+    assert (columns['available'] == df_books['available'].to_numpy()).all()
+
+#fonction de test pour le générateur de catalogue : déterministe et au format de books.csv
+def test_generate_catalog(tmp_path):
+    first = generate_catalog(tmp_path / 'a.csv', 500, seed=3, duplicate_rate=0.1, chunk_rows=200)
+    second = generate_catalog(tmp_path / 'b.csv', 500, seed=3, duplicate_rate=0.1, chunk_rows=200)
+    assert first.read_bytes() == second.read_bytes()
+
+    raw_books = load_books(first)
+    assert list(raw_books.columns) == ['image', 'title', 'price', 'available', 'rating']
+    assert raw_books['price'].dropna().str.startswith('£').all()
+
+    books_cleaned = clean_data(raw_books)
+    assert 400 < len(books_cleaned) < 500
+    assert set(books_cleaned['rating']) <= {0, 1, 2, 3, 4, 5}
+
+#fonction de test pour la détection des régressions du benchmark
+def test_find_regressions():
+    baseline = {'1000': {'clean_data': {'seconds': 1.0, 'peak_mb': 10.0}}}
+    current = {'1000': {'clean_data': {'seconds': 1.1, 'peak_mb': 20.0}, 'rows_in': 1000}}
+
+    regressions = find_regressions(current, baseline, tolerance=0.25)
+    assert len(regressions) == 1
+    assert 'peak_mb' in regressions[0]
+
+#fonction de test pour les fichiers de référence du benchmark : chemins relatifs au dossier de l'appel
+def test_benchmark_relative_baseline(tmp_path, monkeypatch):
+    from pathlib import Path
+    from benchmark import main as benchmark_main
+
+    monkeypatch.chdir(tmp_path)
+    options = ['--sizes', '1000', '--no-charts', '--no-memory', '--workdir', 'work']
+    assert benchmark_main(options + ['--save-baseline', 'base.json']) == 0
+    assert (tmp_path / 'base.json').exists() and not (tmp_path / 'work' / 'base.json').exists()
+    assert benchmark_main(options + ['--compare', 'base.json', '--tolerance', '100']) == 0
+    assert Path.cwd() == tmp_path
+
+#fonction de test pour l'instrumentation : une mesure par étape de clean_data, sauvegardée en JSON
+def test_metrics_per_stage(raw_books_list, tmp_path, monkeypatch):
+    import json
+
+    monkeypatch.setattr(metrics, 'METRICS_ENABLED', True)
+    metrics.reset_metrics()
+    clean_data(pd.DataFrame(raw_books_list))
+
+    records = metrics.get_records()
+    assert [r['stage'] for r in records] == ['clean_whitespace', 'handle_missing_values', 'fix_formats', 'remove_duplicates', 'apply_schema']
+    assert records[3]['rows_in'] == 5 and records[3]['rows_out'] == 4
+
+    saved = json.loads(metrics.save_metrics(directory=tmp_path).read_text(encoding='utf-8'))
+    assert len(saved['stages']) == 5
+    metrics.reset_metrics()
+
+#fonction de test pour la lecture de plusieurs fichiers en parallèle : doublons entre fichiers retirés
+def test_analyze_data_sharded(raw_books_list, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    shards_dir = tmp_path / 'shards'
+    shards_dir.mkdir()
+    pd.DataFrame(raw_books_list[:3]).to_csv(shards_dir / 'part_0.csv', index=False)
+    pd.DataFrame(raw_books_list[2:]).to_csv(shards_dir / 'part_1.csv', index=False)
+
+    sharded = analyze_data_sharded(shards_dir, workers=2)
+    expected = clean_data(pd.DataFrame(raw_books_list))
+
+    assert sharded['by_rating'] == analyze_by_rating(expected)
+    assert sharded['global_stats'] == get_global_statistics(expected)
+    assert sharded['books']['title'].tolist() == expected['title'].tolist()
+
+#fonction de test pour l'index de dédoublonnage : même résultat qu'un ensemble de clés, sauvegarde et rechargement
+def test_dedup_index(tmp_path):
+    titles = ['Book 1', 'Book 2', 'Book 1', 'Book 3', 'Book 2']
+    prices = [10.5, 5.0, 10.5, 7.0, 6.0]
+
+    for bits in (64, 128):
+        index = dedup_index.new_dedup_index(bits=bits)
+        assert dedup_index.filter_new_keys(index, titles[:3], prices[:3]).tolist() == [True, True, False]
+        assert dedup_index.filter_new_keys(index, titles[2:], prices[2:]).tolist() == [False, True, True]
+
+        dedup_index.save_dedup_index(index, tmp_path / f'index_{bits}.npz')
+        reloaded = dedup_index.load_dedup_index(tmp_path / f'index_{bits}.npz')
+        assert dedup_index.dedup_index_size(reloaded) == 4
+        assert not dedup_index.filter_new_keys(reloaded, titles, prices).any()
+
+#fonction de test pour le mode vérification : une collision d'empreintes ne supprime pas un livre différent
+def test_dedup_index_verify_collisions(monkeypatch):
+    monkeypatch.setattr(dedup_index, 'hash_keys', lambda titles, prices, bits: (np.zeros(len(titles), dtype='uint64'), None))
+
+    index = dedup_index.new_dedup_index(bits=64, verify=True)
+    keep = dedup_index.filter_new_keys(index, ['Book 1', 'Book 2', 'Book 1', 'Book 2'], [1.0, 2.0, 1.0, 2.0])
+    assert keep.tolist() == [True, True, False, False]
+
+#fonction de test pour un paquet fait uniquement de doublons : aucun livre des paquets suivants n'est perdu
+def test_dedup_index_duplicate_only_chunk(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    index = dedup_index.new_dedup_index()
+    assert dedup_index.filter_new_keys(index, ['A', 'B'], [1.0, 2.0]).tolist() == [True, True]
+    assert dedup_index.filter_new_keys(index, ['A', 'B'], [1.0, 2.0]).tolist() == [False, False]
+    assert dedup_index.filter_new_keys(index, ['C'], [3.0]).tolist() == [True]
+
+    csv_path = tmp_path / 'books.csv'
+    rows = [{'title': title, 'price': price, 'rating': 'Three', 'available': 'In stock (2)'}
+            for title, price in [('A', 1.0), ('B', 2.0), ('A', 1.0), ('B', 2.0), ('C', 3.0)]]
+    pd.DataFrame(rows).to_csv(csv_path, index=False)
+    assert analyze_data_streaming(chunk_size=2, path=csv_path)['global_stats']['total_books'] == 3
+
+#fonction de test pour les empreintes : même clé pour un prix float64 (lecture par paquets) ou float32 (après le schéma)
+def test_dedup_index_shared_between_paths(raw_books_list, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert dedup_index.hash_keys(['A Light in the Attic '], np.array([51.77]))[0] == \
+        dedup_index.hash_keys(['A Light in the Attic'], np.array([51.77], dtype='float32'))[0]
+
+    # index sauvegardé par la lecture par paquets puis relu par la lecture en parallèle : les livres déjà vus sont retirés
+    csv_path = tmp_path / 'books.csv'
+    pd.DataFrame(raw_books_list[:3]).to_csv(csv_path, index=False)
+    analyze_data_streaming(chunk_size=2, path=csv_path, dedup_index_path=tmp_path / 'seen.npz')
+    shards_dir = tmp_path / 'shards'
+    shards_dir.mkdir()
+    pd.DataFrame(raw_books_list).to_csv(shards_dir / 'part_0.csv', index=False)
+    sharded = analyze_data_sharded(shards_dir, workers=1, dedup_index_path=tmp_path / 'seen.npz')
+    assert sharded['books']['title'].tolist() == ['Book 5']
+
+#fonction de test pour la ligne de commande : options avant ou après la commande, 'report' sans matplotlib
+def test_cli_report_without_matplotlib(raw_books_list, tmp_path):
+    import os
+    import subprocess
+    import sys
+    from pathlib import Path
+
+    args = app.build_parser().parse_args(['--refresh-cache', 'report'])
+    assert args.command == 'report' and args.refresh_cache
+    assert app.build_parser().parse_args(['charts', '--incremental']).incremental
+    assert app.build_parser().parse_args([]).command == 'all'
+    # --stream ne remplace pas silencieusement une autre commande
+    for argv in (['diff', 'old.csv', 'new.csv', '--stream'], ['--stream', 'search', 'light']):
+        with pytest.raises(SystemExit):
+            app.main(argv)
+
+    csv_path = tmp_path / 'books.csv'
+    pd.DataFrame(raw_books_list).to_csv(csv_path, index=False)
+    code = "import sys, app; app.main(['report']); assert 'matplotlib' not in sys.modules"
+    env = {**os.environ, 'BOOKS_CSV_FILE': str(csv_path), 'BOOKS_CACHE': '0',
+           'PYTHONPATH': str(Path(app.__file__).resolve().parent)}
+    subprocess.run([sys.executable, '-c', code], cwd=tmp_path, env=env, check=True, capture_output=True)
+    assert (tmp_path / 'output' / 'analysis_report.txt').exists()
+
+#fonction de test pour le service résident : réponses HTTP, rechargement des seules lignes ajoutées
+def test_service_reload(raw_books_list, tmp_path):
+    import json
+    import urllib.request
+
+    csv_path = tmp_path / 'books.csv'
+    pd.DataFrame(raw_books_list).to_csv(csv_path, index=False)
+    service = start_service(csv_path, port=0, interval=3600, charts=False, directory=tmp_path / 'output')
+    url = f"http://127.0.0.1:{service['server'].server_address[1]}"
+    try:
+        stats = json.loads(urllib.request.urlopen(url + '/stats').read())
+        assert stats['version'] == 1 and stats['global_stats']['total_books'] == 4
+        assert 'ANALYSE DES LIVRES PAR RATING' in urllib.request.urlopen(url + '/report').read().decode('utf-8')
+
+        # fichier inchangé : pas de rechargement ; lignes ajoutées : seules celles-ci sont lues
+        assert not refresh_service(service)
+        with open(csv_path, 'a', encoding='utf-8') as f:
+            f.write('New Book,£12.00,Four,In stock (3 available)\n')
+        assert refresh_service(service)
+
+        stats = json.loads(urllib.request.urlopen(url + '/stats').read())
+        assert stats['version'] == 2 and stats['new_rows'] == 1
+        assert stats['global_stats']['total_books'] == 5 and stats['by_rating']['4']['Book_Count'] == 1
+        assert json.loads(urllib.request.urlopen(url + '/health').read())['status'] == 'ok'
+    finally:
+        stop_service(service)
+
+#fonction de test pour les écritures en arrière-plan : fichiers complets après flush, exports JSON / CSV
+def test_background_writes_and_exports(clean_books_list, tmp_path):
+    import json
+
+    results_by_rating = analyze_by_rating(clean_books_list)
+    global_stats = get_global_statistics(clean_books_list)
+
+    submit_write(tmp_path / 'report.txt', 'rapport')
+    export_statistics(results_by_rating, global_stats, directory=tmp_path, formats=['json', 'csv'])
+    flush_writes()
+
+    assert (tmp_path / 'report.txt').read_text(encoding='utf-8') == 'rapport'
+    exported = json.loads((tmp_path / 'analysis_statistics.json').read_text(encoding='utf-8'))
+    assert exported['by_rating']['5']['Value'] == 550.0 and exported['global_stats']['total_books'] == 4
+    lines = (tmp_path / 'analysis_by_rating.csv').read_text(encoding='utf-8').splitlines()
+    assert lines[0] == 'Rating,Average_Price,Total_Stock,Value,Book_Count' and len(lines) == 7
+    # aucun fichier temporaire restant, mêmes droits qu'un fichier créé par open() (umask)
+    assert not list(tmp_path.glob('.*.tmp'))
+    (tmp_path / 'plain.txt').write_text('')
+    assert (tmp_path / 'report.txt').stat().st_mode == (tmp_path / 'plain.txt').stat().st_mode
+
+#fonction de test pour les résumés de distribution : exacts sur peu de valeurs, fusion par paquets équivalente
+def test_distribution_sketches(tmp_path):
+    from functions.sketches import sketch_quantiles, new_quantile_sketch, update_quantile_sketch, merge_quantile_sketches
+
+    csv_path = generate_catalog(tmp_path / 'books.csv', 3000, seed=3)
+    batch = analyze_data(clean_data(load_books(csv_path)), report=False)['distribution']
+    streamed = analyze_data_streaming(chunk_size=700, path=csv_path)['distribution']
+
+    books = clean_data(load_books(csv_path))
+    prices = books['price'].astype('float64').round(2)
+    # moyenne, écart-type, extrêmes et histogrammes ne dépendent pas du découpage
+    for distribution in (batch, streamed):
+        assert distribution['price']['overall']['count'] == len(books)
+        assert distribution['price']['overall']['mean'] == round(prices.mean(), 2)
+        assert distribution['price']['overall']['std'] == round(prices.std(), 2)
+        assert distribution['price']['overall']['max'] == prices.max()
+        assert sum(distribution['price']['histogram']['counts']) == len(books)
+    assert streamed['price']['histogram'] == batch['price']['histogram']
+    assert streamed['stock']['by_rating'][3]['count'] == batch['stock']['by_rating'][3]['count']
+
+    # quantiles exacts tant que le résumé n'a pas été compacté, approchés ensuite
+    small = update_quantile_sketch(new_quantile_sketch(k=200), [4.0, 1.0, 3.0, 2.0])
+    assert sketch_quantiles(small, [0.5, 0.99]) == [2.0, 4.0]
+    large = new_quantile_sketch(k=200)
+    for start in range(0, 100_000, 10_000):
+        merge_quantile_sketches(large, update_quantile_sketch(new_quantile_sketch(k=200), np.arange(start, start + 10_000)))
+    median, p90 = sketch_quantiles(large, [0.5, 0.9])
+    assert abs(median - 50_000) < 2_000 and abs(p90 - 90_000) < 2_000
+    assert sum(len(level) for level in large['levels']) < 1_000
+
+#fonction de test pour l'histogramme des prix : les prix au-delà des cases fixes sont comptés et dessinés à part
+def test_distribution_plot_overflow(monkeypatch):
+    books = pd.DataFrame([{'title': f'Book {i}', 'price': price, 'rating': 3, 'available': 1}
+                          for i, price in enumerate([12.5, 30.0, 45.0, 250.0, 990.0])])
+    distribution = analyze_data(books, report=False)['distribution']
+    assert distribution['price']['histogram']['overflow'] == 2
+    assert sum(distribution['price']['histogram']['counts']) == 3
+
+    figures = []
+    monkeypatch.setattr(visualizer, 'save_figure', lambda fig, filepath: figures.append(fig))
+    visualizer.create_distribution_plot(distribution)
+    ax = figures[0].axes[0]
+    assert ax.get_legend().get_texts()[0].get_text() == "> 200 £ : 2 livre(s), jusqu'à 990.00 £"
+    assert ax.patches[-1].get_height() == 2 and ax.patches[-1].get_x() >= 200
+
+#fonction de test pour l'export colonne : même catalogue relu par rating, colonnes numériques projetées en mémoire
+def test_columnar_export_roundtrip(tmp_path):
+    from functions.columnar import export_columnar, read_columnar, open_columnar, read_columnar_aggregates, \
+        new_columnar_export, write_columnar_part, finish_columnar_export
+
+    csv_path = generate_catalog(tmp_path / 'books.csv', 2000, seed=5)
+    books = clean_data(load_books(csv_path))
+    results = analyze_data(books, report=False)
+    export_columnar(books, results['by_rating'], results['global_stats'], results['distribution'], tmp_path / 'columnar')
+
+    # même contenu et mêmes types (lignes regroupées par rating)
+    loaded = read_columnar(tmp_path / 'columnar')
+    assert list(loaded.columns) == list(books.columns) and loaded.dtypes.equals(books.dtypes)
+    expected = books.sort_values('rating', kind='stable').reset_index(drop=True)
+    pd.testing.assert_frame_equal(loaded, expected)
+
+    # un seul rating : colonnes lues par mmap, sans copie
+    threes = open_columnar(tmp_path / 'columnar', ratings=[3], columns=['price'])
+    assert isinstance(threes['price'], np.memmap) and len(threes['price']) == (books['rating'] == 3).sum()
+
+    by_rating, global_stats, distribution = read_columnar_aggregates(tmp_path / 'columnar')
+    assert by_rating == results['by_rating'] and global_stats == results['global_stats']
+    assert distribution['price']['by_rating'][3] == results['distribution']['price']['by_rating'][3]
+
+    # export par paquets : plusieurs fichiers par rating, même catalogue relu ; l'ancien export est remplacé
+    export = new_columnar_export(tmp_path / 'columnar')
+    for start in range(0, len(books), 700):
+        write_columnar_part(export, books.iloc[start:start + 700])
+    finish_columnar_export(export, results['by_rating'], results['global_stats'])
+    pd.testing.assert_frame_equal(read_columnar(tmp_path / 'columnar'), expected)
+    assert [entry.name for entry in tmp_path.iterdir() if entry.name.startswith('.')] == []
+
+#fonction de test pour les regroupements : rating identique à l'analyse par rating, tranches et combinaisons
+def test_group_by(raw_books_list):
+    from functions.groupby import group_by, compute_groups
+
+    books = clean_data(raw_books_list)
+    # le regroupement par rating est celui du rapport (ratings 0 à 5, groupes vides compris)
+    assert group_by(books, 'rating') == analyze_by_rating(books.to_dict('records'))
+
+    price_bands = group_by(books, 'price_band')
+    assert list(price_bands) == ['0-10', '10-20', '20-30', '30-40', '40-50', '50-60', '60+']
+    assert sum(row['Book_Count'] for row in price_bands.values()) == len(books)
+    expected = books[(books['price'] >= 10) & (books['price'] < 20)]
+    assert price_bands['10-20']['Book_Count'] == len(expected)
+    assert price_bands['10-20']['Total_Stock'] == expected['available'].sum()
+
+    # combinaison de dimensions : clé (rating, tranche), totaux identiques à la dimension seule
+    combined = group_by(books, 'rating+price_band')
+    assert len(combined) == 6 * 7
+    assert sum(row['Book_Count'] for key, row in combined.items() if key[1] == '10-20') == len(expected)
+
+    # rating illisible : compté dans la catégorie 0 sans prix ni stock ; colonne inconnue ignorée
+    df = pd.DataFrame({'price': [1.0, 2.0, 3.0], 'available': [1, 2, 3], 'rating': ['3', 'x', '9']})
+    assert group_by(df, 'rating')[0] == {'Rating': 0, 'Average_Price': 1.5, 'Total_Stock': 3, 'Value': 9.0, 'Book_Count': 2}
+    assert list(compute_groups(df, ['price_band', 'missing_column'])) == ['price_band']
+
+
+#test des quasi-doublons : variantes d'un titre au même prix fusionnées, titres aux nombres ou prix différents gardés
+def test_near_duplicates(monkeypatch):
+    from functions import near_duplicates
+    from functions.data_cleaner import remove_near_duplicates_df
+
+    df = pd.DataFrame({
+        'title': ['A Light in the Attic', 'a light in the attic!', 'A Light in the Attic (Poems, #1)',
+                  'Café Society', 'Cafe Society', 'Sapiens: A Brief History of Humankind', 'Sapiens: A Brief History...',
+                  'Volume 12 of the Series', 'Volume 13 of the Series', 'Cafe Society', 'Unrelated Title'],
+        'price': [51.77, 51.77, 51.77, 10.0, 10.0, 54.23, 54.23, 5.0, 5.0, 11.0, 51.77],
+        'rating': [3] * 11,
+        'available': [1] * 11
+    })
+    cleaned, clusters = remove_near_duplicates_df(df, threshold=0.8)
+    # titre tronqué : le titre complet est gardé
+    assert cleaned['title'].tolist() == ['A Light in the Attic (Poems, #1)', 'Café Society',
+                                         'Sapiens: A Brief History of Humankind', 'Volume 12 of the Series',
+                                         'Volume 13 of the Series', 'Cafe Society', 'Unrelated Title']
+    assert clusters['cluster'].nunique() == 3
+    assert (~clusters['kept']).sum() == 4
+    assert 'fusionné' in near_duplicates.format_cluster_summary(clusters)
+
+    # étape désactivée par défaut, active dans clean_data avec un seuil
+    assert len(clean_data(df.copy())) == len(df)
+    monkeypatch.setattr(near_duplicates, 'NEAR_DUPLICATE_THRESHOLD', 0.8)
+    assert len(clean_data(df.copy())) == len(cleaned)
+
+
+#test du diff de catalogues : ajouts, retraits, changements de prix et de stock, écarts par rating
+def test_catalog_diff(raw_books_list, tmp_path):
+    from functions.diff import diff_catalogs, write_diff_report
+
+    old = clean_data(raw_books_list)
+    new = old.copy()
+    new.loc[0, 'price'] = new.loc[0, 'price'] + 5
+    new.loc[1, 'available'] = new.loc[1, 'available'] + 3
+    new = pd.concat([new.drop(index=2), pd.DataFrame([{'title': 'Brand New', 'price': 9.5, 'rating': 4, 'available': 1}])],
+                    ignore_index=True)
+    new = apply_catalog_schema(new)
+
+    diff = diff_catalogs(old, new)
+    assert diff['summary'] == {'Old_Books': len(old), 'New_Books': len(new), 'Added': 1, 'Removed': 1,
+                               'Price_Changes': 1, 'Stock_Changes': 1, 'Unchanged': len(old) - 3}
+    assert diff['price_changes']['price_delta'].tolist() == [5.0]
+    assert diff['stock_changes']['stock_delta'].tolist() == [3]
+    assert diff['added']['title'].tolist() == ['Brand New']
+    assert diff['removed']['title'].tolist() == [old.loc[2, 'title']]
+
+    # écarts par rating : ceux de analyze_by_rating entre les deux catalogues
+    before, after = analyze_by_rating(old), analyze_by_rating(new)
+    for rating, row in diff['by_rating'].items():
+        assert row['Delta_Book_Count'] == after[rating]['Book_Count'] - before[rating]['Book_Count']
+        assert row['Delta_Total_Stock'] == after[rating]['Total_Stock'] - before[rating]['Total_Stock']
+
+    # un catalogue comparé à lui-même : aucun changement
+    assert diff_catalogs(new, new)['summary']['Unchanged'] == len(new)
+
+    write_diff_report(diff, directory=tmp_path, formats=['csv'])
+    flush_writes()
+    assert (tmp_path / 'catalog_diff.txt').exists()
+    assert len(pd.read_csv(tmp_path / 'catalog_diff_price_changes.csv')) == 1
+
+
+#test de l'historique : instantanés par jour, titres numérotés, regroupement par mois, requêtes par livre et par période
+def test_price_history(raw_books_list, tmp_path, monkeypatch):
+    import shutil
+    from functions import history as history_store
+    from functions.history import append_snapshot, price_history, rating_history, read_history_manifest
+
+    books = clean_data(raw_books_list)
+    title = books.loc[0, 'title']
+    days = ['2024-01-30', '2024-01-31', '2024-02-01']
+    for position, day in enumerate(days):
+        snapshot = books.copy()
+        snapshot['available'] = snapshot['available'] + position
+        snapshot.loc[0, 'price'] = snapshot.loc[0, 'price'] + position
+        append_snapshot(apply_catalog_schema(snapshot), day, tmp_path)
+    # même jour réécrit : instantané remplacé ; nouveau titre : ajouté au dictionnaire
+    extra = pd.concat([books, pd.DataFrame([{'title': 'Brand New', 'price': 3.0, 'rating': 2, 'available': 1}])],
+                      ignore_index=True)
+    append_snapshot(apply_catalog_schema(extra), days[-1], tmp_path)
+
+    manifest = read_history_manifest(tmp_path)
+    assert [snapshot['date'] for snapshot in manifest['snapshots']] == days
+    assert manifest['title_count'] == books['title'].nunique() + 1
+    # janvier terminé : regroupé en un bloc, février encore en instantané quotidien
+    assert {snapshot['path'] for snapshot in manifest['snapshots']} == {'blocks/month=2024-01', 'snapshots/date=2024-02-01'}
+
+    history = price_history(title, directory=tmp_path)
+    assert history['date'].tolist() == days
+    assert history['price'].tolist() == [round(float(books.loc[0, 'price']) + shift, 2) for shift in (0, 1, 0)]
+    assert history['available'].tolist() == [books.loc[0, 'available'] + shift for shift in (0, 1, 0)]
+    assert price_history('Brand New', directory=tmp_path)['date'].tolist() == ['2024-02-01']
+    assert price_history('Unknown', directory=tmp_path).empty
+
+    # titre trouvé dans la table triée des titres, sans lire le dictionnaire ; table reconstruite si absente
+    with monkeypatch.context() as patch:
+        patch.setattr(history_store, 'read_history_titles', lambda *args: pytest.fail('dictionnaire des titres relu'))
+        assert price_history(title, directory=tmp_path)['date'].tolist() == days
+    shutil.rmtree(tmp_path / 'titles' / 'lookup')
+    assert price_history('Brand New', directory=tmp_path)['date'].tolist() == ['2024-02-01']
+
+    # mesures par rating lues dans le manifest : celles de analyze_by_rating de chaque jour
+    by_day = rating_history(days=2, end='2024-02-01', directory=tmp_path)
+    assert sorted(set(by_day['date'])) == ['2024-01-31', '2024-02-01']
+    expected = analyze_by_rating(extra.to_dict('records'))
+    last = by_day[by_day['date'] == '2024-02-01'].set_index('rating')
+    assert all(last.loc[rating, 'Book_Count'] == row['Book_Count'] for rating, row in expected.items())
+
+
+#test de l'historique : un titre manquant est numéroté comme le titre vide, sans prendre le numéro d'un autre livre
+def test_history_missing_title(tmp_path):
+    from functions.history import intern_titles, append_snapshot, price_history
+
+    ids, new_titles = intern_titles(np.array(['A', np.nan, 'C'], dtype=object), np.array(['A', 'B'], dtype=object))
+    assert ids.tolist() == [0, 2, 3] and new_titles.tolist() == ['', 'C']
+    ids, new_titles = intern_titles(np.array([np.nan, 'A'], dtype=object), np.empty(0, dtype=object))
+    assert ids.tolist() == [0, 1] and new_titles.tolist() == ['', 'A']
+
+    books = pd.DataFrame([{'title': 'A', 'price': 1.0, 'rating': 3, 'available': 1},
+                          {'title': 'B', 'price': 2.0, 'rating': 3, 'available': 2}])
+    append_snapshot(books, '2024-03-01', tmp_path)
+    books.loc[1, 'title'] = np.nan
+    append_snapshot(books, '2024-03-02', tmp_path)
+    assert price_history('B', directory=tmp_path)['date'].tolist() == ['2024-03-01']
+    assert price_history('', directory=tmp_path)['date'].tolist() == ['2024-03-02']
+
+#test des classements : mêmes livres qu'un tri complet, en une fois ou par paquets, et présents dans le rapport
+def test_rankings(tmp_path, monkeypatch):
+    from functions.analyzer import compute_statistics, merge_statistics_accumulators, new_statistics_accumulator, \
+        finalize_ranking, format_analysis_report
+    from functions import ranking
+
+    monkeypatch.setattr(ranking, 'TOP_K', 5)
+    path = generate_catalog(tmp_path / 'books.csv', 3000, seed=5)
+    books = clean_data(load_books(path))
+    rankings = finalize_ranking(compute_statistics(books))
+
+    # référence : tri complet stable (à égalité, la première ligne d'abord)
+    in_stock = books[(books['available'] > 0) & (books['price'] > 0)].copy()
+    in_stock['value'] = column_values(in_stock, 'price') * in_stock['available'].astype('float64')
+    expected = in_stock.sort_values('value', ascending=False, kind='stable').head(5)
+    assert [row['Title'] for row in rankings['top_value']['all']] == expected['title'].tolist()
+    expected = in_stock.sort_values('available', ascending=False, kind='stable').head(5)
+    assert [row['Title'] for row in rankings['overstocked']['all']] == expected['title'].tolist()
+    for rating, rows in rankings['cheapest_in_stock'].items():
+        expected = in_stock[in_stock['rating'] == rating].sort_values('price', kind='stable').head(5)
+        assert [row['Title'] for row in rows] == expected['title'].tolist()
+
+    # par paquets : mêmes classements
+    accumulator = new_statistics_accumulator()
+    for start in range(0, len(books), 700):
+        merge_statistics_accumulators(accumulator, compute_statistics(books.iloc[start:start + 700].reset_index(drop=True)))
+    assert finalize_ranking(accumulator) == rankings
+
+    report = format_analysis_report({}, {}, rankings=rankings)
+    assert 'LIVRES DE PLUS GRANDE VALEUR EN STOCK' in report
+    assert rankings['top_value']['all'][0]['Title'][:40] in report
+
+
+#test de l'index de recherche : mots, préfixes et ET, filtres, même résultat qu'un parcours de tous les titres,
+#index relu ou reconstruit selon le CSV et les réglages du nettoyage
+def test_search_index(tmp_path, monkeypatch):
+    from functions import search, near_duplicates
+    from functions.search import build_search_index, open_search_index, search_books, tokenize, load_search_index
+
+    # mots sans accents ni ponctuation, préfixes
+    small = pd.DataFrame([
+        {'title': 'Les Misérables', 'price': 12.5, 'rating': 4, 'available': 3},
+        {'title': 'Sapiens: A Brief History of Humankind', 'price': 54.23, 'rating': 5, 'available': 0},
+        {'title': 'A Light in the Attic', 'price': 51.77, 'rating': 3, 'available': 22},
+    ])
+    build_search_index(small, tmp_path / 'small')
+    index = open_search_index(tmp_path / 'small')
+    assert search_books(index, "MISERABLES")[1][0]['Title'] == 'Les Misérables'
+    assert search_books(index, "sapiens:")[1][0]['Price'] == 54.23
+    assert search_books(index, "hum*")[0] == 1
+    assert search_books(index, "a light")[1] == [{'Title': 'A Light in the Attic', 'Price': 51.77, 'Available': 22, 'Rating': 3}]
+    assert search_books(index, "a", in_stock=True)[0] == 1
+    assert search_books(index, "light history")[0] == 0
+    assert search_books(index, "!!") == (0, []) and search_books(index, " * ")[0] == 0
+    assert search_books(index, "")[0] == 3 and search_books(index, "light !!")[0] == 1
+
+    # référence : parcours de tous les titres d'un catalogue généré
+    path = generate_catalog(tmp_path / 'books.csv', 3000, seed=9)
+    books = clean_data(load_books(path))
+    build_search_index(books, tmp_path / 'search')
+    index = open_search_index(tmp_path / 'search')
+    assert index['manifest']['documents'] == len(books)
+
+    words = [set(tokenize(title)) for title in books['title']]
+    prices = column_values(books, 'price')
+    first = sorted(word for word in words[0] if word.isalpha())
+    for query, filters in [(first[0], {}), (" ".join(first[:2]), {'rating': 5}),
+                           (first[0][:2] + "* " + first[1], {'min_price': 20, 'max_price': 40}),
+                           ("", {'rating': 1, 'in_stock': True}), ("nothingmatchesthis", {})]:
+        expected = [position for position, title_words in enumerate(words)
+                    if all(any(word.startswith(term[:-1]) for word in title_words) if term.endswith('*')
+                           else term in title_words for term in query.split())
+                    and ('rating' not in filters or books['rating'].iloc[position] == filters['rating'])
+                    and filters.get('min_price', 0) <= prices[position] <= filters.get('max_price', float('inf'))
+                    and (not filters.get('in_stock') or books['available'].iloc[position] > 0)]
+        total, results = search_books(index, query, limit=len(books), **filters)
+        assert total == len(expected)
+        assert [row['Title'] for row in results] == books['title'].iloc[expected].tolist()
+
+    # index relu tant que le CSV et les réglages du nettoyage sont les mêmes, reconstruit sinon
+    monkeypatch.chdir(tmp_path)
+    load_search_index(path, tmp_path / 'reloaded')
+    with monkeypatch.context() as patch:
+        patch.setattr('functions.cache.load_clean_books', lambda path: pytest.fail('index reconstruit sans raison'))
+        assert load_search_index(path, tmp_path / 'reloaded')['manifest']['documents'] == len(books)
+    for module, name, value in ((near_duplicates, 'NEAR_DUPLICATE_THRESHOLD', 0.8), (search, 'CLEANER_VERSION', -1)):
+        with monkeypatch.context() as patch:
+            patch.setattr(module, name, value)
+            rebuilt = load_search_index(path, tmp_path / 'reloaded')['manifest']['source']
+            assert rebuilt['near_duplicates'] == near_duplicates.NEAR_DUPLICATE_THRESHOLD
+            assert rebuilt['cleaner_version'] == search.CLEANER_VERSION